@@ -1,26 +1,57 @@
 import sys
 import time
+import argparse
 import requests
-import datetime
 import numpy as np
 import cv2
-import supervision as sv
-from ultralytics import YOLO
 import os
+from frame_grabber import FrameGrabber
+from staff_classifier import StaffClassifier
+from inference_backends import create_backend, BACKENDS
+from scheduler import InferenceScheduler
+from processors import create_processor
+from checkpoint import CheckpointStore
+from uploader import AnalyticsUploader
+from wire import PayloadEncoder
+from worker_http import PreviewHub, start_worker_http
+from config_watcher import ConfigWatcher, merge_branch_config
+from metrics import REGISTRY, CallbackMetric, STAGE_SECONDS, INFERENCE_SECONDS, FRAME_AGE_SECONDS, FRAMES_TOTAL
 
 API_URL_ROOT = os.environ.get("FASTAPI_API_URL", "http://localhost:8000/api/v1/") 
-ACCESS_TOKEN = os.environ.get("JWT_ACCESS_TOKEN", "fallback_token")
+# Kunci mesin worker (backend/issue_worker_key.py) diutamakan; tidak perlu refresh token
+# Tanpa keduanya request dikirim tanpa header Authorization (hanya diterima backend selama masa migrasi)
+ACCESS_TOKEN = os.environ.get("AI_WORKER_KEY") or os.environ.get("JWT_ACCESS_TOKEN")
+REFRESH_TOKEN = os.environ.get("JWT_REFRESH_TOKEN")
 
-# Global State: Menyimpan status antar frame (diperlukan untuk state machine)
-QUEUE_ENTRY_TIMES = {} # {tracker_id: timestamp_masuk}
-TABLE_STATES = {}      # {table_id: 'DIRTY' / 'AVAILABLE' / 'OCCUPIED' / 'CLEANING'}
-LAST_CHECKED_DAY = None # Untuk logika pergantian jadwal seragam
+FRAME_SIZE = (1280, 720)     # Resolusi standar, semua koordinat ROI mengacu ke sini
+SEND_INTERVAL_SECONDS = 5    # Interval kirim analitik ke FastAPI
+SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get("SNAPSHOT_INTERVAL_SECONDS", 5))  # Interval publish snapshot JPEG (0 = mati)
+SNAPSHOT_JPEG_QUALITY = 80
+
+# Server HTTP lokal worker: preview live MJPEG + /metrics Prometheus (PREVIEW_PORT=0 untuk mematikan)
+# Port default: PREVIEW_BASE_PORT + ID kamera (mode per-camera), 8081 (mode supervisor); sama dengan
+# run_all_workers.sh dan WORKER_PREVIEW_URL_TEMPLATE/WORKER_PREVIEW_BASE_PORT backend
+PREVIEW_HOST = os.environ.get("PREVIEW_HOST", "0.0.0.0")
+PREVIEW_PORT = int(os.environ["PREVIEW_PORT"]) if os.environ.get("PREVIEW_PORT") else None
+PREVIEW_BASE_PORT = int(os.environ.get("PREVIEW_BASE_PORT", 8100))
+SUPERVISOR_PREVIEW_PORT = 8081
+PREVIEW = PreviewHub(max_fps=float(os.environ.get("PREVIEW_MAX_FPS", 10)),
+                     jpeg_quality=int(os.environ.get("PREVIEW_JPEG_QUALITY", 70)))
+RECONNECT_BACKOFF_MIN = 1    # Jeda awal reconnect stream RTSP (detik), naik 2x tiap gagal
+RECONNECT_BACKOFF_MAX = 60   # Batas atas jeda reconnect (detik)
+CONFIG_POLL_SECONDS = float(os.environ.get("CONFIG_POLL_SECONDS", 10))  # Interval cek perubahan konfigurasi (0 = mati)
+
+# Checkpoint state analitik per kamera agar restart tidak mereset hitungan/status (interval 0 = mati)
+CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get("CHECKPOINT_INTERVAL_SECONDS", 10))
+CHECKPOINTS = (CheckpointStore(os.environ.get("CHECKPOINT_DIR", "checkpoints"),
+                               float(os.environ.get("CHECKPOINT_MAX_AGE_SECONDS", 600)))
+               if CHECKPOINT_INTERVAL_SECONDS else None)
 
 # --- FUNGSI HELPER API & KONFIGURASI ---
 
 def load_config_from_api(camera_id, branch_id):
     """Mengambil semua konfigurasi dinamis (RTSP, ROI, Jadwal) dari FastAPI."""
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"} if ACCESS_TOKEN else {}
     
     try:
         # Ambil konfigurasi Kamera (termasuk ROI)
@@ -29,9 +60,7 @@ def load_config_from_api(camera_id, branch_id):
         # Ambil Jadwal Seragam dari Cabang
         branch_res = requests.get(f"{API_URL_ROOT}branches/{branch_id}", headers=headers, timeout=5).json()
         
-        config = cam_res
-        config['uniform_schedule'] = branch_res.get('uniform_schedule', {})
-        config['total_seating_capacity'] = branch_res.get('total_seating_capacity', 100)
+        config = merge_branch_config(cam_res, branch_res)
         
         print(f"✅ Konfigurasi Kamera {camera_id} dimuat sukses.")
         return config
@@ -40,283 +69,390 @@ def load_config_from_api(camera_id, branch_id):
         print(f"❌ Gagal memuat konfigurasi dari API: {e}")
         return None
 
-GLOBAL_ACCESS_TOKEN = "YOUR_INITIAL_TOKEN" # Akan di-overwrite
-GLOBAL_REFRESH_TOKEN = None # Akan di-overwrite
-
-# ... (Fungsi load_config_from_api dan lainnya) ...
-
-def refresh_access_token(refresh_token: str):
-    """Memanggil API refresh token dan mengupdate GLOBAL_ACCESS_TOKEN."""
-    global GLOBAL_ACCESS_TOKEN, GLOBAL_REFRESH_TOKEN
+def load_branch_configs_from_api(branch_id):
+    """Mengambil konfigurasi semua kamera satu cabang (untuk mode supervisor)."""
+    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"} if ACCESS_TOKEN else {}
     
     try:
-        # Panggil endpoint refresh token
-        response = requests.post(f"{API_URL_ROOT}auth/refresh", 
-                                 json={"username": "placeholder"}, # Ganti dengan data yang sesuai
-                                 headers={"Authorization": f"Bearer {refresh_token}"},
-                                 timeout=5)
-        response.raise_for_status()
+        # Endpoint yang sama dengan fetch_camera_ids.py
+        cams_res = requests.get(f"{API_URL_ROOT}branches/{branch_id}/cameras", headers=headers, timeout=5)
+        cams_res.raise_for_status()
         
-        new_token = response.json()['access_token']
+        branch_res = requests.get(f"{API_URL_ROOT}branches/{branch_id}", headers=headers, timeout=5).json()
+        
+        configs = [merge_branch_config(config, branch_res) for config in cams_res.json()]
         
-        # Update token global
-        GLOBAL_ACCESS_TOKEN = new_token
-        print("✅ Access Token berhasil diperbarui.")
-        return True
+        print(f"✅ Konfigurasi {len(configs)} kamera Cabang {branch_id} dimuat sukses.")
+        return configs
         
     except requests.exceptions.RequestException as e:
-        print(f"❌ Gagal memperbarui token: {e}")
-        return False
+        print(f"❌ Gagal memuat konfigurasi cabang dari API: {e}")
+        return []
 
-def send_analytics_data(camera_id, analytics_data):
-    """Mengirim hasil deteksi dengan mekanisme refresh token otomatis."""
-    global GLOBAL_ACCESS_TOKEN, GLOBAL_REFRESH_TOKEN
-    
-    headers = {"Authorization": f"Bearer {GLOBAL_ACCESS_TOKEN}", "Content-Type": "application/json"}
-    payload = {"camera": camera_id, "analytics_data": analytics_data}
-    
-    # 1. Coba kirim data dengan token saat ini
-    try:
-        response = requests.post(f"{API_URL_ROOT}logs/", json=payload, headers=headers, timeout=5)
-        response.raise_for_status()
-        return True
-    except requests.exceptions.HTTPError as e:
-        # 2. Jika error 401 (Token Expired)
-        if e.response.status_code == 401 and GLOBAL_REFRESH_TOKEN:
-            print("⚠️ Token Expired. Mencoba refresh token...")
-            
-            if refresh_access_token(GLOBAL_REFRESH_TOKEN):
-                # 3. Coba kirim data lagi dengan token baru (Recursive call/Retry)
-                print("➡️ Mencoba ulang pengiriman data...")
-                # Update header dengan token baru
-                headers["Authorization"] = f"Bearer {GLOBAL_ACCESS_TOKEN}"
-                
-                try:
-                    response = requests.post(f"{API_URL_ROOT}logs/", json=payload, headers=headers, timeout=5)
-                    response.raise_for_status()
-                    return True
-                except requests.exceptions.RequestException as retry_e:
-                    print(f"❌ Gagal pengiriman ulang: {retry_e}")
-                    return False
-            else:
-                print("❌ Gagal mendapatkan token baru. Worker berhenti mengirim.")
-                return False
-        # 4. Tangani error selain 401
-        elif e.response.status_code != 401:
-            print(f"❌ Gagal mengirim data (HTTP Error {e.response.status_code})")
-            return False
-        return False
-    except requests.exceptions.RequestException:
-        # Tangani kegagalan koneksi umum
-        return False
+def create_config_watcher(branch_id, configs, uploader, camera_ids=None):
+    """Watcher hot-reload konfigurasi; None jika CONFIG_POLL_SECONDS = 0."""
+    if not CONFIG_POLL_SECONDS:
+        return None
+    return ConfigWatcher(API_URL_ROOT, branch_id, camera_ids,
+                         initial_configs={config['id']: config for config in configs},
+                         interval=CONFIG_POLL_SECONDS,
+                         get_access_token=lambda: uploader.access_token).start()
 
+def create_payload_encoder():
+    """Format kirim analitik: ANALYTICS_WIRE_FORMAT (json/msgpack), ANALYTICS_COMPRESSION (none/gzip/zstd),
+    ANALYTICS_TABLE_DELTA=1 untuk delta meja DINING. Default JSON polos agar cocok dengan backend lama."""
+    return PayloadEncoder(
+        fmt=os.environ.get("ANALYTICS_WIRE_FORMAT", "json"),
+        compression=os.environ.get("ANALYTICS_COMPRESSION", "none"),
+        table_delta=os.environ.get("ANALYTICS_TABLE_DELTA", "0") == "1",
+        keyframe_interval=int(os.environ.get("ANALYTICS_KEYFRAME_INTERVAL", 60)),
+    )
 
-# --- FUNGSI LOGIKA DETEKSI PERAN (STAFF vs PELANGGAN) ---
+def create_uploader(spool_name):
+    """
+    Pengirim analitik bersama (satu per proses) yang berjalan di thread latar.
+    spool_name: subfolder spool milik proses ini (camera_<id> / branch_<id>). Worker per kamera
+    berjalan di cwd yang sama, jadi spool bersama akan di-replay oleh beberapa proses sekaligus.
+    """
+    return AnalyticsUploader(
+        API_URL_ROOT, ACCESS_TOKEN, REFRESH_TOKEN,
+        spool_dir=os.path.join(os.environ.get("ANALYTICS_SPOOL_DIR", "spool"), spool_name),
+        spool_max_bytes=int(os.environ.get("ANALYTICS_SPOOL_MAX_MB", "50")) * 1024 * 1024,
+        encoder=create_payload_encoder(),
+    ).start()
 
-def is_staff(frame, box, schedule):
-    """Menentukan Staff berdasarkan Jadwal Warna dinamis."""
-    global LAST_CHECKED_DAY
-    
-    current_day = datetime.datetime.now().strftime('%A').upper()
-    color_config = schedule.get(current_day)
-    
-    if not color_config or 'lower' not in color_config or 'upper' not in color_config:
-        return False
-        
-    lower_hsv = np.array(color_config['lower'])
-    upper_hsv = np.array(color_config['upper'])
-    
-    x1, y1, x2, y2 = map(int, box)
-    
-    # Cek warna di area torso (badan)
-    try:
-        # Ambil bagian tengah tubuh 
-        torso_img = frame[int(y1*0.2):int(y2*0.6), int(x1*0.2):int(x2*0.8)]
-    except IndexError:
-        return False
+# --- SESI PER KAMERA ---
 
-    if torso_img.size == 0: return False
+class CameraSession:
+    """State runtime satu kamera: stream, processor area (tracker, zona, state), dan jadwal kirim data."""
     
-    # Konversi ke HSV dan hitung mask
-    hsv = cv2.cvtColor(torso_img, cv2.COLOR_BGR2HSV)
-    mask = cv2.inRange(hsv, lower_hsv, upper_hsv)
+    def __init__(self, camera_id, config, uploader):
+        self.camera_id = camera_id
+        self.uploader = uploader
+        self.rtsp_url = config['rtsp_url']
+        self.area_type = config['area_type']
+        self.roi_settings = config['roi_settings']
+        self.uniform_schedule = config['uniform_schedule']
+        
+        # Penjadwal inferensi: batas FPS per tipe area + motion gate + keep-alive
+        self.scheduler = InferenceScheduler(self.area_type, self.roi_settings.get('target_fps'))
+        
+        # State antar frame milik kamera ini (tracker, zona, hitungan, status meja) ada di processor-nya
+        self.staff_classifier = StaffClassifier(self.uniform_schedule)
+        self.processor = self._create_processor()
+        
+        # Capture di thread latar: selalu menyimpan frame terbaru, reconnect ditangani di sana
+        self.grabber = self._start_grabber()
+        self.last_data_send = time.time()
+        self.last_analytics = None
+        self.last_snapshot_send = 0.0
+        
+        # Instrumentasi: umur frame yang sedang diproses & FPS efektif (EWMA)
+        self.last_capture_time = None
+        self.last_processed_at = None
+        self.effective_fps = 0.0
+        
+        # Pulihkan state dari checkpoint terakhir (jika masih baru)
+        self.last_checkpoint = time.time()
+        self.restore_checkpoint()
+        ACTIVE_SESSIONS[self.camera_id] = self
+        PREVIEW.register(self.camera_id)
     
-    ratio = cv2.countNonZero(mask) / (torso_img.shape[0] * torso_img.shape[1] + 1e-6)
+    def _start_grabber(self):
+        camera = str(self.camera_id)
+        return FrameGrabber(self.rtsp_url, RECONNECT_BACKOFF_MIN, RECONNECT_BACKOFF_MAX,
+                            on_frame=lambda seconds: STAGE_SECONDS.observe(seconds, camera, "capture")).start()
     
-    return ratio > 0.3 # Threshold 30% area torso cocok dengan warna seragam
-
-# --- FUNGSI LOGIKA PER HITUNGAN AREA (4 TIPE KAMERA) ---
-
-def process_entrance_camera(detections, active_zone, tracker):
-    """Pintu Masuk: Line Crossing Counter"""
-    detections = tracker.update_with_detections(detections)
-    active_zone.trigger(detections)
+    def _create_processor(self):
+        return create_processor(self.area_type, self.roi_settings, FRAME_SIZE,
+                                self.scheduler.target_fps, self.staff_classifier)
     
-    return {
-        "people_in": active_zone.in_count,
-        "people_out": active_zone.out_count,
-    }
-
-def process_dining_camera(frame, detections, roi_settings, schedule):
-    """Area Makan: Multi-Polygon Meja & Status Kotor/Bersih (State Machine)"""
-    global TABLE_STATES 
+    def apply_config(self, config):
+        """
+        Hot-reload: menerapkan konfigurasi baru di antara dua frame. Processor (tracker, antrian,
+        state meja, hitungan garis) dan model YOLO tetap dipakai selama tipe area tidak berubah.
+        """
+        old_area_type, old_roi = self.area_type, self.roi_settings
+        self.area_type = config['area_type']
+        self.roi_settings = config['roi_settings']
+        
+        if (self.area_type, self.roi_settings.get('target_fps')) != (old_area_type, old_roi.get('target_fps')):
+            self.scheduler = InferenceScheduler(self.area_type, self.roi_settings.get('target_fps'))
+        if config['uniform_schedule'] != self.uniform_schedule:
+            self.uniform_schedule = config['uniform_schedule']
+            self.staff_classifier = self.processor.staff_classifier = StaffClassifier(self.uniform_schedule)
+        if self.area_type != old_area_type:
+            # Analitik area lama tidak berlaku untuk area baru: processor baru dengan state kosong
+            self.processor = self._create_processor()
+            self.last_analytics = None
+        elif self.roi_settings != old_roi:
+            self.processor.configure(self.roi_settings)
+        if config['rtsp_url'] != self.rtsp_url:
+            # Thread capture lama berhenti sendiri di latar; loop deteksi tidak ikut menunggu
+            self.grabber.stop(timeout=0)
+            self.rtsp_url = config['rtsp_url']
+            self.grabber = self._start_grabber()
+        print(f"✅ Konfigurasi Kamera {self.camera_id} diperbarui tanpa restart.")
     
-    total_customers = 0
-    tables_data = []
-
-    for zone_cfg in roi_settings.get('zones', []):
-        points = np.array(zone_cfg['points'])
-        table_zone = sv.PolygonZone(polygon=points, frame_resolution_wh=(1280, 720))
+    def read_frame(self, timeout=None):
+        """
+        Mengambil frame terbaru yang belum diproses dan PERLU diinferensi (sudah di-resize).
+        timeout=None -> non-blocking. Mengembalikan None jika belum ada frame baru
+        atau frame dilewati oleh scheduler.
+        """
+        if timeout is None:
+            frame, capture_time = self.grabber.latest()
+        else:
+            frame, capture_time = self.grabber.read(timeout)
+        if frame is None:
+            return None
+        camera = str(self.camera_id)
         
-        people_in_zone = detections[table_zone.trigger(detections)]
-        staff_count = 0
-        customer_count = 0
+        # Keputusan skip diambil sebelum resize agar frame yang dilewati hampir gratis
+        with STAGE_SECONDS.time(camera, "schedule"):
+            infer = self.scheduler.should_infer(frame, self.processor.has_active_tracks())
+        if not infer:
+            FRAMES_TOTAL.inc(camera, "skipped")
+            # Frame yang dilewati tetap ditampilkan di preview, hanya jika ada yang menonton
+            if PREVIEW.has_viewers(self.camera_id):
+                PREVIEW.offer(self.camera_id, cv2.resize(frame, FRAME_SIZE))
+            return None
+        FRAMES_TOTAL.inc(camera, "inferred")
+        self.last_capture_time = capture_time
         
-        # Bedakan Staff/Customer
-        for box in people_in_zone.xyxy:
-            if is_staff(frame, box, schedule):
-                staff_count += 1
-            else:
-                customer_count += 1
-                
-        table_id = zone_cfg['id']
-        current_status = TABLE_STATES.get(table_id, 'AVAILABLE')
+        # Standarisasi Resolusi (Penting untuk konsistensi koordinat ROI)
+        with STAGE_SECONDS.time(camera, "resize"):
+            return cv2.resize(frame, FRAME_SIZE)
+    
+    def process(self, frame, detections):
+        """Menjalankan logika area sesuai tipe kamera lalu mengirim hasilnya secara berkala."""
+        camera = str(self.camera_id)
+        if self.processor.tracked:
+            with STAGE_SECONDS.time(camera, "tracking"):
+                detections = self.processor.track(detections)
         
-        # LOGIKA PERUBAHAN STATUS MEJA
-        new_status = current_status
-        if customer_count > 0:
-            new_status = 'OCCUPIED'
-        elif staff_count > 0 and current_status == 'DIRTY':
-            new_status = 'CLEANING'
-        elif staff_count == 0 and current_status == 'CLEANING':
-             new_status = 'AVAILABLE'
-        elif customer_count == 0 and current_status == 'OCCUPIED':
-            new_status = 'DIRTY'
-
-        TABLE_STATES[table_id] = new_status
-        total_customers += customer_count
+        with STAGE_SECONDS.time(camera, "analytics"):
+            analytics_data = self.processor.process(frame, detections, time.time())
         
-        tables_data.append({
-            "id": table_id, "status": new_status, "people_count": customer_count, 
-            "capacity": zone_cfg.get('capacity', 4)
-        })
-
-    return {"total_customers": total_customers, "tables": tables_data}
-
-def process_cashier_camera(detections, roi_settings, tracker):
-    """Kasir: Antrian & Waktu Tunggu (Tracking ID)"""
-    global QUEUE_ENTRY_TIMES
+        self._record_timing()
+        self.last_analytics = analytics_data
+        self.send_if_due()
+        self.publish_snapshot_if_due(frame)
+        if PREVIEW.has_viewers(self.camera_id):
+            PREVIEW.offer(self.camera_id, frame, self.preview_overlay(detections))
+        return analytics_data
     
-    points = np.array(roi_settings.get('points'))
-    if points.ndim != 2: return {"queue_length": 0, "wait_time_avg": 0}
-        
-    queue_zone = sv.PolygonZone(polygon=points, frame_resolution_wh=(1280, 720))
-    detections = tracker.update_with_detections(detections)
-    people_in_queue = detections[queue_zone.trigger(detections)]
+    def preview_overlay(self, detections):
+        """Data overlay preview: poligon zona, garis hitung ENTRANCE, dan kotak deteksi."""
+        return self.processor.overlay({"boxes": detections.xyxy, "tracker_ids": detections.tracker_id})
     
-    current_time = time.time()
-    total_wait_time = 0
+    def _record_timing(self):
+        now = time.time()
+        if self.last_capture_time is not None:
+            FRAME_AGE_SECONDS.observe(now - self.last_capture_time, str(self.camera_id))
+        if self.last_processed_at is not None and now > self.last_processed_at:
+            # EWMA agar FPS efektif tidak melompat-lompat per frame
+            instant_fps = 1.0 / (now - self.last_processed_at)
+            self.effective_fps = instant_fps if not self.effective_fps else 0.9 * self.effective_fps + 0.1 * instant_fps
+        self.last_processed_at = now
     
-    for track_id in people_in_queue.tracker_id:
-        if track_id not in QUEUE_ENTRY_TIMES:
-            QUEUE_ENTRY_TIMES[track_id] = current_time
-        total_wait_time += (current_time - QUEUE_ENTRY_TIMES[track_id])
+    def send_if_due(self):
+        """Mengirim hasil analitik terakhir tiap SEND_INTERVAL_SECONDS (juga saat frame dilewati)."""
+        self.checkpoint_if_due()
+        if self.last_analytics is None:
+            return
         
-    active_ids = set(people_in_queue.tracker_id)
-    QUEUE_ENTRY_TIMES = {k: v for k, v in QUEUE_ENTRY_TIMES.items() if k in active_ids}
+        # KIRIM DATA KE FASTAPI (hanya masuk antrian; pengiriman di thread uploader)
+        if time.time() - self.last_data_send > SEND_INTERVAL_SECONDS:
+            self.uploader.submit(self.camera_id, self.last_analytics, self.processor.drain_events())
+            self.last_data_send = time.time()
+    
+    def publish_snapshot_if_due(self, frame):
+        """Encode frame yang sudah ada ke JPEG tiap SNAPSHOT_INTERVAL_SECONDS agar backend tidak membuka RTSP sendiri."""
+        if not SNAPSHOT_INTERVAL_SECONDS or time.time() - self.last_snapshot_send < SNAPSHOT_INTERVAL_SECONDS:
+            return
+        success, encoded_image = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_JPEG_QUALITY])
+        if success:
+            self.uploader.submit_snapshot(self.camera_id, encoded_image.tobytes())
+        self.last_snapshot_send = time.time()
+    
+    # --- CHECKPOINT (checkpoint.py) ---
     
-    queue_length = len(people_in_queue)
-    avg_wait = int(total_wait_time / queue_length) if queue_length > 0 else 0
+    def checkpoint_state(self):
+        return {"area_type": self.area_type, **self.processor.checkpoint_state()}
+    
+    def restore_checkpoint(self):
+        state = CHECKPOINTS.load(self.camera_id) if CHECKPOINTS is not None else None
+        if state is None or state.get("area_type") != self.area_type:
+            return
+        self.processor.restore(state)
+        print(f"✅ State Kamera {self.camera_id} dipulihkan dari checkpoint "
+              f"({time.time() - state['saved_at']:.0f} detik lalu).")
+    
+    def checkpoint_if_due(self, force=False):
+        if CHECKPOINTS is None or (not force and time.time() - self.last_checkpoint < CHECKPOINT_INTERVAL_SECONDS):
+            return
+        try:
+            CHECKPOINTS.save(self.camera_id, self.checkpoint_state())
+        except OSError as e:
+            print(f"⚠️ Gagal menyimpan checkpoint Kamera {self.camera_id}: {e}")
+        self.last_checkpoint = time.time()
+    
+    def release(self):
+        ACTIVE_SESSIONS.pop(self.camera_id, None)
+        PREVIEW.unregister(self.camera_id)
+        self.checkpoint_if_due(force=True)
+        self.grabber.stop()
 
-    return {"queue_length": queue_length, "wait_time_avg": avg_wait}
+# --- METRIK PROMETHEUS (/metrics di server HTTP worker) ---
 
-def process_kitchen_camera(frame, detections, roi_settings, schedule):
-    """Dapur: Deteksi Staf Aktif di Area Kerja"""
-    points = np.array(roi_settings.get('points'))
-    if points.ndim != 2: return {"staff_active_count": 0, "staff_total_scheduled": 6}
-        
-    kitchen_zone = sv.PolygonZone(polygon=points, frame_resolution_wh=(1280, 720))
-    people_in_zone = detections[kitchen_zone.trigger(detections)]
-    
-    active_staff_count = 0
-    for box in people_in_zone.xyxy:
-        if is_staff(frame, box, schedule):
-            active_staff_count += 1
-            
-    total_scheduled = roi_settings.get('total_staff', 6)
+ACTIVE_SESSIONS = {}  # {camera_id: CameraSession} di proses ini
+
+def _per_session(value_fn):
+    return lambda: {(str(cid), ): value_fn(session) for cid, session in list(ACTIVE_SESSIONS.items())}
+
+def register_worker_metrics(uploader):
+    """Metrik yang dibaca saat scrape: FPS, lag, statistik grabber, dan antrian uploader."""
+    for name, documentation, value_fn, metric_type in (
+        ("ai_worker_effective_fps", "FPS inferensi efektif per kamera (EWMA).",
+         lambda s: s.effective_fps, "gauge"),
+        ("ai_worker_frame_lag_seconds", "Selisih waktu sekarang dengan waktu capture frame terakhir yang diproses.",
+         lambda s: time.time() - s.last_capture_time if s.last_capture_time else 0.0, "gauge"),
+        ("ai_worker_stream_connected", "1 jika stream RTSP kamera sedang terhubung.",
+         lambda s: 1 if s.grabber.connected else 0, "gauge"),
+        ("ai_worker_decoded_frames_total", "Frame yang di-decode dari stream RTSP.",
+         lambda s: s.grabber.decoded_frames, "counter"),
+        ("ai_worker_dropped_frames_total", "Frame yang tertimpa sebelum sempat diproses.",
+         lambda s: s.grabber.dropped_frames, "counter"),
+        ("ai_worker_reconnects_total", "Jumlah reconnect stream RTSP.",
+         lambda s: s.grabber.reconnects, "counter"),
+    ):
+        REGISTRY.register(CallbackMetric(name, documentation, ("camera",), _per_session(value_fn), metric_type))
     
-    return {"staff_active_count": active_staff_count, "staff_total_scheduled": total_scheduled}
+    REGISTRY.register(CallbackMetric("ai_worker_upload_queue_depth", "Payload analitik di antrian memori uploader.",
+                                     callback=lambda: {(): uploader.queue_depth}))
+    REGISTRY.register(CallbackMetric("ai_worker_spool_batches", "Batch analitik yang menunggu di spool disk.",
+                                     callback=lambda: {(): len(uploader.spool)}))
 
 # --- FUNGSI UTAMA WORKER ---
 
-def run_worker(camera_id, branch_id):
-    """Fungsi utama yang menjalankan loop deteksi."""
+def detect_and_process(backend, batch):
+    """Satu langkah pipeline: inferensi YOLO untuk batch [(session, frame)] lalu analitik per kamera."""
+    with INFERENCE_SECONDS.time(backend.name):
+        batch_detections = backend.predict([frame for _, frame in batch])
+    for (session, frame), detections in zip(batch, batch_detections):
+        session.process(frame, detections)
+
+def run_worker(camera_id, branch_id, backend_name=None, model_path=None):
+    """Fungsi utama yang menjalankan loop deteksi untuk satu kamera."""
     config = load_config_from_api(camera_id, branch_id)
     if not config: return
-
-    rtsp_url = config['rtsp_url']
-    area_type = config['area_type']
-    roi_settings = config['roi_settings']
-    uniform_schedule = config['uniform_schedule']
     
     # INISIALISASI AI TOOLS
-    model = YOLO('yolov8n.pt') 
-    tracker = sv.ByteTrack()
-    
-    # INISIALISASI ZONE/LINE DINAMIS
-    active_zone = None
-    if area_type == 'ENTRANCE' and roi_settings.get('type') == 'LINE':
-        start = sv.Point(*roi_settings['start'])
-        end = sv.Point(*roi_settings['end'])
-        active_zone = sv.LineZone(start=start, end=end)
-    
-    cap = cv2.VideoCapture(rtsp_url)
-    last_data_send = time.time()
+    backend = create_backend(backend_name, model_path)
+    uploader = create_uploader(f"camera_{camera_id}")
+    session = CameraSession(camera_id, config, uploader)
+    watcher = create_config_watcher(branch_id, [config], uploader, camera_ids=[camera_id])
+    preview_port = PREVIEW_PORT if PREVIEW_PORT is not None else PREVIEW_BASE_PORT + camera_id
+    if preview_port:
+        register_worker_metrics(uploader)
+        start_worker_http(PREVIEW, PREVIEW_HOST, preview_port, REGISTRY)
     
     while True:
-        ret, frame = cap.read()
-        if not ret: 
-            # Auto-reconnect logic
-            time.sleep(5)
-            cap = cv2.VideoCapture(rtsp_url)
-            continue
-        
-        # Standarisasi Resolusi (Penting untuk konsistensi koordinat ROI)
-        frame = cv2.resize(frame, (1280, 720)) 
+        # Hot-reload konfigurasi di antara frame
+        if watcher is not None:
+            new_config = watcher.pop_changes().get(camera_id)
+            if new_config:
+                session.apply_config(new_config)
         
-        # DETEKSI YOLO
-        results = model(frame, classes=[0], verbose=False)[0] # Hanya deteksi 'person'
-        detections = sv.Detections.from_ultralytics(results)
-
-        # PROSES ANALISIS SESUAI TIPE AREA
-        analytics_data = {}
-        if area_type == 'ENTRANCE' and active_zone:
-            analytics_data = process_entrance_camera(detections, roi_settings, active_zone, tracker)
-        elif area_type == 'DINING':
-            analytics_data = process_dining_camera(frame, detections, roi_settings, uniform_schedule)
-        elif area_type == 'CASHIER':
-            analytics_data = process_cashier_camera(detections, roi_settings, tracker)
-        elif area_type == 'KITCHEN':
-            analytics_data = process_kitchen_camera(frame, detections, roi_settings, uniform_schedule)
+        # Blocking sampai ada frame baru; frame lama yang tertimpa otomatis dibuang
+        frame = session.read_frame(timeout=1.0)
+        if frame is None:
+            # Frame dilewati scheduler: hasil terakhir tetap dikirim sesuai jadwal
+            session.send_if_due()
+            continue
         
-        # KIRIM DATA KE FASTAPI
-        if time.time() - last_data_send > 5: # Kirim setiap 5 detik
-            send_analytics_data(camera_id, analytics_data)
-            last_data_send = time.time()
+        # DETEKSI YOLO (hanya 'person') lalu PROSES ANALISIS SESUAI TIPE AREA & KIRIM DATA
+        detect_and_process(backend, [(session, frame)])
         
         # cv2.imshow(f"Kamera {camera_id}", frame) # Hapus saat deployment
         if cv2.waitKey(1) == ord('q'): break
 
-    cap.release()
+    session.release()
+    if watcher is not None:
+        watcher.stop()
+    uploader.stop()
     cv2.destroyAllWindows()
 
+def run_supervisor(branch_id, backend_name=None, model_path=None):
+    """Mode supervisor: semua kamera satu cabang dalam satu proses dengan satu model YOLO bersama."""
+    configs = load_branch_configs_from_api(branch_id)
+    if not configs: return
+    
+    # Satu model untuk semua kamera (hemat RAM, inferensi di-batch)
+    backend = create_backend(backend_name, model_path)
+    uploader = create_uploader(f"branch_{branch_id}")
+    sessions = {config['id']: CameraSession(config['id'], config, uploader) for config in configs}
+    watcher = create_config_watcher(branch_id, configs, uploader)
+    preview_port = PREVIEW_PORT if PREVIEW_PORT is not None else SUPERVISOR_PREVIEW_PORT
+    if preview_port:
+        register_worker_metrics(uploader)
+        start_worker_http(PREVIEW, PREVIEW_HOST, preview_port, REGISTRY)
+    
+    try:
+        while True:
+            # Hot-reload: kamera diubah, ditambah, atau dihapus tanpa restart (model tetap dipakai)
+            changes = watcher.pop_changes() if watcher is not None else {}
+            for camera_id, new_config in changes.items():
+                if new_config is None:
+                    sessions.pop(camera_id).release()
+                    print(f"⚠️ Kamera {camera_id} dihapus dari cabang, sesi dihentikan.")
+                elif camera_id in sessions:
+                    sessions[camera_id].apply_config(new_config)
+                else:
+                    sessions[camera_id] = CameraSession(camera_id, new_config, uploader)
+                    print(f"✅ Kamera baru {camera_id} ditambahkan ke supervisor.")
+            
+            # Kumpulkan frame terbaru dari setiap kamera yang punya frame baru
+            batch = []
+            for session in sessions.values():
+                frame = session.read_frame()
+                if frame is not None:
+                    batch.append((session, frame))
+                else:
+                    session.send_if_due()
+            
+            if not batch:
+                time.sleep(0.01)
+                continue
+            
+            # DETEKSI YOLO: satu pemanggilan untuk seluruh batch, lalu handler
+            # ENTRANCE/DINING/CASHIER/KITCHEN milik masing-masing kamera
+            detect_and_process(backend, batch)
+    finally:
+        for session in sessions.values():
+            session.release()
+        if watcher is not None:
+            watcher.stop()
+        uploader.stop()
+
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
+    parser = argparse.ArgumentParser(description="AI Worker CCTV Restoran")
+    parser.add_argument("camera_id", type=int, nargs="?", help="ID kamera (mode satu kamera)")
+    parser.add_argument("branch_id", type=int, nargs="?", help="ID cabang pemilik kamera")
+    parser.add_argument("--branch", type=int, dest="supervisor_branch_id",
+                        help="Mode supervisor: jalankan semua kamera cabang ini dalam satu proses")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="Backend inferensi (default: env AI_INFERENCE_BACKEND atau 'torch')")
+    parser.add_argument("--model", dest="model_path",
+                        help="Path model (default: env AI_MODEL_PATH atau model bawaan backend)")
+    args = parser.parse_args()
+    
+    if args.supervisor_branch_id is not None:
+        run_supervisor(args.supervisor_branch_id, args.backend, args.model_path)
+    elif args.camera_id is not None and args.branch_id is not None:
+        run_worker(args.camera_id, args.branch_id, args.backend, args.model_path)
+    else:
         print("Penggunaan: python ai_worker.py [CAMERA_ID] [BRANCH_ID]")
+        print("       atau: python ai_worker.py --branch [BRANCH_ID]")
         sys.exit(1)
-    
-    # Ambil ID dari argumen command line
-    camera_id = int(sys.argv[1])
-    branch_id = int(sys.argv[2])
-    
-    run_worker(camera_id, branch_id)
\ No newline at end of file
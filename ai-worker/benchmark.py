@@ -0,0 +1,390 @@
+"""
+Benchmark offline AI Worker: memutar ulang video lokal (atau frame sintetis) melalui
+pipeline yang sama dengan run_worker (resize -> inferensi -> tracking -> processor area)
+tanpa kamera RTSP dan tanpa backend FastAPI.
+
+- Setiap kombinasi backend inferensi x tipe area dijalankan di proses terpisah, agar
+  peak RSS yang dilaporkan benar-benar milik kombinasi tersebut.
+- Latensi per tahap diambil dari histogram metrics.py yang sama dengan produksi
+  (lewat Histogram.recorder), sehingga angka benchmark dan /metrics sebanding.
+- Scheduler inferensi dilewati: setiap frame diinferensi, yang diukur adalah
+  throughput maksimum pipeline, bukan duty cycle motion gate.
+- Backend 'synthetic' menghasilkan deteksi dari posisi orang di frame sintetis,
+  untuk mengukur tracker & processor tanpa file model.
+
+Contoh:
+    python benchmark.py --frames 300 --backend synthetic
+    python benchmark.py --video rekaman.mp4 --backend torch onnx --area ENTRANCE DINING \\
+        --output hasil.json --baseline hasil_lama.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import cv2
+import numpy as np
+import supervision as sv
+
+import ai_worker
+from ai_worker import CameraSession, detect_and_process, FRAME_SIZE
+from inference_backends import create_backend, BACKENDS
+from metrics import STAGE_SECONDS, INFERENCE_SECONDS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+AREA_TYPES = ('ENTRANCE', 'DINING', 'CASHIER', 'KITCHEN')
+SYNTHETIC_BACKEND = "synthetic"
+WARMUP_FRAMES = 10  # Tidak dihitung: inisialisasi model, alokasi buffer pertama
+
+# Seragam staff sintetis (biru di HSV OpenCV) berlaku setiap hari
+UNIFORM_SCHEDULE = {
+    day: {'lower': [100, 150, 50], 'upper': [130, 255, 255]}
+    for day in ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY')
+}
+
+# ROI contoh per tipe area (koordinat 1280x720, format sama dengan roi_settings di database)
+BENCHMARK_ROI = {
+    'ENTRANCE': {'type': 'LINE', 'start': [0, 360], 'end': [1280, 360]},
+    'DINING': {'zones': [
+        {'id': f"T{row * 4 + col + 1}", 'capacity': 4,
+         'points': [[40 + col * 310, 40 + row * 340], [310 + col * 310, 40 + row * 340],
+                    [310 + col * 310, 340 + row * 340], [40 + col * 310, 340 + row * 340]]}
+        for row in range(2) for col in range(4)
+    ]},
+    'CASHIER': {'zones': [{'id': 'queue', 'points': [[400, 150], [900, 150], [900, 710], [400, 710]]}]},
+    'KITCHEN': {'zones': [{'id': 'kitchen', 'points': [[0, 0], [1280, 0], [1280, 720], [0, 720]]}],
+                'total_staff': 6},
+}
+
+
+# --- SUMBER FRAME ---
+
+class SyntheticSource:
+    """Frame sintetis: latar bertekstur + orang (persegi) yang bergerak dan memantul di tepi frame."""
+
+    def __init__(self, size=(1920, 1080), people=8, seed=0):
+        self.size = size
+        rng = np.random.default_rng(seed)
+        width, height = size
+        self.background = rng.integers(40, 90, (height, width, 3), dtype=np.uint8)
+        self.box_size = np.array([width * 0.05, height * 0.22])
+        self.positions = rng.uniform([0, 0], [width, height] - self.box_size, (people, 2))
+        self.velocities = rng.uniform(-0.01, 0.01, (people, 2)) * [width, height]
+        # Separuh orang berseragam staff (biru), sisanya pelanggan (merah)
+        self.colors = [(255, 0, 0) if i % 2 == 0 else (0, 0, 255) for i in range(people)]
+        self.fps = 25.0
+
+    def boxes(self, frame_size=None):
+        """Bounding box orang saat ini, diskalakan ke frame_size (default: ukuran sumber)."""
+        boxes = np.hstack([self.positions, self.positions + self.box_size])
+        if frame_size is not None:
+            boxes = boxes * np.tile(np.array(frame_size) / self.size, 2)
+        return boxes
+
+    def read(self):
+        limit = np.array(self.size) - self.box_size
+        self.positions += self.velocities
+        bounced = (self.positions < 0) | (self.positions > limit)
+        self.velocities[bounced] *= -1
+        self.positions = np.clip(self.positions, 0, limit)
+
+        frame = self.background.copy()
+        for (x1, y1, x2, y2), color in zip(self.boxes().astype(int), self.colors):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+        return frame
+
+    def describe(self):
+        return {"type": "synthetic", "size": list(self.size), "people": len(self.positions)}
+
+    def release(self):
+        pass
+
+
+class VideoSource:
+    """File video lokal, diputar ulang dari awal saat habis."""
+
+    def __init__(self, path):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Video tidak bisa dibuka: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def read(self):
+        success, frame = self.cap.read()
+        if not success:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.cap.read()
+            if not success:
+                raise ValueError(f"Video tidak berisi frame: {self.path}")
+        return frame
+
+    def describe(self):
+        return {"type": "video", "path": os.path.basename(self.path), "size": list(self.size), "fps": self.fps}
+
+    def release(self):
+        self.cap.release()
+
+
+def open_source(video=None, size=(1920, 1080), people=8):
+    return VideoSource(video) if video else SyntheticSource(size, people)
+
+
+# --- PENGGANTI KOMPONEN PRODUKSI ---
+
+class ReplayGrabber:
+    """Pengganti FrameGrabber: frame di-push oleh loop benchmark, bukan thread RTSP."""
+
+    def __init__(self, camera_id):
+        self.camera = str(camera_id)
+        self._frame = None
+        self._frame_time = None
+        self.decoded_frames = 0
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.connected = True
+
+    def push(self, frame, decode_seconds):
+        STAGE_SECONDS.observe(decode_seconds, self.camera, "capture")
+        self._frame, self._frame_time = frame, time.time()
+        self.decoded_frames += 1
+
+    def latest(self):
+        frame, self._frame = self._frame, None
+        return frame, self._frame_time
+
+    def read(self, timeout=None):
+        return self.latest()
+
+    def stop(self, timeout=None):
+        self.connected = False
+
+
+class AlwaysInfer:
+    """Pengganti InferenceScheduler: setiap frame diinferensi (throughput maksimum)."""
+
+    def __init__(self, target_fps):
+        self.target_fps = target_fps
+
+    def should_infer(self, frame, has_active_tracks=False, now=None):
+        return True
+
+
+class NullUploader:
+    """Pengganti AnalyticsUploader: hanya menghitung payload, tidak ada HTTP."""
+
+    queue_depth = 0
+    spool = ()
+
+    def __init__(self):
+        self.submitted = 0
+        self.snapshots = 0
+
+    def submit(self, camera_id, analytics_data, table_events=None):
+        self.submitted += 1
+
+    def submit_snapshot(self, camera_id, jpeg):
+        self.snapshots += 1
+
+    def stop(self, timeout=None):
+        pass
+
+
+class SyntheticBackend:
+    """Deteksi 'person' langsung dari posisi orang di SyntheticSource (tanpa model)."""
+
+    name = SYNTHETIC_BACKEND
+
+    def __init__(self, source):
+        if not isinstance(source, SyntheticSource):
+            raise ValueError("Backend 'synthetic' hanya bisa dipakai dengan frame sintetis (tanpa --video)")
+        self.source = source
+
+    def predict(self, frames):
+        boxes = self.source.boxes(FRAME_SIZE)
+        detections = sv.Detections(
+            xyxy=boxes.astype(np.float32),
+            confidence=np.full(len(boxes), 0.9, dtype=np.float32),
+            class_id=np.zeros(len(boxes), dtype=int),
+        )
+        return [detections for _ in frames]
+
+
+class BenchmarkSession(CameraSession):
+    """CameraSession produksi dengan grabber replay dan tanpa scheduler."""
+
+    def __init__(self, camera_id, config, uploader):
+        self.replay = ReplayGrabber(camera_id)
+        super().__init__(camera_id, config, uploader)
+        self.scheduler = AlwaysInfer(self.scheduler.target_fps)
+
+    def _start_grabber(self):
+        return self.replay
+
+
+# --- SATU KOMBINASI BACKEND x TIPE AREA ---
+
+def percentiles(samples):
+    values = np.asarray(samples) * 1000.0
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(backend_name, area_type, frames, video=None, size=(1920, 1080), people=8, model_path=None):
+    """Menjalankan satu kombinasi; dipanggil di proses anak agar peak RSS terisolasi."""
+    ai_worker.PREVIEW_PORT = 0
+    ai_worker.CHECKPOINTS = None
+    source = open_source(video, size, people)
+    backend = (SyntheticBackend(source) if backend_name == SYNTHETIC_BACKEND
+               else create_backend(backend_name, model_path))
+    uploader = NullUploader()
+    config = {
+        'rtsp_url': video or "synthetic", 'area_type': area_type,
+        'roi_settings': BENCHMARK_ROI[area_type], 'uniform_schedule': UNIFORM_SCHEDULE,
+    }
+    session = BenchmarkSession(1, config, uploader)
+
+    samples = {}
+    recording = False
+
+    def record(stage):
+        def recorder(value, labelvalues):
+            if recording:
+                samples.setdefault(stage or labelvalues[-1], []).append(value)
+        return recorder
+
+    STAGE_SECONDS.recorder = record(None)
+    INFERENCE_SECONDS.recorder = record("inference")
+
+    busy_seconds = 0.0
+    started = None
+    for index in range(WARMUP_FRAMES + frames):
+        if index == WARMUP_FRAMES:
+            recording, started = True, time.perf_counter()
+        decode_start = time.perf_counter()
+        raw_frame = source.read()
+        session.replay.push(raw_frame, time.perf_counter() - decode_start)
+
+        # Pipeline yang sama dengan run_worker: read_frame (resize) -> inferensi -> process
+        step_start = time.perf_counter()
+        frame = session.read_frame()
+        detect_and_process(backend, [(session, frame)])
+        if recording:
+            busy_seconds += time.perf_counter() - step_start
+    wall_seconds = time.perf_counter() - started
+
+    STAGE_SECONDS.recorder = INFERENCE_SECONDS.recorder = None
+    session.release()
+    source.release()
+
+    return {
+        "backend": backend_name,
+        "area_type": area_type,
+        "frames": frames,
+        # fps: throughput pipeline (tanpa decode/sintesis sumber, yang di produksi berjalan di thread grabber)
+        "fps": round(frames / busy_seconds, 2),
+        "wall_fps": round(frames / wall_seconds, 2),
+        "stages": {stage: percentiles(values) for stage, values in samples.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "uploads": uploader.submitted,
+    }
+
+
+# --- LAPORAN ---
+
+def print_report(results, baseline=None):
+    previous = {(run["backend"], run["area_type"]): run for run in (baseline or {}).get("runs", [])}
+    print(f"\n{'backend':<10} {'area':<9} {'fps':>8} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}  delta fps")
+    for run in results["runs"]:
+        if "error" in run:
+            print(f"{run['backend']:<10} {run['area_type']:<9} ❌ {run['error']}")
+            continue
+        total_p50 = sum(stage["p50_ms"] for name, stage in run["stages"].items() if name != "capture")
+        total_p99 = sum(stage["p99_ms"] for name, stage in run["stages"].items() if name != "capture")
+        old = previous.get((run["backend"], run["area_type"]))
+        delta = ""
+        if old and old.get("fps"):
+            delta = f"{(run['fps'] - old['fps']) / old['fps'] * 100:+.1f}%"
+        print(f"{run['backend']:<10} {run['area_type']:<9} {run['fps']:>8.1f} {total_p50:>8.2f} {total_p99:>8.2f} "
+              f"{run['peak_rss_mb'] if run['peak_rss_mb'] is not None else '-':>8}  {delta}")
+        for name, stage in run["stages"].items():
+            print(f"    {name:<10} p50 {stage['p50_ms']:>8.3f} ms   p99 {stage['p99_ms']:>8.3f} ms   n={stage['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline AI Worker")
+    parser.add_argument("--video", help="File video lokal (default: frame sintetis)")
+    parser.add_argument("--frames", type=int, default=300, help="Jumlah frame yang diukur per kombinasi")
+    parser.add_argument("--backend", nargs="+", default=[SYNTHETIC_BACKEND],
+                        choices=sorted(BACKENDS) + [SYNTHETIC_BACKEND], help="Backend inferensi yang diukur")
+    parser.add_argument("--model", dest="model_path", help="Path model (default: env AI_MODEL_PATH / bawaan backend)")
+    parser.add_argument("--area", nargs="+", default=list(AREA_TYPES), choices=AREA_TYPES,
+                        help="Tipe area (processor) yang diukur")
+    parser.add_argument("--size", default="1920x1080", help="Resolusi frame sintetis, cth. 1920x1080")
+    parser.add_argument("--people", type=int, default=8, help="Jumlah orang di frame sintetis")
+    parser.add_argument("--output", help="Tulis hasil JSON ke file ini")
+    parser.add_argument("--baseline", help="Hasil JSON sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+    source = open_source(args.video, size, args.people)
+    results = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(),
+                 "cpu_count": os.cpu_count(), "opencv": cv2.__version__},
+        "source": source.describe(),
+        "warmup_frames": WARMUP_FRAMES,
+        "runs": [],
+    }
+    source.release()
+
+    # Satu proses baru per kombinasi (spawn) -> peak RSS tidak tercampur antar backend/model
+    context = multiprocessing.get_context("spawn")
+    for backend_name in args.backend:
+        for area_type in args.area:
+            print(f"⏱️ {backend_name} / {area_type}: {args.frames} frame...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                future = pool.submit(run_case, backend_name, area_type, args.frames,
+                                     args.video, size, args.people, args.model_path)
+                try:
+                    results["runs"].append(future.result())
+                except Exception as e:
+                    print(f"❌ {backend_name} / {area_type} gagal: {e}")
+                    results["runs"].append({"backend": backend_name, "area_type": area_type, "error": str(e)})
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Hasil ditulis ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Checkpoint state runtime per kamera di disk lokal, agar restart worker (crash, update,
+reconnect) tidak mereset analitik.
+
+- Yang disimpan: hitungan garis ENTRANCE, status meja DINING (beserta sejak kapan) dan
+  event transisi yang belum terkirim, serta waktu masuk antrian CASHIER dan histogram waktu
+  tunggu selesai (queue_analytics.py) agar p50/p90 & served_per_minute tidak ikut reset.
+- Satu file JSON kecil per kamera (camera_<id>.json), ditulis atomik: tulis ke file .tmp
+  lalu os.replace, sehingga crash di tengah penulisan tidak pernah meninggalkan file rusak.
+  File per kamera membuat state tetap terbawa saat pindah antara mode per-kamera dan supervisor.
+- Saat start, checkpoint hanya dipakai jika umurnya <= max_age_seconds dan tipe areanya
+  masih sama; checkpoint yang rusak atau kedaluwarsa diabaikan.
+"""
+import json
+import os
+import time
+
+
+class CheckpointStore:
+    def __init__(self, directory, max_age_seconds=600):
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+
+    def _path(self, camera_id):
+        return os.path.join(self.directory, f"camera_{camera_id}.json")
+
+    def save(self, camera_id, state):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(camera_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**state, "saved_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, camera_id):
+        """State checkpoint terakhir kamera ini, atau None jika tidak ada / rusak / terlalu lama."""
+        try:
+            with open(self._path(camera_id)) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            print(f"⚠️ Checkpoint Kamera {camera_id} rusak, diabaikan.")
+            return None
+        age = time.time() - state.get("saved_at", 0)
+        if age > self.max_age_seconds:
+            print(f"⚠️ Checkpoint Kamera {camera_id} sudah {age:.0f} detik, diabaikan.")
+            return None
+        return state
@@ -0,0 +1,125 @@
+"""
+Hot-reload konfigurasi kamera (RTSP, ROI, jadwal seragam) tanpa restart worker.
+
+Thread latar mem-poll endpoint konfigurasi FastAPI dengan If-None-Match: selama
+konfigurasi tidak berubah backend cukup membalas 304 tanpa body. Konfigurasi yang
+berubah disimpan sebagai "pending" dan diambil loop deteksi dengan pop_changes()
+di antara dua frame, sehingga penggantian zona/garis/jadwal selalu atomik terhadap
+pemrosesan frame (tracker dan model YOLO tetap dipakai).
+"""
+import threading
+import requests
+
+
+def merge_branch_config(camera_config, branch_config):
+    """Konfigurasi kamera + jadwal seragam & kapasitas cabang (format yang dipakai CameraSession)."""
+    config = dict(camera_config)
+    config['uniform_schedule'] = branch_config.get('uniform_schedule', {})
+    config['total_seating_capacity'] = branch_config.get('total_seating_capacity', 100)
+    return config
+
+
+class ConfigWatcher:
+    """
+    Mem-poll konfigurasi kamera secara berkala.
+    camera_ids=None -> mode supervisor: seluruh kamera cabang (kamera baru / dihapus ikut terdeteksi).
+    """
+
+    def __init__(self, api_url_root, branch_id, camera_ids=None, initial_configs=None,
+                 interval=10.0, get_access_token=None):
+        self.api_url_root = api_url_root
+        self.branch_id = branch_id
+        self.camera_ids = list(camera_ids) if camera_ids is not None else None
+        self.interval = interval
+        self.get_access_token = get_access_token or (lambda: None)
+
+        self.session = requests.Session()
+        self._responses = {}  # {path: (etag, json)} respons terakhir per endpoint
+        self._configs = dict(initial_configs or {})  # {camera_id: config yang sedang dipakai worker}
+        self._pending = {}    # {camera_id: config baru, atau None jika kamera dihapus}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Statistik
+        self.polls = 0
+        self.not_modified = 0
+        self.changes = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pop_changes(self):
+        """Dipanggil loop deteksi di antara frame: {camera_id: config | None} yang berubah sejak panggilan terakhir."""
+        if not self._pending:
+            return {}
+        with self._lock:
+            changes, self._pending = self._pending, {}
+        return changes
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except requests.exceptions.RequestException as e:
+                # Backend tidak bisa dihubungi: tetap memakai konfigurasi yang ada
+                print(f"⚠️ Gagal mengecek perubahan konfigurasi: {e}")
+
+    def _get(self, path):
+        """GET dengan If-None-Match; 304 memakai body yang disimpan. None jika 404."""
+        headers = {}
+        token = self.get_access_token()
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        cached = self._responses.get(path)
+        if cached is not None and cached[0]:
+            headers["If-None-Match"] = cached[0]
+
+        response = self.session.get(f"{self.api_url_root}{path}", headers=headers, timeout=5)
+        self.polls += 1
+        if response.status_code == 304 and cached is not None:
+            self.not_modified += 1
+            return cached[1]
+        if response.status_code == 404:
+            self._responses.pop(path, None)
+            return None
+        response.raise_for_status()
+        body = response.json()
+        self._responses[path] = (response.headers.get("ETag"), body)
+        return body
+
+    def poll(self):
+        """Satu putaran pengecekan; mengembalikan jumlah kamera yang konfigurasinya berubah."""
+        branch = self._get(f"branches/{self.branch_id}")
+        if branch is None:
+            return 0
+
+        if self.camera_ids is None:
+            cameras = self._get(f"branches/{self.branch_id}/cameras") or []
+        else:
+            cameras = [cam for cam in (self._get(f"cameras/{cid}") for cid in self.camera_ids) if cam]
+        latest = {cam['id']: merge_branch_config(cam, branch) for cam in cameras}
+
+        changes = {cid: config for cid, config in latest.items() if self._configs.get(cid) != config}
+        if self.camera_ids is None:
+            # Kamera yang dihapus dari cabang (hanya mode supervisor)
+            changes.update({cid: None for cid in self._configs if cid not in latest})
+        if not changes:
+            return 0
+
+        for cid, config in changes.items():
+            if config is None:
+                self._configs.pop(cid, None)
+            else:
+                self._configs[cid] = config
+        with self._lock:
+            self._pending.update(changes)
+        self.changes += len(changes)
+        return len(changes)
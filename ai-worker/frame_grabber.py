@@ -0,0 +1,125 @@
+"""
+Capture stage untuk AI Worker.
+
+Stream RTSP di-decode terus-menerus di thread latar dan hanya frame TERBARU yang
+disimpan (buffer satu slot). Loop deteksi selalu mengambil frame paling segar,
+sehingga analitik tidak tertinggal walaupun inferensi lebih lambat dari FPS kamera.
+"""
+import threading
+import time
+import cv2
+
+
+class FrameGrabber:
+    """Thread capture RTSP dengan buffer satu slot dan reconnect exponential backoff."""
+
+    def __init__(self, rtsp_url, initial_backoff=1.0, max_backoff=60.0, on_frame=None):
+        self.rtsp_url = rtsp_url
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.on_frame = on_frame  # Callback opsional on_frame(detik_read_decode) untuk instrumentasi
+
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Buffer satu slot
+        self._frame = None
+        self._frame_time = None
+        self._frame_seq = 0  # Nomor urut frame terakhir yang di-decode
+        self._read_seq = 0   # Nomor urut frame terakhir yang diambil konsumen
+
+        # Statistik
+        self.decoded_frames = 0
+        self.dropped_frames = 0  # Frame yang tertimpa sebelum sempat diambil konsumen
+        self.reconnects = 0
+        self.connected = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"grabber:{self.rtsp_url}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.rtsp_url)
+        # Minta backend OpenCV menyimpan sesedikit mungkin frame di buffer internal
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _run(self):
+        cap = None
+        backoff = self.initial_backoff
+
+        while not self._stop_event.is_set():
+            if cap is None:
+                cap = self._open()
+
+            read_started = time.perf_counter()
+            ret, frame = cap.read() if cap.isOpened() else (False, None)
+            if not ret:
+                # Auto-reconnect dengan exponential backoff (tidak memblokir loop deteksi)
+                self.connected = False
+                cap.release()
+                cap = None
+                print(f"⚠️ Stream terputus, reconnect dalam {backoff:.1f} detik: {self.rtsp_url}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                self.reconnects += 1
+                continue
+
+            self.connected = True
+            backoff = self.initial_backoff
+            if self.on_frame is not None:
+                self.on_frame(time.perf_counter() - read_started)
+
+            with self._cond:
+                if self._frame_seq > self._read_seq:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self._frame_time = time.time()
+                self._frame_seq += 1
+                self.decoded_frames += 1
+                self._cond.notify_all()
+
+        if cap is not None:
+            cap.release()
+
+    def _take(self):
+        self._read_seq = self._frame_seq
+        return self._frame, self._frame_time
+
+    def read(self, timeout=None):
+        """
+        Menunggu frame yang lebih baru dari frame terakhir yang diambil.
+        Mengembalikan (frame, waktu_capture) atau (None, None) jika timeout.
+        """
+        with self._cond:
+            has_new = self._cond.wait_for(
+                lambda: self._frame_seq > self._read_seq or self._stop_event.is_set(), timeout
+            )
+            if not has_new or self._frame_seq == self._read_seq:
+                return None, None
+            return self._take()
+
+    def latest(self):
+        """Versi non-blocking dari read(): (None, None) jika belum ada frame baru."""
+        with self._cond:
+            if self._frame_seq == self._read_seq:
+                return None, None
+            return self._take()
+
+    @property
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "decoded_frames": self.decoded_frames,
+            "dropped_frames": self.dropped_frames,
+            "reconnects": self.reconnects,
+        }
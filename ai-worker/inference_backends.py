@@ -0,0 +1,224 @@
+"""
+Backend inferensi YOLO untuk AI Worker: PyTorch (default), ONNX Runtime, dan OpenVINO.
+
+Dipilih lewat env AI_INFERENCE_BACKEND (torch/onnx/openvino) atau flag --backend.
+Backend ONNX/OpenVINO memuat model hasil export ultralytics, contoh:
+
+    yolo export model=yolov8n.pt format=onnx dynamic=True simplify=True
+    yolo export model=yolov8n.pt format=openvino dynamic=True
+
+Untuk backend hasil export, letterbox dan NMS kelas 'person' dikerjakan di NumPy,
+sehingga worker tidak perlu meng-import torch dan hasilnya tetap sv.Detections.
+"""
+import os
+import glob
+import numpy as np
+import cv2
+import supervision as sv
+
+PERSON_CLASS_ID = 0
+CONFIDENCE_THRESHOLD = 0.25  # Sama dengan default ultralytics
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+
+DEFAULT_MODEL_PATHS = {
+    "torch": "yolov8n.pt",
+    "onnx": "yolov8n.onnx",
+    "openvino": "yolov8n_openvino_model",
+}
+
+
+# --- PRE/POST-PROCESSING (NUMPY) ---
+
+def letterbox(frame, size):
+    """Resize dengan rasio tetap lalu padding abu-abu (114) ke size x size."""
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    bottom, right = size - new_h - top, size - new_w - left
+    padded = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, scale, (left, top)
+
+
+def preprocess(frames, size):
+    """List frame BGR -> tensor NCHW float32 RGB [0..1] beserta info letterbox per frame."""
+    batch = np.empty((len(frames), 3, size, size), dtype=np.float32)
+    metas = []
+    for i, frame in enumerate(frames):
+        padded, scale, pad = letterbox(frame, size)
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1)
+        metas.append((scale, pad, frame.shape[:2]))
+    batch /= 255.0
+    return batch, metas
+
+
+def nms(boxes, scores, iou_threshold):
+    """Non-Maximum Suppression greedy; mengembalikan indeks box yang dipertahankan."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def postprocess(output, metas, conf_threshold=CONFIDENCE_THRESHOLD, iou_threshold=IOU_THRESHOLD):
+    """Output mentah YOLOv8 (N, 4+kelas, anchor) -> list sv.Detections (hanya 'person')."""
+    detections = []
+    for prediction, (scale, (pad_x, pad_y), (frame_h, frame_w)) in zip(output, metas):
+        # Sama seperti ultralytics (classes=[0]): box dihitung 'person' hanya jika kelas
+        # dengan skor tertingginya adalah 'person'
+        candidates = np.flatnonzero(prediction[4 + PERSON_CLASS_ID] > conf_threshold)
+        candidates = candidates[prediction[4:, candidates].argmax(axis=0) == PERSON_CLASS_ID]
+        scores = prediction[4 + PERSON_CLASS_ID, candidates]
+        cx, cy, w, h = prediction[:4, candidates]
+
+        if scores.size > MAX_DETECTIONS * 10:
+            top = np.argpartition(-scores, MAX_DETECTIONS * 10)[:MAX_DETECTIONS * 10]
+            scores, cx, cy, w, h = scores[top], cx[top], cy[top], w[top], h[top]
+
+        xyxy = np.column_stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+        keep = nms(xyxy, scores, iou_threshold)[:MAX_DETECTIONS]
+        xyxy, scores = xyxy[keep], scores[keep]
+
+        # Kembalikan koordinat ke ruang frame asli
+        xyxy = (xyxy - [pad_x, pad_y, pad_x, pad_y]) / scale
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, frame_w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, frame_h)
+
+        detections.append(sv.Detections(
+            xyxy=xyxy.astype(np.float32),
+            confidence=scores.astype(np.float32),
+            class_id=np.full(len(keep), PERSON_CLASS_ID, dtype=int),
+            data={"class_name": np.array(["person"] * len(keep))},
+        ))
+    return detections
+
+
+# --- BACKENDS ---
+
+class InferenceBackend:
+    """Antarmuka backend: predict(list frame BGR) -> list sv.Detections (kelas 'person')."""
+    name = None
+
+    def predict(self, frames):
+        raise NotImplementedError
+
+
+class UltralyticsBackend(InferenceBackend):
+    """Default: ultralytics YOLO di PyTorch."""
+    name = "torch"
+
+    def __init__(self, model_path, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD):
+        from ultralytics import YOLO  # Import torch yang berat hanya jika backend ini dipakai
+        self.model = YOLO(model_path)
+        self.conf = conf
+        self.iou = iou
+
+    def predict(self, frames):
+        results = self.model(frames, classes=[PERSON_CLASS_ID], conf=self.conf, iou=self.iou, verbose=False)
+        return [sv.Detections.from_ultralytics(result) for result in results]
+
+
+class ExportedModelBackend(InferenceBackend):
+    """Basis untuk model hasil export (input NCHW tetap, output YOLOv8 mentah)."""
+    imgsz = 640
+    dynamic_batch = False
+
+    def __init__(self, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD):
+        self.conf = conf
+        self.iou = iou
+
+    def _infer(self, batch):
+        raise NotImplementedError
+
+    def predict(self, frames):
+        if not frames:
+            return []
+        batch, metas = preprocess(frames, self.imgsz)
+        if self.dynamic_batch:
+            output = self._infer(batch)
+        else:
+            # Model di-export dengan batch tetap = 1
+            output = np.concatenate([self._infer(batch[i:i + 1]) for i in range(len(batch))])
+        return postprocess(output, metas, self.conf, self.iou)
+
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    name = "onnx"
+
+    def __init__(self, model_path, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD, threads=None):
+        super().__init__(conf, iou)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height, _ = model_input.shape
+        self.dynamic_batch = not isinstance(batch_dim, int)
+        if isinstance(height, int):
+            self.imgsz = height
+
+    def _infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(ExportedModelBackend):
+    name = "openvino"
+
+    def __init__(self, model_path, conf=CONFIDENCE_THRESHOLD, iou=IOU_THRESHOLD, device="CPU"):
+        super().__init__(conf, iou)
+        import openvino as ov
+
+        if os.path.isdir(model_path):
+            # Folder hasil `yolo export format=openvino` berisi satu file .xml
+            model_path = glob.glob(os.path.join(model_path, "*.xml"))[0]
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        input_shape = model.input(0).get_partial_shape()
+        self.dynamic_batch = input_shape[0].is_dynamic
+        if input_shape[2].is_static:
+            self.imgsz = input_shape[2].get_length()
+
+        self.compiled_model = core.compile_model(model, device)
+        self.output = self.compiled_model.output(0)
+
+    def _infer(self, batch):
+        return self.compiled_model(batch)[self.output]
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+def create_backend(name=None, model_path=None):
+    """Membuat backend dari argumen, atau env AI_INFERENCE_BACKEND / AI_MODEL_PATH."""
+    name = (name or os.environ.get("AI_INFERENCE_BACKEND", "torch")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Backend inferensi tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
+
+    model_path = model_path or os.environ.get("AI_MODEL_PATH") or DEFAULT_MODEL_PATHS[name]
+    backend = BACKENDS[name](model_path)
+    print(f"✅ Backend inferensi '{name}' dimuat dari {model_path}")
+    return backend
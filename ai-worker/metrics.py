@@ -0,0 +1,187 @@
+"""
+Instrumentasi AI Worker dalam format teks Prometheus (tanpa dependency tambahan).
+
+- Histogram dengan bucket tetap: observe() hanya bisect + dua penjumlahan, cukup murah
+  untuk dipanggil di setiap frame dan dibiarkan aktif di produksi.
+- Metrik "callback" dibaca saat /metrics di-scrape (statistik FrameGrabber, kedalaman
+  antrian uploader, FPS), sehingga tidak ada biaya apa pun di loop deteksi.
+- Dilayani oleh server HTTP worker (worker_http.py) di GET /metrics.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Bucket latensi (detik): 1 ms sampai 10 detik
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "sum", "count", "lock")
+
+    def __init__(self, bucket_count):
+        self.counts = [0] * (bucket_count + 1)  # +1 untuk bucket +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+
+class Histogram:
+    """Histogram Prometheus dengan label; satu child per kombinasi label."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        # Opsional recorder(value, labelvalues) untuk menyimpan sampel mentah (dipakai benchmark.py)
+        self.recorder = None
+
+    def _child(self, values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, _HistogramChild(len(self.buckets)))
+        return child
+
+    def observe(self, value, *labelvalues):
+        child = self._child(labelvalues)
+        index = bisect.bisect_left(self.buckets, value)
+        with child.lock:
+            child.counts[index] += 1
+            child.sum += value
+            child.count += 1
+        if self.recorder is not None:
+            self.recorder(value, labelvalues)
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            with child.lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (f"{self.name}_bucket", self.labelnames + ("le",), values + (le,), cumulative)
+            yield (f"{self.name}_sum", self.labelnames, values, total)
+            yield (f"{self.name}_count", self.labelnames, values, count)
+
+
+class Counter:
+    """Counter Prometheus dengan label."""
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in values:
+            yield (self.name, self.labelnames, labelvalues, value)
+
+
+class CallbackMetric:
+    """Gauge/counter yang nilainya diambil dari callback saat scrape: callback() -> {label_values: nilai}."""
+
+    def __init__(self, name, documentation, labelnames=(), callback=None, type="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.type = type
+
+    def samples(self):
+        for labelvalues, value in (self.callback() or {}).items():
+            yield (self.name, self.labelnames, labelvalues, value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Seluruh metrik dalam format teks Prometheus (text/plain; version=0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            try:
+                for name, labelnames, labelvalues, value in metric.samples():
+                    lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {float(value)!r}")
+            except Exception as e:
+                # Callback yang gagal tidak boleh membuat seluruh /metrics gagal
+                lines.append(f"# ERROR {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# --- METRIK AI WORKER ---
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ai_worker_stage_seconds",
+    "Durasi per tahap pipeline per kamera (capture, schedule, resize, tracking, analytics).",
+    ("camera", "stage"),
+))
+INFERENCE_SECONDS = REGISTRY.register(Histogram(
+    "ai_worker_inference_seconds",
+    "Durasi satu pemanggilan backend inferensi (satu batch frame).",
+    ("backend",),
+))
+FRAME_AGE_SECONDS = REGISTRY.register(Histogram(
+    "ai_worker_frame_age_seconds",
+    "Umur frame (sejak di-decode) saat hasil analitiknya selesai dihitung.",
+    ("camera",),
+))
+UPLOAD_SECONDS = REGISTRY.register(Histogram(
+    "ai_worker_upload_seconds",
+    "Durasi POST batch analitik ke backend.",
+))
+FRAMES_TOTAL = REGISTRY.register(Counter(
+    "ai_worker_frames_total",
+    "Frame yang diambil dari grabber, per hasil keputusan scheduler (inferred/skipped).",
+    ("camera", "result"),
+))
+UPLOADS_TOTAL = REGISTRY.register(Counter(
+    "ai_worker_uploads_total",
+    "Percobaan kirim batch analitik per hasil (sent/rejected/failed).",
+    ("result",),
+))
+UPLOAD_BYTES_TOTAL = REGISTRY.register(Counter(
+    "ai_worker_upload_bytes_total",
+    "Byte body batch analitik yang dikirim ke backend, per format kirim (misal msgpack+zstd).",
+    ("encoding",),
+))
@@ -0,0 +1,199 @@
+"""
+Processor analitik per kamera, satu kelas per tipe area (ENTRANCE/DINING/CASHIER/KITCHEN).
+
+Setiap CameraSession memiliki satu processor yang dibuat oleh create_processor()
+berdasarkan area_type. Processor memegang SEMUA state antar frame milik kameranya:
+tracker ByteTrack (hanya untuk area yang butuh ID track), zona ROI yang sudah
+dikompilasi (ZoneRegistry), hitungan garis, state meja, dan waktu masuk antrian.
+Tidak ada state analitik di level modul, sehingga banyak kamera dalam satu proses
+(mode supervisor) tidak pernah berbagi ID tracker atau ID meja.
+
+Hot-reload ROI memanggil configure() pada processor yang sama (state dipertahankan);
+perubahan tipe area membuat processor baru (state area lama tidak berlaku).
+"""
+import supervision as sv
+
+from queue_analytics import QueueAnalytics
+from table_states import TableStateMachine
+from zones import ZoneRegistry
+
+
+class AreaProcessor:
+    """Processor dasar: tanpa analitik (tipe area tidak dikenal)."""
+
+    area_type = None
+    tracked = False  # True: deteksi diberi tracker_id oleh ByteTrack sebelum process()
+
+    def __init__(self, roi_settings, frame_size, target_fps, staff_classifier):
+        self.frame_size = frame_size
+        self.staff_classifier = staff_classifier
+        # frame_rate tracker = FPS inferensi, agar buffer track hilang tetap setara ~1 detik
+        self.tracker = sv.ByteTrack(frame_rate=target_fps) if self.tracked else None
+        self.configure(roi_settings)
+
+    def configure(self, roi_settings):
+        """Menerapkan roi_settings (awal & hot-reload). Poligon dikompilasi sekali di sini, bukan per frame."""
+        self.roi_settings = roi_settings
+        self.zones = ZoneRegistry.from_roi_settings(roi_settings, self.frame_size)
+
+    def track(self, detections):
+        return self.tracker.update_with_detections(detections)
+
+    def has_active_tracks(self):
+        """True jika ByteTrack masih memegang track (aktif maupun yang baru hilang)."""
+        return self.tracker is not None and bool(getattr(self.tracker, 'tracked_tracks', None) or
+                                                 getattr(self.tracker, 'lost_tracks', None))
+
+    def process(self, frame, detections, now):
+        return {}
+
+    def overlay(self, overlay):
+        """Menambahkan gambar zona/garis ke data overlay preview."""
+        overlay["polygons"] = [zone['points'] for zone in self.zones.zones]
+        return overlay
+
+    def drain_events(self):
+        """Event yang ikut dikirim bersama payload analitik berikutnya."""
+        return []
+
+    def checkpoint_state(self):
+        return {}
+
+    def restore(self, state):
+        pass
+
+
+class EntranceProcessor(AreaProcessor):
+    """Pintu Masuk: Line Crossing Counter (detections sudah diberi tracker_id)."""
+
+    area_type = 'ENTRANCE'
+    tracked = True
+
+    def configure(self, roi_settings):
+        # Hitungan garis lama dibawa sebagai offset agar people_in/out tidak reset saat garis diubah
+        line_zone = getattr(self, 'line_zone', None)
+        self.count_offset = getattr(self, 'count_offset', (0, 0))
+        if line_zone is not None:
+            self.count_offset = (self.count_offset[0] + line_zone.in_count, self.count_offset[1] + line_zone.out_count)
+        super().configure(roi_settings)
+        self.line_zone = None
+        if roi_settings.get('type') == 'LINE':
+            self.line_zone = sv.LineZone(start=sv.Point(*roi_settings['start']), end=sv.Point(*roi_settings['end']))
+
+    def counts(self):
+        if self.line_zone is None:
+            return self.count_offset
+        return self.count_offset[0] + self.line_zone.in_count, self.count_offset[1] + self.line_zone.out_count
+
+    def process(self, frame, detections, now):
+        if self.line_zone is None:
+            return {}
+        self.line_zone.trigger(detections)
+        people_in, people_out = self.counts()
+        return {"people_in": people_in, "people_out": people_out}
+
+    def overlay(self, overlay):
+        overlay = super().overlay(overlay)
+        if self.line_zone is not None:
+            # Angka yang sama dengan yang dikirim & di-checkpoint (termasuk offset hot-reload/restore)
+            overlay["line"] = (tuple(self.roi_settings['start']), tuple(self.roi_settings['end']), *self.counts())
+        return overlay
+
+    def checkpoint_state(self):
+        return {"line_counts": list(self.counts())}
+
+    def restore(self, state):
+        # Dipanggil sebelum frame pertama: LineZone masih nol, hitungan checkpoint menjadi offset
+        self.count_offset = tuple(state.get("line_counts", (0, 0)))
+
+
+class DiningProcessor(AreaProcessor):
+    """Area Makan: Multi-Polygon Meja & Status Kotor/Bersih (State Machine dengan debounce, table_states.py)."""
+
+    area_type = 'DINING'
+
+    def __init__(self, roi_settings, frame_size, target_fps, staff_classifier):
+        self.table_states = TableStateMachine()  # Status meja + event transisi yang belum dikirim
+        super().__init__(roi_settings, frame_size, target_fps, staff_classifier)
+
+    def configure(self, roi_settings):
+        super().configure(roi_settings)
+        # Meja yang dihapus dari ROI tidak perlu disimpan state-nya lagi
+        self.table_states.retain(self.zones.zone_ids)
+        self.capacities = [zone.get('capacity', 4) for zone in self.zones.zones]
+
+    def process(self, frame, detections, now):
+        # Semua deteksi diuji terhadap semua meja sekaligus, Staff/Customer diklasifikasi sekali per frame
+        in_zone = self.zones.trigger(detections)
+        is_staff = self.staff_classifier.classify(frame, detections.xyxy)
+        staff_counts = (in_zone & is_staff[:, None]).sum(axis=0)
+        people_counts = in_zone.sum(axis=0)
+
+        total_customers = 0
+        tables_data = []
+        for zone_index, table_id in enumerate(self.zones.zone_ids):
+            staff_count = int(staff_counts[zone_index])
+            customer_count = int(people_counts[zone_index]) - staff_count
+            # LOGIKA PERUBAHAN STATUS MEJA (transisi dicatat sebagai event oleh state machine)
+            status = self.table_states.update(table_id, customer_count, staff_count, now)
+            total_customers += customer_count
+            tables_data.append({
+                "id": table_id, "status": status, "people_count": customer_count,
+                "capacity": self.capacities[zone_index],
+            })
+        return {"total_customers": total_customers, "tables": tables_data}
+
+    def drain_events(self):
+        return self.table_states.drain_events()
+
+    def checkpoint_state(self):
+        return {"table_states": self.table_states.export()}
+
+    def restore(self, state):
+        self.table_states.restore(state.get("table_states", {}))
+        self.table_states.retain(self.zones.zone_ids)
+
+
+class CashierProcessor(AreaProcessor):
+    """Kasir: Antrian & Waktu Tunggu (Tracking ID; detections sudah diberi tracker_id, queue_analytics.py)."""
+
+    area_type = 'CASHIER'
+    tracked = True
+
+    def __init__(self, roi_settings, frame_size, target_fps, staff_classifier):
+        self.queue = QueueAnalytics()  # Track antrian (dengan grace & re-asosiasi) + statistik waktu tunggu selesai
+        super().__init__(roi_settings, frame_size, target_fps, staff_classifier)
+
+    def process(self, frame, detections, now):
+        if not self.zones:
+            return {"queue_length": 0, "wait_time_avg": 0}
+        people_in_queue = detections[self.zones.trigger(detections)[:, 0]]
+        return self.queue.update(people_in_queue.tracker_id, people_in_queue.xyxy, now)
+
+    def checkpoint_state(self):
+        return self.queue.export()
+
+    def restore(self, state):
+        self.queue.restore(state)
+
+
+class KitchenProcessor(AreaProcessor):
+    """Dapur: Deteksi Staf Aktif di Area Kerja."""
+
+    area_type = 'KITCHEN'
+
+    def process(self, frame, detections, now):
+        total_scheduled = self.roi_settings.get('total_staff', 6)
+        if not self.zones:
+            return {"staff_active_count": 0, "staff_total_scheduled": 6}
+        people_in_zone = detections[self.zones.trigger(detections)[:, 0]]
+        active_staff_count = int(self.staff_classifier.classify(frame, people_in_zone.xyxy).sum())
+        return {"staff_active_count": active_staff_count, "staff_total_scheduled": total_scheduled}
+
+
+PROCESSORS = {cls.area_type: cls for cls in (EntranceProcessor, DiningProcessor, CashierProcessor, KitchenProcessor)}
+
+
+def create_processor(area_type, roi_settings, frame_size, target_fps, staff_classifier):
+    """Factory processor berdasarkan area_type (tipe tidak dikenal -> processor tanpa analitik)."""
+    return PROCESSORS.get(area_type, AreaProcessor)(roi_settings, frame_size, target_fps, staff_classifier)
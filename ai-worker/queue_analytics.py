@@ -0,0 +1,197 @@
+"""
+Analitik antrian CASHIER: waktu tunggu per orang, statistik waktu tunggu selesai, dan throughput.
+
+- Setiap track di zona antrian menyimpan waktu masuk, terakhir terlihat, dan posisi terakhir.
+  Track yang tidak terlihat baru dikeluarkan setelah GRACE_SECONDS, sehingga oklusi singkat
+  (orang lewat di depan kamera, deteksi terlewat) tidak mereset waktu tunggunya.
+- Re-asosiasi: jika ByteTrack memberi ID baru untuk orang yang sama, ID baru mewarisi waktu
+  masuk track hilang terdekat (dalam REASSOCIATE_MAX_DISTANCE piksel) yang masih dalam grace.
+- Track yang keluar setelah antri >= MIN_QUEUE_SECONDS dihitung "terlayani": lama tunggunya
+  masuk histogram (bucket WAIT_BUCKET_SECONDS) per slot 1 menit di ring buffer. Update O(1);
+  p50/p90 per jendela geser (WINDOWS) dihitung dari jumlah slot, hanya saat histogram berubah
+  atau menit berganti.
+- Orang yang masih antri tetap dilaporkan lewat queue_length & wait_time_avg seperti sebelumnya.
+"""
+import math
+import time
+
+import numpy as np
+
+GRACE_SECONDS = 3.0               # Lama track boleh tidak terlihat sebelum dianggap keluar antrian
+REASSOCIATE_MAX_DISTANCE = 150.0  # Jarak maks (piksel, FRAME_SIZE) ID baru ke track hilang untuk mewarisi waktu masuk
+MIN_QUEUE_SECONDS = 5.0           # Di bawah ini dianggap hanya lewat zona antrian, bukan dilayani
+RESTORE_GRACE_SECONDS = 15        # Track antrian baru setelah restart mewarisi waktu masuk dari checkpoint
+
+WAIT_BUCKET_SECONDS = 5           # Resolusi histogram waktu tunggu
+MAX_WAIT_SECONDS = 3600           # Bucket terakhir menampung semua tunggu >= batas ini
+SLOT_SECONDS = 60                 # Granularitas jendela geser
+WINDOWS = {"5m": 300, "15m": 900}  # Jendela p50/p90 waktu tunggu selesai
+THROUGHPUT_WINDOW = "5m"           # Jendela served_per_minute
+
+
+class _QueueEntry:
+    __slots__ = ("entered", "last_seen", "x", "y")
+
+    def __init__(self, entered, last_seen, x, y):
+        self.entered = entered
+        self.last_seen = last_seen
+        self.x = x
+        self.y = y
+
+
+class WaitHistogram:
+    """Histogram waktu tunggu per slot menit dalam ring buffer: counts[slot, bucket]."""
+
+    def __init__(self, max_window_seconds=max(WINDOWS.values())):
+        self.slot_count = math.ceil(max_window_seconds / SLOT_SECONDS)
+        self.bucket_count = MAX_WAIT_SECONDS // WAIT_BUCKET_SECONDS + 1
+        self.counts = np.zeros((self.slot_count, self.bucket_count), dtype=np.int32)
+        self.slot_minutes = np.full(self.slot_count, -1, dtype=np.int64)  # Menit yang sedang ditampung tiap slot
+        self.version = 0
+
+    def add(self, wait_seconds, now, count=1):
+        minute = int(now // SLOT_SECONDS)
+        slot = minute % self.slot_count
+        if self.slot_minutes[slot] != minute:
+            # Slot berisi menit lama yang sudah keluar dari semua jendela: dipakai ulang
+            self.counts[slot] = 0
+            self.slot_minutes[slot] = minute
+        self.counts[slot, min(int(wait_seconds // WAIT_BUCKET_SECONDS), self.bucket_count - 1)] += count
+        self.version += 1
+
+    def window(self, seconds, now):
+        """Jumlah per bucket untuk slot menit dalam `seconds` terakhir (termasuk menit berjalan)."""
+        minute = int(now // SLOT_SECONDS)
+        slots = math.ceil(seconds / SLOT_SECONDS)
+        valid = (self.slot_minutes > minute - slots) & (self.slot_minutes <= minute)
+        return self.counts[valid].sum(axis=0)
+
+    @staticmethod
+    def percentile(histogram, p):
+        """Batas atas bucket tempat persentil p jatuh (detik), atau None jika kosong."""
+        cumulative = np.cumsum(histogram)
+        if not cumulative.size or not cumulative[-1]:
+            return None
+        bucket = int(np.searchsorted(cumulative, p * cumulative[-1]))
+        return (bucket + 1) * WAIT_BUCKET_SECONDS
+
+    def export(self):
+        """[[menit, bucket, jumlah]] untuk sel yang tidak nol (ringkas untuk checkpoint)."""
+        slots, buckets = np.nonzero(self.counts)
+        return [[int(self.slot_minutes[s]), int(b), int(self.counts[s, b])] for s, b in zip(slots, buckets)]
+
+    def restore(self, cells, now):
+        minute = int(now // SLOT_SECONDS)
+        for cell_minute, bucket, count in cells:
+            if minute - self.slot_count < cell_minute <= minute:
+                self.add(bucket * WAIT_BUCKET_SECONDS, cell_minute * SLOT_SECONDS, count)
+
+
+class QueueAnalytics:
+    """State antrian satu kamera kasir: track aktif/hilang, histogram waktu tunggu selesai, dan throughput."""
+
+    def __init__(self, now=None):
+        self.started = time.time() if now is None else now
+        self._entries = {}  # {tracker_id: _QueueEntry}, termasuk track hilang yang masih dalam grace
+        self._histogram = WaitHistogram()
+        self._stats_key = None
+        self._stats = {}
+        # Waktu masuk dari checkpoint (urut lama -> baru); setelah restart ID tracker berubah,
+        # sehingga track baru di antrian mewarisi waktu masuk tertua yang tersisa
+        self._restored = []
+        self._restore_deadline = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def update(self, tracker_ids, xyxy, now):
+        """Satu frame: ID track & kotak orang di zona antrian. Mengembalikan analitik antrian."""
+        if self._restored and now > self._restore_deadline:
+            self._restored = []
+
+        # Titik tengah bawah kotak (posisi kaki) untuk re-asosiasi
+        xs = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        ys = xyxy[:, 3]
+        visible = []
+        new_tracks = []
+        for index, track_id in enumerate(tracker_ids.tolist()):
+            entry = self._entries.get(track_id)
+            if entry is None:
+                new_tracks.append((index, track_id))
+                continue
+            entry.last_seen, entry.x, entry.y = now, xs[index], ys[index]
+            visible.append(entry)
+        for index, track_id in new_tracks:
+            entered = self._reassociate(xs[index], ys[index], now)
+            if entered is None:
+                entered = self._restored.pop(0) if self._restored else now
+            entry = self._entries[track_id] = _QueueEntry(entered, now, xs[index], ys[index])
+            visible.append(entry)
+
+        # Hanya dipindai jika ada track yang tidak terlihat di frame ini
+        if len(self._entries) > len(visible):
+            self._evict(now)
+
+        queue_length = len(visible)
+        total_wait_time = sum(now - entry.entered for entry in visible)
+        analytics = {
+            "queue_length": queue_length,
+            "wait_time_avg": int(total_wait_time / queue_length) if queue_length > 0 else 0,
+        }
+        analytics.update(self.stats(now))
+        return analytics
+
+    def _reassociate(self, x, y, now):
+        """Waktu masuk track hilang terdekat (lalu track itu dilepas), atau None jika tidak ada."""
+        best_id, best_distance = None, REASSOCIATE_MAX_DISTANCE
+        for track_id, entry in self._entries.items():
+            if entry.last_seen >= now:
+                continue
+            distance = math.hypot(entry.x - x, entry.y - y)
+            if distance <= best_distance:
+                best_id, best_distance = track_id, distance
+        if best_id is None:
+            return None
+        return self._entries.pop(best_id).entered
+
+    def _evict(self, now):
+        expired = [track_id for track_id, entry in self._entries.items() if now - entry.last_seen > GRACE_SECONDS]
+        for track_id in expired:
+            entry = self._entries.pop(track_id)
+            wait = entry.last_seen - entry.entered
+            if wait >= MIN_QUEUE_SECONDS:
+                self._histogram.add(wait, entry.last_seen)
+
+    def stats(self, now):
+        """p50/p90 waktu tunggu selesai per jendela + served_per_minute (di-cache per versi histogram & menit)."""
+        key = (self._histogram.version, int(now // SLOT_SECONDS))
+        if key == self._stats_key:
+            return self._stats
+        stats = {}
+        for label, seconds in WINDOWS.items():
+            histogram = self._histogram.window(seconds, now)
+            served = int(histogram.sum())
+            if served:
+                stats[f"wait_time_p50_{label}"] = WaitHistogram.percentile(histogram, 0.50)
+                stats[f"wait_time_p90_{label}"] = WaitHistogram.percentile(histogram, 0.90)
+            if label == THROUGHPUT_WINDOW:
+                # Saat worker baru jalan, jendela dibagi dengan lama observasi sebenarnya
+                minutes = max(1.0, min(seconds, now - self.started) / 60)
+                stats["served_per_minute"] = round(served / minutes, 2)
+        self._stats_key, self._stats = key, stats
+        return stats
+
+    def export(self):
+        return {
+            "queue_entry_times": sorted([entry.entered for entry in self._entries.values()] + self._restored),
+            "queue_waits": self._histogram.export(),
+            "queue_started": self.started,
+        }
+
+    def restore(self, state, now=None):
+        now = time.time() if now is None else now
+        self._restored = list(state.get("queue_entry_times", ()))
+        self._restore_deadline = now + RESTORE_GRACE_SECONDS
+        self._histogram.restore(state.get("queue_waits", ()), now)
+        self.started = min(self.started, state.get("queue_started", self.started))
+        self._stats_key = None
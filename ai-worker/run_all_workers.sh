@@ -10,6 +10,11 @@ FETCHER_SCRIPT="fetch_camera_ids.py"
 # Skrip utama AI Worker
 WORKER_SCRIPT="ai_worker.py" 
 
+# Mode peluncuran:
+#   per-camera : satu proses (dan satu model YOLO) per kamera
+#   supervisor : satu proses untuk semua kamera cabang, model dibagi & inferensi di-batch
+WORKER_MODE="${WORKER_MODE:-per-camera}"
+
 echo "================================================="
 echo "Memulai Worker Kamera AI Cabang ID $BRANCH_ID"
 echo "================================================="
@@ -19,6 +24,21 @@ echo "================================================="
 # source /path/to/your/venv/bin/activate 
 
 
+# --- 3a. MODE SUPERVISOR: SATU PROSES UNTUK SELURUH CABANG ---
+if [ "$WORKER_MODE" = "supervisor" ]; then
+    SESSION_NAME="branch_${BRANCH_ID}"
+    LOG_FILE="log_branch_${BRANCH_ID}.txt"
+    
+    echo "  -> Meluncurkan Supervisor Cabang ID $BRANCH_ID dalam sesi: $SESSION_NAME"
+    screen -dmS "$SESSION_NAME" bash -c "python $WORKER_SCRIPT --branch $BRANCH_ID > $LOG_FILE 2>&1" &
+    
+    echo "================================================="
+    echo "✅ Supervisor telah diluncurkan di background."
+    echo "Untuk melihat log: ketik 'tail -f $LOG_FILE'"
+    echo "================================================="
+    exit 0
+fi
+
 # --- 3. MENGAMBIL DAFTAR ID KAMERA DARI FASTAPI API ---
 echo "Memuat daftar ID Kamera untuk Cabang ID $BRANCH_ID dari FastAPI..."
 
@@ -51,7 +71,9 @@ for CAMERA_ID in $CAMERA_IDS; do
     # bash -c "...": Jalankan perintah di shell baru dan redirect output ke file log
     
     # Perintah Utama: python ai_worker.py [CAMERA_ID] [BRANCH_ID]
-    screen -dmS "$SESSION_NAME" bash -c "python $WORKER_SCRIPT $CAMERA_ID $BRANCH_ID > $LOG_FILE 2>&1" &
+    # Port preview MJPEG per proses = PREVIEW_BASE_PORT + CAMERA_ID (default ai_worker.py; samakan
+    # dengan WORKER_PREVIEW_BASE_PORT backend, template default backend memakai {camera_port})
+    screen -dmS "$SESSION_NAME" bash -c "PREVIEW_BASE_PORT=${PREVIEW_BASE_PORT:-8100} python $WORKER_SCRIPT $CAMERA_ID $BRANCH_ID > $LOG_FILE 2>&1" &
     
     # Beri jeda sebentar antar peluncuran (mengurangi beban startup)
     sleep 1
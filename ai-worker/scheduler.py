@@ -0,0 +1,85 @@
+"""
+Penjadwal inferensi adaptif per kamera.
+
+Analitik hanya dikirim tiap beberapa detik dan sebagian besar area (dapur, ruang
+makan kosong) statis, jadi YOLO tidak perlu jalan di setiap frame:
+  1. Batas FPS inferensi per tipe area (cek waktu saja, tanpa menyentuh piksel).
+  2. Motion gate: skor beda-frame pada thumbnail kecil grayscale; frame tanpa
+     perubahan berarti dilewati.
+  3. Keep-alive: inferensi tetap dijalankan minimal sekali per interval.
+
+Untuk kamera yang memakai tracker (ENTRANCE/CASHIER), motion gate dimatikan selama
+masih ada track aktif/hilang, sehingga ByteTrack tetap menerima frame dengan ritme
+stabil dan ID tidak putus.
+"""
+import time
+import cv2
+import numpy as np
+
+# Target FPS inferensi per tipe area
+TARGET_FPS = {
+    'ENTRANCE': 10.0,  # Line crossing butuh tracking rapat
+    'CASHIER': 5.0,
+    'DINING': 2.0,
+    'KITCHEN': 1.0,
+}
+DEFAULT_TARGET_FPS = 2.0
+TRACKED_AREA_TYPES = ('ENTRANCE', 'CASHIER')
+
+MOTION_THUMBNAIL_SIZE = (64, 36)
+MOTION_THRESHOLD = 2.0     # Rata-rata beda absolut piksel grayscale (0-255)
+KEEPALIVE_SECONDS = 5.0    # Inferensi minimal sekali per interval ini (samakan dengan interval kirim)
+
+
+class InferenceScheduler:
+    """Memutuskan frame mana yang perlu dikirim ke YOLO untuk satu kamera."""
+
+    def __init__(self, area_type, target_fps=None, motion_threshold=MOTION_THRESHOLD,
+                 keepalive_seconds=KEEPALIVE_SECONDS):
+        self.area_type = area_type
+        self.target_fps = float(target_fps or TARGET_FPS.get(area_type, DEFAULT_TARGET_FPS))
+        self.min_interval = 1.0 / self.target_fps
+        self.motion_threshold = motion_threshold
+        self.keepalive_seconds = keepalive_seconds
+        self.uses_tracker = area_type in TRACKED_AREA_TYPES
+
+        self._last_inference = 0.0
+        self._reference_thumb = None  # Thumbnail frame terakhir yang diinferensi
+
+        # Statistik
+        self.inferred_frames = 0
+        self.skipped_frames = 0
+        self.last_motion_score = None
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, MOTION_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def should_infer(self, frame, has_active_tracks=False, now=None):
+        """True jika frame ini perlu diinferensi. Frame boleh resolusi asli (belum di-resize)."""
+        now = time.time() if now is None else now
+
+        # 1. Batas FPS: tolak paling murah dulu
+        if now - self._last_inference < self.min_interval:
+            self.skipped_frames += 1
+            return False
+
+        thumb = self._thumbnail(frame)
+        if self._reference_thumb is None:
+            motion = float('inf')
+        else:
+            motion = float(np.mean(cv2.absdiff(thumb, self._reference_thumb)))
+        self.last_motion_score = motion
+
+        # 2. Motion gate, kecuali tracker masih memegang track (jaga kontinuitas ByteTrack)
+        # 3. Keep-alive
+        if (motion >= self.motion_threshold
+                or (self.uses_tracker and has_active_tracks)
+                or now - self._last_inference >= self.keepalive_seconds):
+            self._last_inference = now
+            self._reference_thumb = thumb
+            self.inferred_frames += 1
+            return True
+
+        self.skipped_frames += 1
+        return False
@@ -0,0 +1,120 @@
+"""
+State machine status meja DINING dengan debounce/hysteresis dan event transisi.
+
+- Status mentah per frame dihitung dengan aturan yang sama seperti sebelumnya
+  (AVAILABLE -> OCCUPIED -> DIRTY -> CLEANING -> AVAILABLE), tetapi baru BERLAKU jika
+  didukung pengamatan terus-menerus selama CONFIRM_SECONDS[status_tujuan] (berbasis waktu,
+  bukan jumlah frame, karena FPS inferensi berubah-ubah oleh scheduler).
+- Hysteresis: masuk OCCUPIED cepat, keluar dari OCCUPIED (-> DIRTY) butuh meja kosong jauh
+  lebih lama, sehingga satu-dua deteksi yang terlewat tidak lagi membuat meja "DIRTY".
+- Setiap transisi menghasilkan event {table_id, from_status, to_status, at, dwell_seconds,
+  people_count} yang dikirim bersama payload analitik berikutnya dan disimpan backend di
+  tabel table_events (turnover & SLA pembersihan dihitung dari sana, bukan dari snapshot).
+  `at` = saat bukti perubahan pertama terlihat, bukan saat debounce selesai.
+"""
+import datetime
+import time
+from collections import deque
+
+# Lama (detik) status tujuan harus terus teramati sebelum transisi berlaku
+CONFIRM_SECONDS = {
+    'OCCUPIED': 3.0,    # Pelanggan duduk (bukan sekadar lewat)
+    'DIRTY': 20.0,      # Meja benar-benar ditinggalkan (hysteresis terhadap deteksi terlewat)
+    'CLEANING': 3.0,    # Staff mulai membersihkan
+    'AVAILABLE': 10.0,  # Staff selesai dan meninggalkan meja
+}
+MAX_PENDING_EVENTS = 1000  # Batas event yang belum terkirim per kamera
+
+
+def _target_status(current_status, customer_count, staff_count):
+    """Aturan perubahan status (tanpa debounce)."""
+    if customer_count > 0:
+        return 'OCCUPIED'
+    if staff_count > 0 and current_status == 'DIRTY':
+        return 'CLEANING'
+    if staff_count == 0 and current_status == 'CLEANING':
+        return 'AVAILABLE'
+    if current_status == 'OCCUPIED':
+        return 'DIRTY'
+    return current_status
+
+
+class _TableState:
+    __slots__ = ("status", "since", "candidate", "candidate_since")
+
+    def __init__(self, now):
+        self.status = 'AVAILABLE'
+        self.since = now
+        self.candidate = None
+        self.candidate_since = None
+
+
+class TableStateMachine:
+    """Status meja per kamera: {table_id: _TableState} + antrian event transisi yang belum dikirim."""
+
+    def __init__(self, confirm_seconds=None):
+        self.confirm_seconds = {**CONFIRM_SECONDS, **(confirm_seconds or {})}
+        self._tables = {}
+        self._events = deque(maxlen=MAX_PENDING_EVENTS)
+
+    def __len__(self):
+        return len(self._tables)
+
+    def get(self, table_id, default='AVAILABLE'):
+        state = self._tables.get(table_id)
+        return state.status if state else default
+
+    def update(self, table_id, customer_count, staff_count, now=None):
+        """Memasukkan pengamatan satu frame; mengembalikan status meja setelah debounce."""
+        now = time.time() if now is None else now
+        state = self._tables.get(table_id)
+        if state is None:
+            state = self._tables[table_id] = _TableState(now)
+
+        target = _target_status(state.status, customer_count, staff_count)
+        if target == state.status:
+            state.candidate = state.candidate_since = None
+            return state.status
+        if target != state.candidate:
+            state.candidate, state.candidate_since = target, now
+        if now - state.candidate_since >= self.confirm_seconds.get(target, 0.0):
+            self._events.append({
+                "table_id": str(table_id),
+                "from_status": state.status,
+                "to_status": target,
+                "at": datetime.datetime.utcfromtimestamp(state.candidate_since).isoformat(),
+                "dwell_seconds": round(state.candidate_since - state.since, 1),
+                "people_count": customer_count,
+            })
+            state.status, state.since = target, state.candidate_since
+            state.candidate = state.candidate_since = None
+        return state.status
+
+    def retain(self, table_ids):
+        """Membuang state meja yang sudah tidak ada di ROI."""
+        table_ids = set(table_ids)
+        self._tables = {tid: state for tid, state in self._tables.items() if tid in table_ids}
+
+    def clear(self):
+        self._tables.clear()
+        self._events.clear()
+
+    def export(self):
+        """State untuk checkpoint: meja [[table_id, status, sejak]] dan event yang belum terkirim."""
+        return {
+            "tables": [[table_id, state.status, state.since] for table_id, state in self._tables.items()],
+            "events": list(self._events),
+        }
+
+    def restore(self, exported):
+        """Kebalikan export() (kandidat debounce yang sedang berjalan tidak ikut dipulihkan)."""
+        for table_id, status, since in exported.get("tables", ()):
+            state = self._tables[table_id] = _TableState(since)
+            state.status = status
+        self._events.extend(exported.get("events", ()))
+
+    def drain_events(self):
+        """Event transisi yang belum dikirim (dikosongkan setelah diambil)."""
+        events = list(self._events)
+        self._events.clear()
+        return events
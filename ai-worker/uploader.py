@@ -0,0 +1,289 @@
+"""
+Pengirim analitik AI Worker ke FastAPI, berjalan di luar loop deteksi.
+
+- submit() hanya memasukkan payload ke antrian (tidak pernah memblokir inferensi).
+- Thread latar mengumpulkan payload menjadi batch dan mengirimnya ke /logs/batch
+  memakai satu requests.Session (koneksi HTTP di-pool dan dipakai ulang).
+- Jika backend tidak bisa dihubungi, batch disimpan ke spool di disk (dibatasi
+  ukurannya) lalu dikirim ulang dengan exponential backoff. Setiap proses memakai folder
+  spool sendiri (lihat create_uploader di ai_worker.py) agar batch tidak di-replay dua kali.
+- Body batch di-encode oleh wire.PayloadEncoder tepat sebelum POST (JSON/msgpack, gzip/zstd,
+  delta meja DINING); spool tetap menyimpan payload lengkap dalam JSON.
+- Snapshot JPEG per kamera (untuk endpoint snapshot backend) ikut dikirim thread yang sama;
+  hanya snapshot terbaru per kamera yang disimpan dan tidak pernah di-spool.
+"""
+import os
+import json
+import time
+import queue
+import datetime
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import UPLOAD_SECONDS, UPLOADS_TOTAL, UPLOAD_BYTES_TOTAL
+from wire import PayloadEncoder
+
+
+class DiskSpool:
+    """Antrian batch di disk (satu file JSON per batch), dibatasi total ukurannya."""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _files(self):
+        return sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+
+    def __len__(self):
+        return len(self._files())
+
+    def push(self, payloads):
+        name = f"{time.time_ns()}.json"
+        tmp_path = os.path.join(self.directory, name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(payloads, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        self._enforce_limit()
+
+    def peek(self):
+        """Batch tertua di spool: (nama_file, payloads) atau (None, None) jika kosong."""
+        for name in self._files():
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    return name, json.load(f)
+            except (OSError, ValueError):
+                # File rusak (misal listrik mati saat menulis): buang saja
+                self.remove(name)
+        return None, None
+
+    def remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def _enforce_limit(self):
+        files = self._files()
+        sizes = {name: os.path.getsize(os.path.join(self.directory, name)) for name in files}
+        total = sum(sizes.values())
+        # Data tertua yang dikorbankan jika spool penuh
+        for name in files:
+            if total <= self.max_bytes:
+                break
+            self.remove(name)
+            total -= sizes[name]
+            print(f"⚠️ Spool penuh, batch lama dibuang: {name}")
+
+
+class AnalyticsUploader:
+    """Thread pengirim analitik: batching, koneksi ber-pool, spool offline, dan refresh token."""
+
+    def __init__(self, api_url_root, access_token, refresh_token=None, batch_size=50,
+                 flush_interval=2.0, max_queue=10000, spool_dir="spool",
+                 spool_max_bytes=50 * 1024 * 1024, initial_backoff=2.0, max_backoff=300.0, encoder=None):
+        self.api_url_root = api_url_root
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.encoder = encoder or PayloadEncoder()
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.spool = DiskSpool(spool_dir, spool_max_bytes)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._backoff = initial_backoff
+        self._next_attempt = 0.0
+        self._snapshots = {}  # {camera_id: jpeg bytes terbaru yang belum terkirim}
+        self._snapshot_lock = threading.Lock()
+
+        # Statistik
+        self.sent_payloads = 0
+        self.spooled_batches = 0
+        self.sent_snapshots = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="analytics-uploader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Menghentikan thread; payload yang belum terkirim disimpan ke spool."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, camera_id, analytics_data, table_events=None):
+        """Non-blocking: antrikan satu payload analitik (dan event transisi meja, jika ada) untuk dikirim."""
+        payload = {
+            "camera": camera_id,
+            "analytics_data": analytics_data,
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+        }
+        if table_events:
+            payload["table_events"] = table_events
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            # Antrian memori penuh (thread pengirim tertinggal jauh): langsung ke disk
+            self.spool.push([payload])
+            self.spooled_batches += 1
+
+    def submit_snapshot(self, camera_id, jpeg):
+        """Non-blocking: snapshot JPEG terbaru kamera; menimpa snapshot yang belum sempat terkirim."""
+        with self._snapshot_lock:
+            self._snapshots[camera_id] = jpeg
+
+    # --- THREAD PENGIRIM ---
+
+    def _drain(self, timeout):
+        """Mengambil maksimal batch_size payload; menunggu paling lama `timeout` detik."""
+        batch = []
+        deadline = time.time() + timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._drain(self.flush_interval)
+            online = time.time() >= self._next_attempt
+
+            if batch:
+                if online and self._post(batch):
+                    self._on_success(len(batch))
+                else:
+                    if online:
+                        self._on_failure()
+                    self.spool.push(batch)
+                    self.spooled_batches += 1
+                    continue
+
+            # Replay spool hanya saat backend terlihat sehat dan jadwal backoff sudah lewat
+            if online:
+                self._replay_spool()
+                self._send_snapshots()
+
+        # Shutdown: sisa antrian disimpan agar dikirim saat worker hidup lagi
+        leftover = self._drain(0.01)
+        while leftover:
+            self.spool.push(leftover)
+            leftover = self._drain(0.01)
+
+    def _replay_spool(self):
+        """Mengirim batch spool berturut-turut selama berhasil; berhenti jika antrian baru sudah sebatch."""
+        while not self._stop_event.is_set() and self._queue.qsize() < self.batch_size:
+            name, payloads = self.spool.peek()
+            if name is None:
+                return
+            if not self._post(payloads):
+                self._on_failure()
+                return
+            self.spool.remove(name)
+            self._on_success(len(payloads))
+
+    def _send_snapshots(self):
+        with self._snapshot_lock:
+            snapshots, self._snapshots = self._snapshots, {}
+        for camera_id, jpeg in snapshots.items():
+            try:
+                response = self.session.put(f"{self.api_url_root}cameras/{camera_id}/snapshot", data=jpeg,
+                                            headers={**self._auth_headers(), "Content-Type": "image/jpeg"},
+                                            timeout=10)
+            except requests.exceptions.RequestException:
+                # Snapshot yang gagal tidak diulang; snapshot berikutnya akan menggantikannya
+                return
+            if response.ok:
+                self.sent_snapshots += 1
+
+    def _on_success(self, count):
+        self.sent_payloads += count
+        self._backoff = self.initial_backoff
+        self._next_attempt = 0.0
+
+    def _on_failure(self):
+        print(f"⚠️ Backend tidak dapat dihubungi, batch disimpan ke spool. Coba lagi dalam {self._backoff:.0f} detik.")
+        self._next_attempt = time.time() + self._backoff
+        self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def _auth_headers(self):
+        return {"Authorization": f"Bearer {self.access_token}"} if self.access_token else {}
+
+    def _refresh_access_token(self):
+        """Memanggil API refresh token dan memperbarui access token."""
+        try:
+            response = self.session.post(f"{self.api_url_root}auth/refresh",
+                                         json={"username": "placeholder"},  # Ganti dengan data yang sesuai
+                                         headers={"Authorization": f"Bearer {self.refresh_token}"},
+                                         timeout=5)
+            response.raise_for_status()
+            self.access_token = response.json()['access_token']
+            print("✅ Access Token berhasil diperbarui.")
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Gagal memperbarui token: {e}")
+            return False
+
+    def _post(self, payloads, retry_on_401=True, retry_on_conflict=True):
+        """True jika batch selesai ditangani (terkirim atau ditolak permanen), False jika perlu diulang."""
+        body, headers, pending = self.encoder.encode(payloads)
+        headers.update(self._auth_headers())
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.api_url_root}logs/batch", data=body,
+                                         headers=headers, timeout=10)
+        except requests.exceptions.RequestException:
+            # Tangani kegagalan koneksi umum
+            UPLOADS_TOTAL.inc("failed")
+            return False
+        finally:
+            UPLOAD_SECONDS.observe(time.perf_counter() - started)
+        UPLOAD_BYTES_TOTAL.inc(self.encoder.name, amount=len(body))
+
+        if response.status_code == 401 and retry_on_401 and self.refresh_token:
+            print("⚠️ Token Expired. Mencoba refresh token...")
+            if self._refresh_access_token():
+                return self._post(payloads, retry_on_401=False, retry_on_conflict=retry_on_conflict)
+            UPLOADS_TOTAL.inc("failed")
+            return False
+        if response.status_code == 409 and retry_on_conflict:
+            # State delta meja di backend tidak cocok (misal backend restart): kirim ulang sebagai keyframe
+            try:
+                resync = response.json()["detail"]["resync"]
+            except (ValueError, KeyError, TypeError):
+                resync = [payload["camera"] for payload in payloads]
+            self.encoder.reset(resync)
+            return self._post(payloads, retry_on_401=retry_on_401, retry_on_conflict=False)
+        if response.status_code == 415 and self.encoder.name != "json":
+            print(f"⚠️ Backend tidak mendukung format kirim {self.encoder.name}, kembali ke JSON.")
+            self.encoder.downgrade()
+            return self._post(payloads, retry_on_401=retry_on_401, retry_on_conflict=retry_on_conflict)
+        if response.status_code >= 500 or response.status_code in (401, 408, 409, 429):
+            UPLOADS_TOTAL.inc("failed")
+            return False
+        if response.status_code >= 400:
+            # Payload ditolak permanen (misal 422): jangan disimpan ke spool selamanya
+            print(f"❌ Batch ditolak backend (HTTP Error {response.status_code}), {len(payloads)} payload dibuang.")
+            UPLOADS_TOTAL.inc("rejected")
+            return True
+        self.encoder.commit(pending)
+        UPLOADS_TOTAL.inc("sent")
+        return True
@@ -0,0 +1,127 @@
+"""
+Encoder body batch analitik yang dikirim uploader ke /logs/batch.
+
+- Format: "json" (default, cocok dengan backend lama) atau "msgpack"; kompresi "none",
+  "gzip", atau "zstd". msgpack dan zstandard opsional: jika tidak terpasang, encoder
+  turun ke JSON / gzip dengan peringatan.
+- Delta meja DINING (opsional): alih-alih `tables` lengkap, analytics_data membawa
+  `tables_delta` = {seq, base, changed, removed} berisi array posisi
+  [id, status, people_count, capacity] hanya untuk meja yang berubah sejak payload
+  terakhir yang DITERIMA backend. Setiap `keyframe_interval` payload (dan setelah backend
+  meminta resync lewat 409) dikirim keyframe (base = None, semua meja).
+- State delta hanya maju lewat commit() setelah POST sukses, sehingga batch yang gagal lalu
+  di-replay dari spool tetap di-encode terhadap state yang benar-benar dimiliki backend.
+"""
+import gzip
+import json
+
+TABLE_FIELDS = ("id", "status", "people_count", "capacity")
+FORMATS = ("json", "msgpack")
+COMPRESSIONS = ("none", "gzip", "zstd")
+MIN_COMPRESS_BYTES = 512  # Body lebih kecil dari ini tidak dikompresi (header gzip/zstd tidak sebanding)
+
+
+class PayloadEncoder:
+    def __init__(self, fmt="json", compression="none", table_delta=False, keyframe_interval=60):
+        if fmt not in FORMATS:
+            raise ValueError(f"Format kirim tidak dikenal: {fmt} (pilih {', '.join(FORMATS)})")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Kompresi tidak dikenal: {compression} (pilih {', '.join(COMPRESSIONS)})")
+        self.table_delta = table_delta
+        self.keyframe_interval = keyframe_interval
+        self._tables = {}  # {camera_id: (seq, {table_id: [id, status, people_count, capacity]}, sejak_keyframe)}
+
+        self._packb = None
+        if fmt == "msgpack":
+            try:
+                import msgpack
+                self._packb = msgpack.packb
+            except ImportError:
+                print("⚠️ msgpack tidak terpasang, analitik dikirim sebagai JSON.")
+                fmt = "json"
+        self._zstd = None
+        if compression == "zstd":
+            try:
+                import zstandard
+                self._zstd = zstandard.ZstdCompressor(level=3)
+            except ImportError:
+                print("⚠️ zstandard tidak terpasang, analitik dikompresi dengan gzip.")
+                compression = "gzip"
+        self.fmt = fmt
+        self.compression = compression
+
+    @property
+    def name(self):
+        return self.fmt if self.compression == "none" else f"{self.fmt}+{self.compression}"
+
+    def downgrade(self):
+        """Kembali ke JSON tanpa kompresi & tanpa delta (backend tidak mendukung format ini)."""
+        self.fmt, self.compression, self.table_delta = "json", "none", False
+        self._packb = self._zstd = None
+        self._tables.clear()
+
+    def reset(self, camera_ids):
+        """Backend meminta resync: payload berikutnya untuk kamera ini dikirim sebagai keyframe."""
+        for camera_id in camera_ids:
+            self._tables.pop(camera_id, None)
+
+    def commit(self, pending):
+        self._tables.update(pending)
+
+    # --- ENCODE ---
+
+    def _delta(self, camera_id, tables, pending):
+        current = pending.get(camera_id) or self._tables.get(camera_id)
+        rows = {}
+        for table in tables:
+            row = [table.get(field) for field in TABLE_FIELDS]
+            rows[row[0]] = row
+
+        if current is None or current[2] + 1 >= self.keyframe_interval:
+            seq = current[0] + 1 if current else 0
+            pending[camera_id] = (seq, rows, 0)
+            return {"seq": seq, "base": None, "changed": list(rows.values())}
+
+        seq, previous, since_keyframe = current
+        pending[camera_id] = (seq + 1, rows, since_keyframe + 1)
+        delta = {"seq": seq + 1, "base": seq,
+                 "changed": [row for table_id, row in rows.items() if previous.get(table_id) != row]}
+        removed = [table_id for table_id in previous if table_id not in rows]
+        if removed:
+            delta["removed"] = removed
+        return delta
+
+    def _apply_delta(self, payloads, pending):
+        encoded = []
+        for payload in payloads:
+            tables = payload["analytics_data"].get("tables")
+            if not isinstance(tables, list):
+                encoded.append(payload)
+                continue
+            analytics_data = {k: v for k, v in payload["analytics_data"].items() if k != "tables"}
+            analytics_data["tables_delta"] = self._delta(payload["camera"], tables, pending)
+            encoded.append({**payload, "analytics_data": analytics_data})
+        return encoded
+
+    def encode(self, payloads):
+        """(body, headers, pending): pending diteruskan ke commit() jika backend menerima batch."""
+        pending = {}
+        if self.table_delta:
+            payloads = self._apply_delta(payloads, pending)
+        body = {"logs": payloads}
+
+        if self._packb is not None:
+            data = self._packb(body)
+            headers = {"Content-Type": "application/msgpack"}
+        else:
+            data = json.dumps(body, separators=(",", ":")).encode()
+            headers = {"Content-Type": "application/json"}
+
+        if len(data) >= MIN_COMPRESS_BYTES:
+            if self._zstd is not None:
+                data = self._zstd.compress(data)
+                headers["Content-Encoding"] = "zstd"
+            elif self.compression == "gzip":
+                data = gzip.compress(data, compresslevel=6)
+                headers["Content-Encoding"] = "gzip"
+        return data, headers, pending
@@ -0,0 +1,254 @@
+"""
+Server HTTP ringan AI Worker untuk preview live kamera.
+
+- GET /preview/<camera_id>.mjpg[?annotate=0]  stream MJPEG (multipart/x-mixed-replace)
+- GET /preview/<camera_id>.jpg[?annotate=0]   satu frame JPEG
+  (404 untuk kamera yang tidak diproses di worker ini)
+- GET /metrics                                 metrik Prometheus worker (metrics.py)
+
+Sumber preview adalah frame 1280x720 yang SUDAH didecode & di-resize oleh loop deteksi;
+stream RTSP tidak dibuka dua kali. Loop deteksi hanya menyerahkan referensi frame ke
+PreviewHub (tanpa copy, tanpa encode) dan itu pun hanya jika ada viewer. Encode JPEG
+(beserta gambar overlay zona/deteksi) berjalan di thread viewer, dibatasi max_fps, dan
+hasilnya dipakai bersama oleh semua viewer kamera yang sama.
+"""
+import re
+import itertools
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+BOUNDARY = "frame"
+ZONE_COLOR = (0, 200, 255)
+LINE_COLOR = (255, 0, 255)
+BOX_COLOR = (0, 255, 0)
+
+
+def draw_overlay(frame, overlay):
+    """Menggambar zona ROI, garis hitung, dan kotak deteksi pada COPY frame."""
+    annotated = frame.copy()
+    for points in overlay.get("polygons", ()):
+        cv2.polylines(annotated, [np.asarray(points, dtype=np.int32)], True, ZONE_COLOR, 2)
+    line = overlay.get("line")
+    if line is not None:
+        start, end, in_count, out_count = line
+        cv2.line(annotated, start, end, LINE_COLOR, 2)
+        cv2.putText(annotated, f"in {in_count} / out {out_count}", (start[0], max(20, start[1] - 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, LINE_COLOR, 2)
+    boxes = overlay.get("boxes")
+    tracker_ids = overlay.get("tracker_ids")
+    if boxes is not None:
+        for i, (x1, y1, x2, y2) in enumerate(np.asarray(boxes, dtype=int)):
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), BOX_COLOR, 2)
+            if tracker_ids is not None:
+                cv2.putText(annotated, f"#{tracker_ids[i]}", (x1, max(15, y1 - 5)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, BOX_COLOR, 1)
+    return annotated
+
+
+class PreviewSource:
+    """Frame terbaru satu kamera untuk preview, beserta cache hasil encode per frame."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.frame = None
+        self.overlay = {}
+        self.seq = 0
+        self.viewers = 0
+        self.closed = False  # True setelah kamera di-unregister dari hub
+        self._encoded = {}  # {annotate: (seq, jpeg)}
+
+    def encoded(self, annotate, quality):
+        """JPEG frame terbaru; di-encode sekali per frame per varian (annotate / polos)."""
+        with self.cond:
+            seq, frame, overlay = self.seq, self.frame, self.overlay
+            cached = self._encoded.get(annotate)
+        if frame is None:
+            return seq, None
+        if cached is not None and cached[0] == seq:
+            return cached
+        image = draw_overlay(frame, overlay) if annotate else frame
+        success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not success:
+            return seq, None
+        result = (seq, buffer.tobytes())
+        with self.cond:
+            self._encoded[annotate] = result
+        return result
+
+
+class PreviewHub:
+    """Titik temu loop deteksi (offer) dan viewer HTTP (stream) untuk semua kamera di proses ini."""
+
+    def __init__(self, max_fps=10.0, jpeg_quality=70):
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+        self._lock = threading.Lock()
+        self._sources = {}  # Hanya kamera yang diproses di worker ini (register/unregister oleh CameraSession)
+
+    def register(self, camera_id):
+        with self._lock:
+            self._sources.setdefault(camera_id, PreviewSource())
+
+    def unregister(self, camera_id):
+        with self._lock:
+            source = self._sources.pop(camera_id, None)
+        if source is not None:
+            # Viewer yang masih menunggu langsung berhenti, bukan menunggu timeout
+            with source.cond:
+                source.closed = True
+                source.cond.notify_all()
+
+    def has_camera(self, camera_id):
+        return camera_id in self._sources
+
+    def has_viewers(self, camera_id):
+        source = self._sources.get(camera_id)
+        return source is not None and source.viewers > 0
+
+    def offer(self, camera_id, frame, overlay=None):
+        """
+        Dipanggil loop deteksi. Tanpa viewer: langsung kembali (tanpa copy/encode).
+        overlay=None mempertahankan overlay terakhir (frame yang dilewati scheduler).
+        """
+        source = self._sources.get(camera_id)
+        if source is None or source.viewers == 0:
+            return
+        with source.cond:
+            source.frame = frame
+            if overlay is not None:
+                source.overlay = overlay
+            source.seq += 1
+            source.cond.notify_all()
+
+    def stream(self, camera_id, annotate=True, timeout=5.0):
+        """
+        Generator JPEG untuk satu viewer; berhenti jika tidak ada frame baru selama `timeout` detik,
+        kamera di-unregister, atau kamera tidak diproses di worker ini (langsung kosong).
+        """
+        source = self._sources.get(camera_id)
+        if source is None:
+            return
+        with source.cond:
+            source.viewers += 1
+        min_interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        last_seq = None
+        try:
+            while True:
+                with source.cond:
+                    ready = source.cond.wait_for(
+                        lambda: source.closed or (source.seq != last_seq and source.frame is not None), timeout)
+                    if not ready or source.closed:
+                        return
+                sent_at = time.monotonic()
+                last_seq, jpeg = source.encoded(annotate, self.jpeg_quality)
+                if jpeg is not None:
+                    yield jpeg
+                # Batas FPS per viewer
+                delay = min_interval - (time.monotonic() - sent_at)
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            with source.cond:
+                source.viewers -= 1
+                if source.viewers == 0:
+                    # Lepas referensi frame agar memori tidak tertahan saat tidak ada yang menonton
+                    source.frame = None
+                    source._encoded.clear()
+
+
+class WorkerRequestHandler(BaseHTTPRequestHandler):
+    """Routing sederhana; `server.preview_hub` & `server.metrics_registry` diisi oleh start_worker_http()."""
+
+    PREVIEW_PATH = re.compile(r"^/preview/(\d+)\.(mjpg|jpg)$")
+
+    def log_message(self, format, *args):
+        # Jangan spam log worker untuk setiap request preview
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/metrics" and self.server.metrics_registry is not None:
+            self._send_metrics()
+            return
+        match = self.PREVIEW_PATH.match(url.path)
+        if not match:
+            self.send_error(404)
+            return
+        camera_id, kind = int(match.group(1)), match.group(2)
+        if not self.server.preview_hub.has_camera(camera_id):
+            # Kamera tidak diproses di worker ini; jangan membuat sumber preview untuk ID sembarang
+            self.send_error(404, "Unknown camera")
+            return
+        annotate = parse_qs(url.query).get("annotate", ["1"])[0] not in ("0", "false")
+        if kind == "jpg":
+            self._send_single_frame(camera_id, annotate)
+        else:
+            self._send_mjpeg(camera_id, annotate)
+
+    def _send_metrics(self):
+        body = self.server.metrics_registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_single_frame(self, camera_id, annotate):
+        frames = self.server.preview_hub.stream(camera_id, annotate)
+        jpeg = next(frames, None)
+        frames.close()
+        if jpeg is None:
+            self.send_error(503, "No frame available")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def _send_mjpeg(self, camera_id, annotate):
+        frames = self.server.preview_hub.stream(camera_id, annotate)
+        # Header baru dikirim setelah frame pertama ada, agar kamera tanpa frame mendapat 503
+        first = next(frames, None)
+        if first is None:
+            frames.close()
+            self.send_error(503, "No frame available")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            for jpeg in itertools.chain([first], frames):
+                self.wfile.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                )
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Viewer menutup koneksi
+            pass
+        finally:
+            frames.close()
+
+
+def start_worker_http(preview_hub, host="0.0.0.0", port=8081, metrics_registry=None):
+    """Menjalankan server di thread daemon. Mengembalikan server, atau None jika port tidak bisa dipakai."""
+    try:
+        server = ThreadingHTTPServer((host, port), WorkerRequestHandler)
+    except OSError as e:
+        print(f"⚠️ Server preview tidak dijalankan ({host}:{port}): {e}")
+        return None
+    server.daemon_threads = True
+    server.preview_hub = preview_hub
+    server.metrics_registry = metrics_registry
+    threading.Thread(target=server.serve_forever, name="worker-http", daemon=True).start()
+    print(f"✅ Server worker di http://{host}:{port} (/preview/<camera_id>.mjpg, /metrics)")
+    return server
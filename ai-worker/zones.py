@@ -0,0 +1,86 @@
+"""
+Registry zona ROI yang dikompilasi sekali per konfigurasi kamera.
+
+Semua poligon dirasterisasi ke satu label map: setiap piksel menyimpan bitmask
+zona yang mencakupnya (zona boleh saling tumpang tindih). Anchor semua deteksi
+lalu diuji terhadap semua zona sekaligus dengan satu operasi indexing NumPy,
+tanpa membuat ulang sv.PolygonZone di setiap frame.
+"""
+import numpy as np
+import cv2
+import supervision as sv
+
+BITS_PER_PLANE = 64
+
+
+def _label_dtype(zone_count):
+    """Tipe data terkecil yang cukup menampung satu bit per zona dalam satu plane."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if zone_count <= np.iinfo(dtype).bits:
+            return dtype
+    return np.uint64
+
+
+class ZoneRegistry:
+    """Kumpulan poligon ROI satu kamera yang sudah dikompilasi menjadi label map."""
+
+    def __init__(self, zones, frame_size=(1280, 720), triggering_anchor=sv.Position.BOTTOM_CENTER):
+        # Abaikan zona yang poligonnya tidak valid (sama seperti cek points.ndim != 2 sebelumnya)
+        self.zones = [z for z in zones if np.asarray(z.get('points', [])).ndim == 2]
+        self.zone_ids = [z.get('id', i) for i, z in enumerate(self.zones)]
+        self.frame_size = frame_size
+        self.triggering_anchor = triggering_anchor
+
+        width, height = frame_size
+        zone_count = len(self.zones)
+        plane_count = max(1, -(-zone_count // BITS_PER_PLANE))
+        dtype = _label_dtype(min(zone_count, BITS_PER_PLANE))
+
+        self._label_map = np.zeros((plane_count, height, width), dtype=dtype)
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for index, zone in enumerate(self.zones):
+            plane, bit = divmod(index, BITS_PER_PLANE)
+            mask[:] = 0
+            cv2.fillPoly(mask, [np.asarray(zone['points'], dtype=np.int32)], 1)
+            self._label_map[plane][mask.astype(bool)] |= dtype(1 << bit)
+
+        # Lookup per zona: plane mana dan bit apa
+        indices = np.arange(zone_count)
+        self._zone_plane = indices // BITS_PER_PLANE
+        self._zone_bit = (np.ones(zone_count, dtype=dtype) << (indices % BITS_PER_PLANE).astype(dtype)).astype(dtype)
+
+    @classmethod
+    def from_roi_settings(cls, roi_settings, frame_size=(1280, 720)):
+        """
+        Membuat registry dari roi_settings kamera.
+        Format multi-zona: {'zones': [{'id':..., 'points': [...]}, ...]} (DINING)
+        Format satu poligon: {'points': [...]} (CASHIER/KITCHEN)
+        """
+        if 'zones' in roi_settings:
+            zones = roi_settings.get('zones') or []
+        elif roi_settings.get('points') is not None:
+            zones = [{'id': roi_settings.get('id', 0), 'points': roi_settings['points']}]
+        else:
+            zones = []
+        return cls(zones, frame_size)
+
+    def __len__(self):
+        return len(self.zones)
+
+    def trigger(self, detections):
+        """
+        Menguji semua deteksi terhadap semua zona dalam satu langkah.
+        Mengembalikan matriks boolean (jumlah_deteksi, jumlah_zona).
+        """
+        zone_count = len(self.zones)
+        if len(detections) == 0 or zone_count == 0:
+            return np.zeros((len(detections), zone_count), dtype=bool)
+
+        anchors = np.rint(detections.get_anchors_coordinates(self.triggering_anchor)).astype(int)
+        width, height = self.frame_size
+        x, y = anchors[:, 0], anchors[:, 1]
+        in_bounds = (x >= 0) & (y >= 0) & (x < width) & (y < height)
+
+        labels = self._label_map[:, np.clip(y, 0, height - 1), np.clip(x, 0, width - 1)]  # (plane, deteksi)
+        hits = (labels[self._zone_plane] & self._zone_bit[:, None]) != 0             # (zona, deteksi)
+        return hits.T & in_bounds[:, None]
@@ -1,16 +1,26 @@
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from starlette.responses import StreamingResponse
-import io
 import time
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import hashlib
+import httpx
+from starlette.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, schemas, models
-from ..core.database import get_db
-from ..schemas import CameraConfig
-from ..core.config import settings
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ... import crud, crud_async, schemas, models, rollups, table_events
+from ...core.database import get_async_db, SessionLocal, AsyncSessionLocal
+from ...schemas import CameraConfig
+from ...core.config import settings
+from ...ingest import ingest_buffer, IngestBufferFull
+from ...latest_cache import latest_cache
+from ...live import live_hub, stream_to_websocket
+from ...snapshots import snapshot_cache, etag_matches
+from ...worker_auth import check_worker_access, worker_authenticator
+from ...wire import read_body, table_deltas, wire_stats
 
 router = APIRouter(prefix="/api/v1", tags=["AI Worker & Dashboard"])
 
@@ -37,64 +47,210 @@ def create_refresh_token(data: dict, expires_delta: timedelta = None):
 
 # --- ENDPOINT KONFIGURASI UNTUK AI WORKER ---
 
+def _versioned_response(request: Request, payload) -> Response:
+    """
+    Response konfigurasi dengan ETag = hash isi (versi konfigurasi). AI Worker mem-poll dengan
+    If-None-Match dan hanya menerima body jika konfigurasinya benar-benar berubah (selain itu 304).
+    """
+    content = jsonable_encoder(payload)
+    body = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 @router.get("/branches/{branch_id}", response_model=schemas.BranchConfig)
-def read_branch_config(branch_id: int, db: Session = Depends(get_db)):
-    """Mengambil konfigurasi Cabang (Jadwal Seragam) untuk AI Worker."""
-    db_branch = crud.get_branch(db, branch_id=branch_id)
+async def read_branch_config(branch_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Mengambil konfigurasi Cabang (Jadwal Seragam) untuk AI Worker (mendukung ETag/If-None-Match)."""
+    db_branch = await crud_async.get_branch(db, branch_id=branch_id)
     if db_branch is None:
         raise HTTPException(status_code=404, detail="Branch not found")
-    return db_branch
+    return _versioned_response(request, schemas.BranchConfig.from_orm(db_branch))
 
 @router.get("/cameras/{camera_id}", response_model=schemas.CameraConfig)
-def read_camera_config(camera_id: int, db: Session = Depends(get_db)):
-    """Mengambil konfigurasi Kamera (RTSP, ROI) beserta branch_id untuk AI Worker."""
-    db_camera = crud.get_camera(db, camera_id=camera_id)
+async def read_camera_config(camera_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Mengambil konfigurasi Kamera (RTSP, ROI) beserta branch_id untuk AI Worker (mendukung ETag/If-None-Match)."""
+    db_camera = await crud_async.get_camera(db, camera_id=camera_id)
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
-    
-    # Mengembalikan data dengan field branch_id yang dihitung dari relasi
-    return {
-        **db_camera.__dict__,
-        "branch_id": db_camera.branch_id
-    }
+    return _versioned_response(request, schemas.CameraConfig.from_orm(db_camera))
 
 # --- ENDPOINT LOGGING DARI AI WORKER ---
 
-@router.post("/logs/", status_code=201)
-def create_log(log: schemas.DetectionLogCreate, db: Session = Depends(get_db)):
-    """Endpoint untuk AI Worker mengirim hasil deteksi (log & heartbeat)."""
-    crud.create_detection_log(db, log=log)
+def _enqueue_logs(logs: List[schemas.DetectionLogCreate]) -> int:
+    # Delta meja DINING direkonstruksi dulu; state delta baru disimpan jika log diterima buffer
+    logs, pending_tables = table_deltas.expand(logs)
+    try:
+        count = ingest_buffer.enqueue(logs)
+    except IngestBufferFull:
+        # Worker akan menyimpan ke spool dan mengirim ulang dengan backoff
+        raise HTTPException(status_code=503, detail="Ingest buffer full, retry later")
+    table_deltas.commit(pending_tables)
+    return count
+
+# Endpoint ingest berjalan langsung di event loop (tanpa threadpool): enqueue hanya operasi memori.
+# Body dibaca manual (app/wire.py): JSON atau msgpack, opsional gzip/zstd (Content-Type/Content-Encoding).
+
+@router.post("/logs/", status_code=202)
+async def create_log(request: Request):
+    """Endpoint untuk AI Worker mengirim hasil deteksi (log & heartbeat), ditulis oleh flush berkala."""
+    log = await read_body(request, schemas.DetectionLogCreate)
+    check_worker_access(request, [log.camera_id])
+    _enqueue_logs([log])
     return {"message": "Log received and heartbeat updated"}
 
+@router.post("/logs/batch", status_code=202)
+async def create_logs_batch(request: Request):
+    """Endpoint batch untuk AI Worker: banyak log (dan heartbeat) sekaligus."""
+    batch = await read_body(request, schemas.DetectionLogBatch)
+    check_worker_access(request, {log.camera_id for log in batch.logs})
+    count = _enqueue_logs(batch.logs)
+    return {"message": "Logs received and heartbeats updated", "count": count}
+
+@router.get("/ingest/metrics", tags=["Monitoring"])
+async def get_ingest_metrics():
+    """Metrik pipeline ingest: throughput, latensi terima->commit, ukuran buffer, error flush."""
+    return {**ingest_buffer.metrics(), "live": live_hub.metrics(), "snapshots": snapshot_cache.metrics(),
+            "worker_auth": worker_authenticator.metrics(), "wire": wire_stats.metrics(),
+            "table_deltas": table_deltas.metrics()}
+
 # --- ENDPOINT DASHBOARD FRONTEND ---
 
-@router.get("/dashboard/cameras/", response_model=List[schemas.CameraDashboard])
-def get_dashboard_data(db: Session = Depends(get_db)):
-    """Mengambil semua data kamera beserta log terbarunya untuk dashboard."""
-    # Logic untuk Dashboard di CRUD bisa lebih kompleks (misal: agregasi)
-    cameras = db.query(models.Camera).all()
-    dashboard_data = []
+async def _build_dashboard(db: AsyncSession, branch_id: Optional[int] = None) -> List[schemas.CameraDashboard]:
+    cameras = await crud_async.get_cameras(db, branch_id)
+    live_hub.register_cameras(cameras)
     
+    # Analitik terbaru dari cache ingest; hanya kamera yang belum/kedaluwarsa di-cache yang di-query
+    latest_logs = await latest_cache.get_latest_async(db, [cam.id for cam in cameras])
+    
+    dashboard_data = []
     for cam in cameras:
-        latest_log = cam.logs[0].analytics_data if cam.logs else None
         cam_schema = schemas.CameraDashboard.from_orm(cam)
-        cam_schema.latest_log = latest_log
+        cam_schema.latest_log = latest_logs.get(cam.id)
         dashboard_data.append(cam_schema)
-        
     return dashboard_data
+
+async def _dashboard_snapshot(branch_id: Optional[int]) -> dict:
+    async with AsyncSessionLocal() as db:
+        return {"type": "snapshot", "cameras": jsonable_encoder(await _build_dashboard(db, branch_id))}
+
+@router.get("/dashboard/cameras/", response_model=List[schemas.CameraDashboard])
+async def get_dashboard_data(branch_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    """Mengambil data kamera (opsional per cabang) beserta analitik terbarunya untuk dashboard."""
+    return await _build_dashboard(db, branch_id)
+
+@router.websocket("/dashboard/ws")
+async def dashboard_stream(websocket: WebSocket, branch_id: Optional[int] = None):
+    """
+    Stream dashboard live: satu pesan snapshot (sama dengan /dashboard/cameras/), lalu pesan
+    delta {"type": "delta", "camera_id", "status", "timestamp", "latest_log"} setiap log baru masuk.
+    """
+    await websocket.accept()
+    # Subscribe sebelum snapshot diambil agar delta yang masuk di antaranya tidak hilang
+    subscriber = live_hub.subscribe(branch_id)
+    try:
+        snapshot = await _dashboard_snapshot(branch_id)
+        await stream_to_websocket(websocket, subscriber, snapshot,
+                                  settings.LIVE_SEND_TIMEOUT_SECONDS, settings.LIVE_PING_INTERVAL_SECONDS)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.unsubscribe(subscriber)
+
+# --- ENDPOINT HISTORY ANALITIK (ROLLUP) ---
+
+def _time_window(start: Optional[datetime], end: Optional[datetime]):
+    """Rentang [start, end) default 24 jam terakhir."""
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+async def _history(db: AsyncSession, scope: str, scope_id: int, metric: Optional[List[str]], resolution: Optional[str],
+             start: Optional[datetime], end: Optional[datetime]) -> schemas.AnalyticsHistory:
+    start, end = _time_window(start, end)
+    if resolution is None:
+        bucket_seconds = rollups.pick_resolution(start, end)
+    elif resolution in rollups.RESOLUTIONS:
+        bucket_seconds = rollups.RESOLUTIONS[resolution]
+    else:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(rollups.RESOLUTIONS)}")
+    
+    series = {}
+    for row in await crud_async.get_rollups(db, scope, scope_id, bucket_seconds, start, end, metric):
+        series.setdefault(row.metric, []).append(schemas.RollupPoint(
+            bucket_start=row.bucket_start, count=row.count, min=row.min, max=row.max,
+            avg=row.sum / row.count, last=row.last,
+        ))
+    return schemas.AnalyticsHistory(scope=scope, scope_id=scope_id, resolution_seconds=bucket_seconds,
+                                    start=start, end=end, series=series)
+
+@router.get("/history/cameras/{camera_id}", response_model=schemas.AnalyticsHistory, tags=["History"])
+async def get_camera_history(camera_id: int, metric: Optional[List[str]] = Query(None), resolution: Optional[str] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             db: AsyncSession = Depends(get_async_db)):
+    """
+    Time-series metrik satu kamera (default 24 jam terakhir) dari tabel rollup.
+    resolution: 1m / 15m / 1h (default: otomatis sesuai panjang rentang).
+    """
+    return await _history(db, "camera", camera_id, metric, resolution, start, end)
+
+@router.get("/history/branches/{branch_id}", response_model=schemas.AnalyticsHistory, tags=["History"])
+async def get_branch_history(branch_id: int, metric: Optional[List[str]] = Query(None), resolution: Optional[str] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Time-series metrik gabungan semua kamera satu cabang dari tabel rollup."""
+    return await _history(db, "branch", branch_id, metric, resolution, start, end)
+
+# --- ENDPOINT ANALITIK MEJA (DARI table_events) ---
+
+@router.get("/tables/branches/{branch_id}/turnover", response_model=schemas.TurnoverReport, tags=["Tables"])
+async def get_table_turnover(branch_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             db: AsyncSession = Depends(get_async_db)):
+    """Turnover meja satu cabang (default 24 jam terakhir): jumlah pelanggan duduk & lama OCCUPIED per meja."""
+    start, end = _time_window(start, end)
+    tables = [schemas.TableTurnover(camera_id=row.camera_id, table_id=row.table_id, seatings=row.seatings or 0,
+                                    avg_occupied_seconds=round(row.avg_occupied_seconds, 1)
+                                    if row.avg_occupied_seconds is not None else None)
+              for row in await crud_async.get_table_turnover(db, branch_id, start, end)]
+    total = sum(t.seatings for t in tables)
+    return schemas.TurnoverReport(branch_id=branch_id, start=start, end=end, total_seatings=total,
+                                  turnover_per_table=round(total / len(tables), 2) if tables else 0.0, tables=tables)
+
+@router.get("/tables/branches/{branch_id}/cleaning", response_model=schemas.CleaningSlaReport, tags=["Tables"])
+async def get_cleaning_sla(branch_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           sla_seconds: Optional[float] = Query(None, gt=0), db: AsyncSession = Depends(get_async_db)):
+    """
+    SLA pembersihan meja satu cabang: waktu DIRTY -> AVAILABLE (p50/p90/max), waktu respons
+    staff DIRTY -> CLEANING, dan jumlah siklus yang melebihi sla_seconds (default CLEANING_SLA_SECONDS).
+    """
+    start, end = _time_window(start, end)
+    sla_seconds = sla_seconds or settings.CLEANING_SLA_SECONDS
+    cycles = await crud_async.get_cleaning_cycles(db, branch_id, start, end)
+    return schemas.CleaningSlaReport(branch_id=branch_id, start=start, end=end, sla_seconds=sla_seconds,
+                                     **table_events.summarize_cleaning(cycles, sla_seconds))
+
+@router.get("/tables/cameras/{camera_id}/events", response_model=List[schemas.TableEvent], tags=["Tables"])
+async def get_table_events(camera_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           limit: int = Query(1000, ge=1, le=10000), db: AsyncSession = Depends(get_async_db)):
+    """Event transisi status meja satu kamera DINING (urut per meja lalu waktu)."""
+    start, end = _time_window(start, end)
+    return await crud_async.get_table_events(db, start, end, camera_id=camera_id, limit=limit)
+
 @router.get("/branches/{branch_id}/cameras", response_model=List[schemas.CameraConfig])
-def read_branch_cameras(branch_id: int, db: Session = Depends(get_db)):
-    """Mengambil semua daftar kamera milik satu cabang."""
-    cameras = crud.get_cameras_by_branch(db, branch_id=branch_id)
+async def read_branch_cameras(branch_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Mengambil semua daftar kamera milik satu cabang (mendukung ETag/If-None-Match)."""
+    cameras = await crud_async.get_cameras_by_branch(db, branch_id=branch_id)
     if not cameras:
         raise HTTPException(status_code=404, detail="No cameras found for this branch")
-    return cameras
+    return _versioned_response(request, [schemas.CameraConfig.from_orm(cam) for cam in cameras])
 
 @router.post("/auth/login", response_model=schemas.Token, tags=["Auth"])
-async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()):
     """Endpoint Login untuk mendapatkan Access dan Refresh Token."""
-    user = crud.get_user_by_username(db, username=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    user = await crud_async.get_user_by_username(db, username=form_data.username)
+    if not user or not await crud_async.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
         
     access_token_expires = timedelta(minutes=30)
@@ -110,11 +266,11 @@ async def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth
     return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
 
 @router.post("/auth/refresh", response_model=schemas.Token, tags=["Auth"])
-def refresh_token(token_data: schemas.TokenData, db: Session = Depends(get_db)):
+async def refresh_token(token_data: schemas.TokenData, db: AsyncSession = Depends(get_async_db)):
     """Endpoint untuk menukar Refresh Token dengan Access Token baru."""
     # Logic: Decode token_data.username dari refresh token
     username = token_data.username # Asumsi token decoding sudah dilakukan
-    user = crud.get_user_by_username(db, username=username)
+    user = await crud_async.get_user_by_username(db, username=username)
     
     if user is None:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
@@ -128,30 +284,97 @@ def refresh_token(token_data: schemas.TokenData, db: Session = Depends(get_db)):
 
 # --- NEW ENDPOINT: CAMERA SNAPSHOT ---
 
+def _fetch_snapshot_from_rtsp(camera_id: int):
+    db: Session = SessionLocal()
+    try:
+        return crud.get_camera_snapshot_data(db, camera_id)
+    finally:
+        db.close()
+
+async def _camera_exists(camera_id: int) -> bool:
+    async with AsyncSessionLocal() as db:
+        return await crud_async.get_camera(db, camera_id) is not None
+
 @router.get("/cameras/{camera_id}/snapshot", tags=["Camera Control"])
-def get_camera_snapshot(camera_id: int, db: Session = Depends(get_db)):
-    """Mengambil snapshot (gambar diam JPEG) dari RTSP stream."""
-    image_bytes = crud.get_camera_snapshot_data(db, camera_id)
+async def get_camera_snapshot(camera_id: int, request: Request):
+    """
+    Mengambil snapshot (gambar diam JPEG) kamera dari cache. Stream RTSP hanya dibuka jika
+    AI Worker tidak mem-publish snapshot, dan paling banyak satu kali bersamaan per kamera.
+    """
+    snapshot = await snapshot_cache.get(camera_id, lambda: _fetch_snapshot_from_rtsp(camera_id))
     
-    if image_bytes is None:
+    if snapshot is None:
         raise HTTPException(status_code=503, detail="Could not retrieve snapshot (Camera offline or not accessible)")
     
-    # Menggunakan StreamingResponse untuk mengirim byte gambar
-    return StreamingResponse(
-        io.BytesIO(image_bytes),
-        media_type="image/jpeg"
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "no-cache",  # Browser selalu revalidasi dengan If-None-Match
+        "X-Snapshot-Age": f"{snapshot.age:.1f}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.jpeg, media_type="image/jpeg", headers=headers)
+
+@router.get("/cameras/{camera_id}/preview", tags=["Camera Control"])
+async def proxy_camera_preview(camera_id: int, annotate: bool = True):
+    """
+    Preview live MJPEG (dengan overlay zona & deteksi) dari AI Worker. Byte stream diteruskan
+    apa adanya; worker hanya meng-encode JPEG selama ada viewer yang terhubung.
+    """
+    url = settings.WORKER_PREVIEW_URL_TEMPLATE.format(
+        camera_id=camera_id, camera_port=settings.WORKER_PREVIEW_BASE_PORT + camera_id
     )
+    client = httpx.AsyncClient(timeout=httpx.Timeout(5.0, read=None))
+    try:
+        upstream = await client.send(client.build_request("GET", url, params={"annotate": int(annotate)}), stream=True)
+    except httpx.HTTPError:
+        await client.aclose()
+        raise HTTPException(status_code=503, detail="Preview not available (AI Worker not reachable)")
+    
+    if upstream.status_code != 200:
+        await upstream.aclose()
+        await client.aclose()
+        raise HTTPException(status_code=503, detail="Preview not available (no frames from AI Worker)")
+    
+    async def relay():
+        try:
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            # Viewer putus -> koneksi ke worker ditutup -> worker berhenti meng-encode
+            await upstream.aclose()
+            await client.aclose()
+    
+    return StreamingResponse(relay(), media_type=upstream.headers.get("content-type"),
+                             headers={"Cache-Control": "no-cache"})
+
+@router.put("/cameras/{camera_id}/snapshot", status_code=204, tags=["Camera Control"])
+async def publish_camera_snapshot(camera_id: int, request: Request):
+    """Endpoint untuk AI Worker mem-publish snapshot JPEG terbaru (body: image/jpeg)."""
+    check_worker_access(request, [camera_id])
+    if request.headers.get("content-type", "").split(";")[0].strip() != "image/jpeg":
+        raise HTTPException(status_code=415, detail="Snapshot must be image/jpeg")
+    jpeg = await request.body()
+    if not jpeg or len(jpeg) > settings.SNAPSHOT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Snapshot is empty or too large")
+    
+    # Kamera hanya dicek ke database saat publish pertama
+    if camera_id not in snapshot_cache and not await _camera_exists(camera_id):
+        raise HTTPException(status_code=404, detail="Camera not found")
+    
+    snapshot_cache.publish(camera_id, jpeg)
+    return Response(status_code=204)
 
 # --- ENDPOINT UPDATE CAMERA SETTINGS ---
 
 @router.put("/cameras/{camera_id}", response_model=schemas.CameraConfig, tags=["Camera Control"])
-def update_camera_settings(
+async def update_camera_settings(
     camera_id: int,
     camera_update: schemas.CameraUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update konfigurasi kamera (rtsp_url dan roi_settings)."""
-    db_camera = crud.update_camera(db, camera_id=camera_id, camera_update=camera_update)
+    db_camera = await crud_async.update_camera(db, camera_id=camera_id, camera_update=camera_update)
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     return {
@@ -1,21 +1,53 @@
 """
 Setup koneksi database menggunakan SQLAlchemy
+
+- Engine sync (SessionLocal): task latar yang berjalan di thread (flush ingest,
+  maintenance partisi/rollup, heartbeat check) dan script seperti init_db.py.
+- Engine async (AsyncSessionLocal, asyncpg/aiosqlite): endpoint API, sehingga request
+  yang menunggu database tidak memakan slot threadpool Starlette.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # SQLite (load test lokal): koneksi dipakai lintas thread (threadpool FastAPI, flush ingest)
+        return {"connect_args": {"check_same_thread": False}}
+    # Ukuran pool eksplisit: total koneksi per proses = pool_size + max_overflow
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,  # Verify connections before using
     echo=settings.DEBUG,  # Log SQL queries in debug mode
+    **_engine_options(settings.DATABASE_URL),
 )
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine & session async untuk endpoint API
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    echo=settings.DEBUG,
+    **_engine_options(settings.ASYNC_DATABASE_URL),
+)
+
+# expire_on_commit=False: objek tetap bisa dibaca setelah commit tanpa lazy load (tidak didukung async)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
@@ -32,3 +64,8 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Dependency FastAPI untuk endpoint async: AsyncSession yang ditutup setelah request."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,62 +1,202 @@
 # /app/crud.py
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import models
 from datetime import datetime, timedelta
-from sqlalchemy import or_
+from sqlalchemy import or_, insert, update, case, select, func, true
+from sqlalchemy.dialects import postgresql, sqlite
 from passlib.context import CryptContext
 from .core.config import settings # Asumsikan settings sudah diimpor
 import cv2 # 🚨 LIBRARY BARU UNTUK SNAPSHOT
 import time
-from typing import Optional
-# --- CRUD BRANCH (CONFIG UNTUK AI WORKER) ---
-
-def get_branch(db: Session, branch_id: int):
-    return db.query(models.Branch).filter(models.Branch.id == branch_id).first()
-
+from typing import Optional, List, Dict, Any
 # --- CRUD CAMERA (CONFIG UNTUK AI WORKER/FRONTEND) ---
 
 def get_camera(db: Session, camera_id: int):
     # Mengambil kamera berdasarkan ID
     return db.query(models.Camera).filter(models.Camera.id == camera_id).first()
 
-def update_camera(db: Session, camera_id: int, camera_update: schemas.CameraUpdate):
-    """Update konfigurasi kamera (rtsp_url dan/atau roi_settings)."""
-    db_camera = get_camera(db, camera_id)
-    if db_camera is None:
-        return None
+# --- CRUD LOG (DARI AI WORKER) ---
+
+def create_detection_logs_bulk(db: Session, rows: List[Dict[str, Any]], heartbeats: Dict[int, datetime],
+                               rollup_rows: Optional[List[Dict[str, Any]]] = None,
+                               table_event_rows: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Menulis banyak log sekaligus dalam SATU transaksi:
+    INSERT multi-row ke detection_logs + SATU UPDATE heartbeat (CASE per kamera) ke cameras
+    + UPSERT agregat rollup + INSERT event transisi meja (jika ada).
+    """
+    if rows:
+        db.execute(insert(models.DetectionLog), rows)
+    
+    if rollup_rows:
+        upsert_rollups(db, rollup_rows)
+    
+    if table_event_rows:
+        insert_table_events(db, table_event_rows)
     
-    # Update hanya field yang diberikan
-    if camera_update.rtsp_url is not None:
-        db_camera.rtsp_url = camera_update.rtsp_url
-    if camera_update.roi_settings is not None:
-        db_camera.roi_settings = camera_update.roi_settings
+    if heartbeats:
+        db.execute(
+            update(models.Camera)
+            .where(models.Camera.id.in_(list(heartbeats)))
+            .values(
+                status='ONLINE',
+                last_heartbeat=case(heartbeats, value=models.Camera.id)
+            )
+            .execution_options(synchronize_session=False)
+        )
     
     db.commit()
-    db.refresh(db_camera)
-    return db_camera
+    return len(rows)
 
-# --- CRUD LOG (DARI AI WORKER) ---
-
-def create_detection_log(db: Session, log: schemas.DetectionLogCreate):
-    # 1. Buat log baru
-    db_log = models.DetectionLog(
-        camera_id=log.camera_id, 
-        analytics_data=log.analytics_data
-    )
-    db.add(db_log)
+def latest_logs_query(dialect_name: str, camera_ids: Optional[List[int]] = None):
+    """
+    Query log terbaru per kamera: (camera_id, timestamp, analytics_data). Dipakai versi sync & async.
+    PostgreSQL: LATERAL ... ORDER BY timestamp DESC LIMIT 1 per kamera, memakai index
+    (camera_id, timestamp) sehingga biayanya tidak tumbuh seiring panjang histori log.
+    """
+    Log = models.DetectionLog
     
-    # 2. Update Heartbeat & Status kamera
-    db.query(models.Camera).filter(models.Camera.id == log.camera_id).update({
-        models.Camera.status: 'ONLINE',
-        models.Camera.last_heartbeat: datetime.utcnow()
-    })
+    if dialect_name == "postgresql":
+        latest = (
+            select(Log.timestamp, Log.analytics_data)
+            .where(Log.camera_id == models.Camera.id)
+            .order_by(Log.timestamp.desc())
+            .limit(1)
+            .lateral()
+        )
+        query = select(models.Camera.id, latest.c.timestamp, latest.c.analytics_data).join(latest, true())
+        if camera_ids is not None:
+            query = query.where(models.Camera.id.in_(camera_ids))
+        return query
     
-    db.commit()
-    return db_log
+    # Database lain (SQLite development): window function ROW_NUMBER()
+    row_number = func.row_number().over(partition_by=Log.camera_id, order_by=Log.timestamp.desc()).label("rn")
+    ranked = select(Log.camera_id, Log.timestamp, Log.analytics_data, row_number)
+    if camera_ids is not None:
+        ranked = ranked.where(Log.camera_id.in_(camera_ids))
+    ranked = ranked.subquery()
+    return select(ranked.c.camera_id, ranked.c.timestamp, ranked.c.analytics_data).where(ranked.c.rn == 1)
+
+def get_latest_logs(db: Session, camera_ids: Optional[List[int]] = None):
+    """Log terbaru per kamera dalam SATU query: [(camera_id, timestamp, analytics_data), ...]."""
+    if camera_ids is not None and not camera_ids:
+        return []
+    return db.execute(latest_logs_query(db.get_bind().dialect.name, camera_ids)).all()
+
+def get_camera_branch_ids(db: Session, camera_ids: List[int]) -> Dict[int, int]:
+    """{camera_id: branch_id} untuk kamera-kamera ini dalam satu query."""
+    if not camera_ids:
+        return {}
+    return dict(db.execute(
+        select(models.Camera.id, models.Camera.branch_id).where(models.Camera.id.in_(camera_ids))
+    ).all())
+
+# --- CRUD ROLLUP ANALITIK ---
+
+def upsert_rollups(db: Session, rows: List[Dict[str, Any]]):
+    """
+    INSERT ... ON CONFLICT DO UPDATE: agregat parsial digabung dengan bucket yang sudah ada
+    (count & sum dijumlah, min/max dibandingkan, last diambil dari sampel dengan last_at terbaru).
+    Tidak melakukan commit.
+    """
+    Rollup = models.AnalyticsRollup
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = postgresql.insert(Rollup)
+        least, greatest = func.least, func.greatest
+    else:
+        # SQLite: min()/max() dengan dua argumen adalah fungsi skalar
+        stmt = sqlite.insert(Rollup)
+        least, greatest = func.min, func.max
+    
+    newer = stmt.excluded.last_at >= Rollup.last_at
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["scope", "scope_id", "bucket_seconds", "bucket_start", "metric"],
+        set_={
+            "count": Rollup.count + stmt.excluded.count,
+            "min": least(Rollup.min, stmt.excluded.min),
+            "max": greatest(Rollup.max, stmt.excluded.max),
+            "sum": Rollup.sum + stmt.excluded.sum,
+            "last": case((newer, stmt.excluded.last), else_=Rollup.last),
+            "last_at": case((newer, stmt.excluded.last_at), else_=Rollup.last_at),
+        },
+    )
+    db.execute(stmt, rows)
+
+def rollups_query(scope: str, scope_id: int, bucket_seconds: int,
+                  start: datetime, end: datetime, metrics: Optional[List[str]] = None):
+    """Bucket rollup dalam rentang [start, end) urut waktu; hanya membaca analytics_rollups."""
+    Rollup = models.AnalyticsRollup
+    query = select(Rollup).where(
+        Rollup.scope == scope,
+        Rollup.scope_id == scope_id,
+        Rollup.bucket_seconds == bucket_seconds,
+        Rollup.bucket_start >= start,
+        Rollup.bucket_start < end,
+    )
+    if metrics:
+        query = query.where(Rollup.metric.in_(metrics))
+    return query.order_by(Rollup.bucket_start)
+
+# --- CRUD EVENT TRANSISI MEJA ---
+
+def insert_table_events(db: Session, rows: List[Dict[str, Any]]):
+    """INSERT ... ON CONFLICT DO NOTHING (event yang sama dari replay spool diabaikan). Tidak melakukan commit."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.TableEvent).on_conflict_do_nothing(index_elements=["camera_id", "table_id", "at"])
+    db.execute(stmt, rows)
+
+def table_turnover_query(branch_id: int, start: datetime, end: datetime):
+    """Per meja: jumlah transisi menjadi OCCUPIED & rata-rata lama OCCUPIED, dalam satu GROUP BY."""
+    Event = models.TableEvent
+    return (
+        select(
+            Event.camera_id,
+            Event.table_id,
+            func.sum(case((Event.to_status == 'OCCUPIED', 1), else_=0)).label("seatings"),
+            func.avg(case((Event.from_status == 'OCCUPIED', Event.dwell_seconds))).label("avg_occupied_seconds"),
+        )
+        .where(Event.branch_id == branch_id, Event.at >= start, Event.at < end)
+        .group_by(Event.camera_id, Event.table_id)
+        .order_by(Event.camera_id, Event.table_id)
+    )
+
+def cleaning_cycles_query(branch_id: int, start: datetime, end: datetime):
+    """
+    Satu baris per siklus pembersihan (event DIRTY) yang dimulai dalam rentang, dihitung di
+    database: window function memberi nomor siklus per meja (jumlah kumulatif event DIRTY), lalu
+    GROUP BY per siklus mengambil waktu DIRTY, CLEANING pertama, dan penutup pertama
+    (AVAILABLE = selesai dibersihkan, OCCUPIED = siklus batal). Endpoint SLA tidak memuat semua event.
+    """
+    Event = models.TableEvent
+    cycle = func.sum(case((Event.to_status == 'DIRTY', 1), else_=0)).over(
+        partition_by=(Event.camera_id, Event.table_id), order_by=(Event.at, Event.id), rows=(None, 0)
+    )
+    events = (
+        select(Event.camera_id, Event.table_id, Event.to_status, Event.at, cycle.label("cycle"))
+        .where(Event.branch_id == branch_id, Event.at >= start, Event.at < end)
+        .subquery()
+    )
+
+    def first(status):
+        return func.min(case((events.c.to_status == status, events.c.at))).label(f"{status.lower()}_at")
+
+    return (
+        select(first('DIRTY'), first('CLEANING'), first('AVAILABLE'), first('OCCUPIED'))
+        .where(events.c.cycle > 0)
+        .group_by(events.c.camera_id, events.c.table_id, events.c.cycle)
+    )
 
-def get_cameras_by_branch(db: Session, branch_id: int):
-    """Mengambil semua kamera yang terdaftar di satu cabang."""
-    return db.query(models.Camera).filter(models.Camera.branch_id == branch_id).all()
+def table_events_query(start: datetime, end: datetime, branch_id: Optional[int] = None,
+                       camera_id: Optional[int] = None, limit: Optional[int] = None):
+    """Event transisi meja dalam rentang [start, end) urut per meja lalu waktu."""
+    Event = models.TableEvent
+    query = select(Event).where(Event.at >= start, Event.at < end)
+    if branch_id is not None:
+        query = query.where(Event.branch_id == branch_id)
+    if camera_id is not None:
+        query = query.where(Event.camera_id == camera_id)
+    query = query.order_by(Event.camera_id, Event.table_id, Event.at)
+    return query.limit(limit) if limit else query
 
 def check_camera_heartbeats(db: Session):
     """
@@ -0,0 +1,81 @@
+"""
+Varian async dari CRUD yang dipakai endpoint API (AsyncSession, asyncpg/aiosqlite).
+
+Endpoint API hanya memakai modul ini. app/crud.py tinggal berisi penulisan log
+(crud.create_detection_logs_bulk, flush ingest berjalan di thread latar dengan engine
+sync) dan builder query yang rumit (log terbaru per kamera, rollup, event meja) yang
+dipakai bersama di sini agar versi sync dan async tidak bisa menyimpang.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud, models, schemas
+
+# --- CRUD BRANCH & CAMERA ---
+
+async def get_branch(db: AsyncSession, branch_id: int):
+    return await db.get(models.Branch, branch_id)
+
+async def get_camera(db: AsyncSession, camera_id: int):
+    return await db.get(models.Camera, camera_id)
+
+async def get_cameras(db: AsyncSession, branch_id: Optional[int] = None):
+    """Semua kamera (opsional per cabang) urut ID."""
+    query = select(models.Camera).order_by(models.Camera.id)
+    if branch_id is not None:
+        query = query.where(models.Camera.branch_id == branch_id)
+    return (await db.execute(query)).scalars().all()
+
+async def get_cameras_by_branch(db: AsyncSession, branch_id: int):
+    return await get_cameras(db, branch_id)
+
+async def update_camera(db: AsyncSession, camera_id: int, camera_update: schemas.CameraUpdate):
+    """Update konfigurasi kamera (rtsp_url dan/atau roi_settings)."""
+    db_camera = await get_camera(db, camera_id)
+    if db_camera is None:
+        return None
+    if camera_update.rtsp_url is not None:
+        db_camera.rtsp_url = camera_update.rtsp_url
+    if camera_update.roi_settings is not None:
+        db_camera.roi_settings = camera_update.roi_settings
+    await db.commit()
+    return db_camera
+
+# --- LOG & ROLLUP (BACA SAJA) ---
+
+async def get_latest_logs(db: AsyncSession, camera_ids: Optional[List[int]] = None):
+    """Log terbaru per kamera dalam SATU query: [(camera_id, timestamp, analytics_data), ...]."""
+    if camera_ids is not None and not camera_ids:
+        return []
+    return (await db.execute(crud.latest_logs_query(db.bind.dialect.name, camera_ids))).all()
+
+async def get_rollups(db: AsyncSession, scope: str, scope_id: int, bucket_seconds: int,
+                      start: datetime, end: datetime, metrics: Optional[List[str]] = None):
+    query = crud.rollups_query(scope, scope_id, bucket_seconds, start, end, metrics)
+    return (await db.execute(query)).scalars().all()
+
+# --- EVENT TRANSISI MEJA (BACA SAJA) ---
+
+async def get_table_turnover(db: AsyncSession, branch_id: int, start: datetime, end: datetime):
+    return (await db.execute(crud.table_turnover_query(branch_id, start, end))).all()
+
+async def get_cleaning_cycles(db: AsyncSession, branch_id: int, start: datetime, end: datetime):
+    return (await db.execute(crud.cleaning_cycles_query(branch_id, start, end))).all()
+
+async def get_table_events(db: AsyncSession, start: datetime, end: datetime, branch_id: Optional[int] = None,
+                           camera_id: Optional[int] = None, limit: Optional[int] = None):
+    query = crud.table_events_query(start, end, branch_id, camera_id, limit)
+    return (await db.execute(query)).scalars().all()
+
+# --- AUTHENTICATION ---
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return (await db.execute(select(models.User).where(models.User.username == username))).scalars().first()
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """bcrypt sengaja lambat (puluhan-ratusan ms CPU); dijalankan di threadpool agar event loop tidak terblokir."""
+    return await run_in_threadpool(crud.verify_password, plain_password, hashed_password)
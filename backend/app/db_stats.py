@@ -0,0 +1,75 @@
+"""
+Penghitung statement SQL per request HTTP dan per flush ingest.
+
+Aktif hanya jika DB_STATEMENT_STATS=true (dipakai loadtest.py): listener
+before_cursor_execute menambah counter milik context saat ini (contextvar), sehingga
+statement yang dijalankan di threadpool FastAPI tetap terhitung ke request asalnya.
+Jumlahnya dikirim di header response X-DB-Statements, untuk menangkap regresi N+1
+di endpoint dashboard/konfigurasi tanpa profiler.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+HEADER = b"x-db-statements"
+
+_current = contextvars.ContextVar("db_statement_counter", default=None)
+_installed = False
+
+
+class StatementCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def install(engine) -> None:
+    """Pasang listener penghitung pada engine (untuk engine async: async_engine.sync_engine)."""
+    global _installed
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    _installed = True
+
+
+def enabled() -> bool:
+    return _installed
+
+
+@contextmanager
+def count_statements():
+    """Menghitung statement yang dijalankan di dalam blok ini (termasuk di thread yang mewarisi context-nya)."""
+    counter = StatementCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+class StatementCountMiddleware:
+    """Middleware ASGI: menambahkan header X-DB-Statements ke setiap response HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_statements() as counter:
+            async def send_with_count(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", [])) + [(HEADER, str(counter.count).encode())]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_count)
@@ -0,0 +1,262 @@
+"""
+Pipeline ingest log dari AI Worker.
+
+Endpoint /logs/ dan /logs/batch hanya memasukkan log ke buffer memori. Task latar
+mem-flush buffer setiap INGEST_FLUSH_INTERVAL_SECONDS:
+  - semua log ditulis dengan INSERT multi-row (meja DINING sebagai tables_packed, app/wire.py),
+  - heartbeat semua kamera ditulis dengan SATU UPDATE ke tabel cameras,
+  - agregat rollup time-series (app/rollups.py) di-UPSERT,
+  - event transisi status meja (app/table_events.py) di-INSERT ke table_events,
+  - semuanya dalam satu transaksi (satu commit/fsync per flush, bukan per request).
+
+Log/event untuk kamera yang tidak ada di database dibuang saat flush (dihitung di metrik).
+Gangguan koneksi database membuat batch diulang pada flush berikutnya; batch yang DITOLAK
+database (misal constraint) ditulis ulang per baris agar satu baris buruk tidak memblokir
+antrian semua kamera.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from . import crud, db_stats, schemas, table_events, wire
+from .core.config import settings
+from .core.database import SessionLocal
+from .latest_cache import latest_cache
+from .live import live_hub
+from .rollups import RollupAccumulator
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    """Timestamp worker dengan zona waktu (misal '...Z' / '+07:00') -> UTC naif, seperti kolom detection_logs."""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Gangguan koneksi/database (layak diulang) vs data yang ditolak database (diulang pun tetap gagal)."""
+    return isinstance(error, (OperationalError, InterfaceError)) or (
+        isinstance(error, DBAPIError) and error.connection_invalidated
+    )
+
+
+class IngestBufferFull(Exception):
+    """Buffer penuh (flush tertinggal); worker sebaiknya menyimpan ke spool dan mencoba lagi."""
+
+
+class IngestBuffer:
+    """Buffer log + heartbeat di memori yang di-flush berkala ke database."""
+
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rows = []        # Baris detection_logs yang belum ditulis
+        self._enqueued_at = [] # time.monotonic() saat tiap baris diterima
+        self._heartbeats = {}  # {camera_id: waktu terima terakhir}
+        self._rollups = RollupAccumulator()  # Agregat rollup yang belum ditulis
+        self._table_events = []  # [(camera_id, schemas.TableEventCreate)] yang belum ditulis
+
+        # Metrik
+        self.started_at = time.time()
+        self.received_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.rejected_total = 0
+        self.clock_skew_total = 0      # Log dengan timestamp worker di masa depan (diganti waktu terima)
+        self.unknown_camera_total = 0  # Log + event dengan camera_id yang tidak ada di database
+        self.dropped_total = 0         # Log + event yang tetap ditolak database saat ditulis per baris
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+        self.last_flush_statements = None  # Hanya terisi jika DB_STATEMENT_STATS aktif
+        self._latencies_ms = deque(maxlen=4096)  # Latensi terima -> commit per baris (sampel terbaru)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def enqueue(self, logs: List[schemas.DetectionLogCreate]) -> int:
+        """Memasukkan log ke buffer. Raise IngestBufferFull jika buffer sudah penuh."""
+        now = datetime.utcnow()
+        received = time.monotonic()
+        # Jam worker yang terlalu cepat tidak boleh menulis ke hari yang belum punya partisi
+        # (baris jatuh ke partisi DEFAULT); timestamp seperti itu diganti waktu terima
+        latest_allowed = now + timedelta(seconds=settings.INGEST_MAX_CLOCK_SKEW_SECONDS)
+        timestamps = [_naive_utc(log.timestamp) if log.timestamp else now for log in logs]
+        skewed = sum(1 for timestamp in timestamps if timestamp > latest_allowed)
+        if skewed:
+            timestamps = [now if timestamp > latest_allowed else timestamp for timestamp in timestamps]
+        with self._lock:
+            if len(self._rows) + len(logs) > self.max_buffer:
+                self.rejected_total += len(logs)
+                raise IngestBufferFull()
+            for log, timestamp in zip(logs, timestamps):
+                self._rows.append({
+                    "camera_id": log.camera_id,
+                    "analytics_data": wire.pack_tables(log.analytics_data),
+                    "timestamp": timestamp,
+                })
+                self._enqueued_at.append(received)
+                self._rollups.add(log.camera_id, timestamp, log.analytics_data)
+                # Heartbeat memakai waktu terima, bukan waktu deteksi (log bisa berasal dari spool)
+                self._heartbeats[log.camera_id] = now
+                self._table_events.extend((log.camera_id, event) for event in log.table_events)
+            self.received_total += len(logs)
+            self.clock_skew_total += skewed
+        
+        # Dashboard (cache & stream live) langsung melihat data terbaru tanpa menunggu flush ke database
+        for log, timestamp in zip(logs, timestamps):
+            if latest_cache.update(log.camera_id, timestamp, log.analytics_data):
+                live_hub.publish(log.camera_id, timestamp, log.analytics_data)
+        return len(logs)
+
+    def flush(self) -> int:
+        """Menulis seluruh isi buffer ke database dalam satu transaksi. Mengembalikan jumlah baris."""
+        with self._flush_lock:
+            with self._lock:
+                rows, enqueued_at, heartbeats, rollups = self._rows, self._enqueued_at, self._heartbeats, self._rollups
+                events = self._table_events
+                self._rows, self._enqueued_at, self._heartbeats, self._table_events = [], [], {}, []
+                self._rollups = RollupAccumulator()
+            if not rows and not heartbeats:
+                return 0
+
+            started = time.monotonic()
+            db = SessionLocal()
+            isolated = False
+            try:
+                with db_stats.count_statements() as statements:
+                    camera_ids = {row["camera_id"] for row in rows} | set(heartbeats) | {cid for cid, _ in events}
+                    camera_branch = crud.get_camera_branch_ids(db, list(camera_ids))
+                    rows, enqueued_at, heartbeats, events = self._known_cameras(
+                        camera_branch, rows, enqueued_at, heartbeats, events)
+                    try:
+                        crud.create_detection_logs_bulk(db, rows, heartbeats, rollups.rows(camera_branch),
+                                                        table_events.event_rows(events, camera_branch))
+                    except Exception as e:
+                        if _is_transient(e):
+                            raise
+                        db.rollback()
+                        print(f"⚠️ Batch {len(rows)} log ditolak database ({getattr(e, 'orig', e)}), ditulis ulang per baris.")
+                        isolated = True
+                        enqueued_at = self._write_isolated(db, camera_branch, rows, enqueued_at, heartbeats,
+                                                           rollups, events)
+            except Exception as e:
+                db.rollback()
+                # Gangguan database: kembalikan ke depan buffer agar dicoba lagi pada flush berikutnya
+                # (_write_isolated sudah mengembalikan sendiri bagian yang belum tertulis)
+                if not isolated:
+                    self._requeue(rows, enqueued_at, heartbeats, rollups, events)
+                self.flush_errors += 1
+                print(f"❌ Gagal flush {len(rows)} log ke database: {e}")
+                return 0
+            finally:
+                db.close()
+
+            done = time.monotonic()
+            self.flush_count += 1
+            self.flushed_total += len(enqueued_at)
+            self.last_flush_rows = len(enqueued_at)
+            self.last_flush_ms = (done - started) * 1000
+            if db_stats.enabled():
+                self.last_flush_statements = statements.count
+            self._latencies_ms.extend((done - t) * 1000 for t in enqueued_at)
+            return len(enqueued_at)
+
+    def _known_cameras(self, camera_branch, rows, enqueued_at, heartbeats, events):
+        """Membuang log/heartbeat/event untuk kamera yang tidak ada (FK cameras akan menolak seluruh batch)."""
+        unknown = sum(1 for row in rows if row["camera_id"] not in camera_branch)
+        unknown += sum(1 for camera_id, _ in events if camera_id not in camera_branch)
+        if not unknown:
+            return rows, enqueued_at, heartbeats, events
+        self.unknown_camera_total += unknown
+        print(f"⚠️ {unknown} log/event untuk kamera yang tidak terdaftar dibuang.")
+        kept = [i for i, row in enumerate(rows) if row["camera_id"] in camera_branch]
+        return ([rows[i] for i in kept], [enqueued_at[i] for i in kept],
+                {cid: ts for cid, ts in heartbeats.items() if cid in camera_branch},
+                [(cid, event) for cid, event in events if cid in camera_branch])
+
+    def _write_isolated(self, db, camera_branch, rows, enqueued_at, heartbeats, rollups, events) -> list:
+        """
+        Fallback saat batch ditolak database: tiap log dan event ditulis dalam transaksi sendiri,
+        yang tetap ditolak dibuang (dropped_total). Jika koneksi terputus di tengah jalan, sisanya
+        dikembalikan ke buffer. Mengembalikan enqueued_at log yang tertulis.
+        """
+        written = []
+        pending = list(zip(rows, enqueued_at))
+        try:
+            while pending:
+                row, received = pending[0]
+                if self._write_one(db, lambda: crud.create_detection_logs_bulk(db, [row], {})):
+                    written.append(received)
+                pending.pop(0)
+            if heartbeats or rollups:
+                self._write_one(db, lambda: crud.create_detection_logs_bulk(db, [], heartbeats, rollups.rows(camera_branch)))
+                heartbeats, rollups = {}, RollupAccumulator()
+            while events:
+                event_rows = table_events.event_rows(events[:1], camera_branch)
+                self._write_one(db, lambda: crud.create_detection_logs_bulk(db, [], {}, None, event_rows))
+                events = events[1:]
+        except Exception:
+            db.rollback()
+            self._requeue([row for row, _ in pending], [t for _, t in pending], heartbeats, rollups, events)
+            raise
+        return written
+
+    def _write_one(self, db, write) -> bool:
+        try:
+            write()
+            return True
+        except Exception as e:
+            db.rollback()
+            if _is_transient(e):
+                raise
+            self.dropped_total += 1
+            print(f"❌ Data ditolak database dan dibuang: {getattr(e, 'orig', e)}")
+            return False
+
+    def _requeue(self, rows, enqueued_at, heartbeats, rollups, events):
+        with self._lock:
+            self._rows[:0] = rows
+            self._enqueued_at[:0] = enqueued_at
+            for camera_id, ts in heartbeats.items():
+                self._heartbeats.setdefault(camera_id, ts)
+            self._rollups.merge(rollups)
+            self._table_events[:0] = events
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies_ms)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2) if latencies else None
+
+        uptime = time.time() - self.started_at
+        return {
+            "buffered": len(self._rows),
+            "received_total": self.received_total,
+            "flushed_total": self.flushed_total,
+            "rejected_total": self.rejected_total,
+            "clock_skew_total": self.clock_skew_total,
+            "unknown_camera_total": self.unknown_camera_total,
+            "dropped_total": self.dropped_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "last_flush_statements": self.last_flush_statements,
+            "throughput_per_second": round(self.flushed_total / uptime, 2) if uptime > 0 else 0.0,
+            "ingest_latency_ms": {
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": round(latencies[-1], 2) if latencies else None,
+            },
+            "uptime_seconds": round(uptime, 1),
+        }
+
+
+# Instance global (satu per proses backend)
+ingest_buffer = IngestBuffer(settings.INGEST_MAX_BUFFER)
@@ -0,0 +1,87 @@
+"""
+Cache analitik terbaru per kamera untuk dashboard.
+
+Pipeline ingest memperbarui cache setiap kali log diterima, sehingga dashboard tidak
+perlu membaca detection_logs sama sekali. Kamera yang belum ada di cache (misal setelah
+restart) atau entrinya sudah lebih tua dari DASHBOARD_CACHE_TTL_SECONDS dimuat dengan
+SATU query "log terbaru per kamera" (crud.get_latest_logs).
+
+Cache ini per proses; TTL menjaga data tetap segar jika backend dijalankan dengan
+beberapa worker uvicorn (log bisa diterima oleh proses lain).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import crud, crud_async, wire
+from .core.config import settings
+
+
+class LatestAnalyticsCache:
+    """{camera_id: (timestamp, analytics_data)} dengan waktu validasi per entri."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}      # {camera_id: (timestamp | None, analytics_data | None)}
+        self._validated_at = {} # {camera_id: time.monotonic() terakhir dicek ke DB / diisi ingest}
+
+    def update(self, camera_id: int, timestamp: datetime, analytics_data: Dict[str, Any]) -> bool:
+        """Dipanggil pipeline ingest. Log yang lebih tua (misal replay spool) tidak menimpa yang baru."""
+        with self._lock:
+            current = self._entries.get(camera_id)
+            if current and current[0] is not None and current[0] > timestamp:
+                return False
+            self._entries[camera_id] = (timestamp, analytics_data)
+            self._validated_at[camera_id] = time.monotonic()
+            return True
+
+    def get(self, camera_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(camera_id)
+        return entry[1] if entry else None
+
+    def _stale(self, camera_ids):
+        now = time.monotonic()
+        return [cid for cid in camera_ids
+                if now - self._validated_at.get(cid, float('-inf')) > self.ttl_seconds]
+
+    def get_latest(self, db: Session, camera_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Analitik terbaru untuk kamera-kamera ini; yang tidak ada/kedaluwarsa dimuat dengan satu query."""
+        camera_ids = list(camera_ids)
+        stale = self._stale(camera_ids)
+        if stale:
+            self.refresh(db, stale)
+        return {cid: self.get(cid) for cid in camera_ids}
+
+    async def get_latest_async(self, db: AsyncSession, camera_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Sama dengan get_latest() untuk endpoint async (AsyncSession)."""
+        camera_ids = list(camera_ids)
+        stale = self._stale(camera_ids)
+        if stale:
+            self._apply(await crud_async.get_latest_logs(db, stale), stale)
+        return {cid: self.get(cid) for cid in camera_ids}
+
+    def refresh(self, db: Session, camera_ids: Optional[Iterable[int]] = None):
+        """Memuat ulang log terbaru dari database (semua kamera jika camera_ids None)."""
+        camera_ids = None if camera_ids is None else list(camera_ids)
+        self._apply(crud.get_latest_logs(db, camera_ids), camera_ids)
+
+    def _apply(self, rows, camera_ids: Optional[List[int]]):
+        now = time.monotonic()
+        with self._lock:
+            for camera_id, timestamp, analytics_data in rows:
+                current = self._entries.get(camera_id)
+                if not current or current[0] is None or current[0] <= timestamp:
+                    self._entries[camera_id] = (timestamp, wire.unpack_tables(analytics_data))
+                self._validated_at[camera_id] = now
+            # Kamera tanpa log sama sekali juga dicatat agar tidak di-query ulang sebelum TTL
+            for camera_id in camera_ids or []:
+                self._entries.setdefault(camera_id, (None, None))
+                self._validated_at[camera_id] = now
+
+# Instance global (satu per proses backend)
+latest_cache = LatestAnalyticsCache(settings.DASHBOARD_CACHE_TTL_SECONDS)
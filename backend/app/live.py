@@ -0,0 +1,158 @@
+"""
+Stream dashboard live (WebSocket) sebagai pengganti polling /dashboard/cameras/.
+
+- Klien terhubung ke /api/v1/dashboard/ws?branch_id=<id> (tanpa branch_id = semua cabang),
+  menerima satu pesan "snapshot", lalu hanya pesan "delta" per kamera setiap kali log baru
+  masuk lewat pipeline ingest. Di antara update tidak ada query database sama sekali.
+- Backpressure: setiap subscriber punya slot pending per kamera. Delta yang belum sempat
+  terkirim ditimpa delta berikutnya untuk kamera yang sama, sehingga klien lambat hanya
+  melewatkan state antara (memori per klien dibatasi jumlah kamera). Klien yang tidak
+  bisa menerima satu pesan dalam LIVE_SEND_TIMEOUT_SECONDS diputus.
+
+Seperti latest_cache, hub ini per proses: delta hanya berasal dari log yang diterima proses ini.
+"""
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class LiveSubscriber:
+    """Satu koneksi dashboard: delta pending per kamera + event untuk membangunkan pengirim."""
+
+    def __init__(self, branch_id: Optional[int]):
+        self.branch_id = branch_id
+        self.pending = {}  # {camera_id: pesan delta terbaru yang belum terkirim}
+        self.event = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, camera_id: int, message: Dict[str, Any]):
+        if camera_id in self.pending:
+            self.coalesced += 1
+        self.pending[camera_id] = message
+        self.event.set()
+
+    def take(self) -> list:
+        messages = list(self.pending.values())
+        self.pending.clear()
+        self.event.clear()
+        return messages
+
+
+class LiveDashboardHub:
+    """Mendistribusikan delta analitik ke subscriber per cabang. publish() aman dipanggil dari thread mana pun."""
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+        self._subscribers = {}    # {branch_id | None: set(LiveSubscriber)}
+        self._camera_branch = {}  # {camera_id: branch_id}, diisi saat snapshot dibuat
+
+        # Metrik
+        self.published_total = 0
+        self.disconnected_slow = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def register_cameras(self, cameras):
+        """Mencatat cabang tiap kamera (dipanggil dengan kamera dari query snapshot)."""
+        with self._lock:
+            for cam in cameras:
+                self._camera_branch[cam.id] = cam.branch_id
+
+    def subscribe(self, branch_id: Optional[int]) -> LiveSubscriber:
+        """Dipanggil dari event loop sebelum snapshot diambil, agar tidak ada delta yang terlewat."""
+        self._loop = asyncio.get_running_loop()
+        subscriber = LiveSubscriber(branch_id)
+        with self._lock:
+            self._subscribers.setdefault(branch_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LiveSubscriber):
+        with self._lock:
+            subs = self._subscribers.get(subscriber.branch_id)
+            if subs is not None:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._subscribers[subscriber.branch_id]
+
+    def publish(self, camera_id: int, timestamp: datetime, analytics_data: Dict[str, Any]):
+        """Dipanggil pipeline ingest (thread request) untuk setiap log terbaru suatu kamera."""
+        if not self._subscribers or self._loop is None:
+            return
+        message = {
+            "type": "delta",
+            "camera_id": camera_id,
+            "status": "ONLINE",
+            "timestamp": timestamp.isoformat() if timestamp else None,
+            "latest_log": analytics_data,
+        }
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, camera_id, message)
+        except RuntimeError:
+            # Event loop sudah berhenti (shutdown)
+            self._loop = None
+
+    def _dispatch(self, camera_id: int, message: Dict[str, Any]):
+        """Berjalan di event loop: teruskan delta ke subscriber cabang kamera dan subscriber semua cabang."""
+        with self._lock:
+            targets = list(self._subscribers.get(None, ()))
+            branch_id = self._camera_branch.get(camera_id)
+            if branch_id is not None:
+                targets.extend(self._subscribers.get(branch_id, ()))
+        for subscriber in targets:
+            subscriber.push(camera_id, message)
+        self.published_total += 1
+
+    def metrics(self) -> dict:
+        return {
+            "subscribers": self.subscriber_count,
+            "published_total": self.published_total,
+            "disconnected_slow": self.disconnected_slow,
+        }
+
+
+async def stream_to_websocket(websocket, subscriber: LiveSubscriber, snapshot: Dict[str, Any],
+                              send_timeout: float, ping_interval: float):
+    """
+    Loop pengirim satu koneksi: snapshot dulu, lalu delta yang sudah di-coalesce.
+    Selesai saat klien menutup koneksi atau terlalu lambat menerima.
+    """
+    async def send(message):
+        await asyncio.wait_for(websocket.send_json(message), timeout=send_timeout)
+
+    async def sender():
+        await send(snapshot)
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.event.wait(), timeout=ping_interval)
+            except asyncio.TimeoutError:
+                # Keep-alive agar proxy tidak memutus koneksi yang sepi
+                await send({"type": "ping"})
+                continue
+            for message in subscriber.take():
+                await send(message)
+
+    async def receiver():
+        # Pesan dari klien diabaikan; receive diperlukan untuk mendeteksi koneksi yang ditutup
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if isinstance(task.exception(), asyncio.TimeoutError):
+                live_hub.disconnected_slow += 1
+                await websocket.close(code=1013)  # Try again later
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Instance global (satu per proses backend)
+live_hub = LiveDashboardHub()
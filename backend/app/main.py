@@ -2,41 +2,121 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager # 🚨 IMPORT BARU
 from sqlalchemy.orm import Session # 🚨 IMPORT BARU
-from .core.database import engine, Base, SessionLocal # 🚨 PERLU IMPORT SessionLocal
-from . import models, crud # 🚨 PERLU IMPORT CRUD
+from .core.database import engine, async_engine, Base, SessionLocal # 🚨 PERLU IMPORT SessionLocal
+from . import models, crud, partitioning, rollups, table_events, db_stats # 🚨 PERLU IMPORT CRUD
 from .api.v1.router import router
+from .core.config import settings
+from .ingest import ingest_buffer
+from .latest_cache import latest_cache
+from .worker_auth import worker_authenticator
 import asyncio # 🚨 IMPORT BARU
+import anyio
 
 # --- FUNGSI BACKGROUND CHECK ---
+def check_heartbeats():
+    # Panggil fungsi CRUD dalam sesi database terpisah
+    db: Session = SessionLocal()
+    try:
+        crud.check_camera_heartbeats(db)
+    finally:
+        db.close()
+
 async def heartbeat_check_task():
     """Loop asynchronous yang menjalankan pengecekan setiap 60 detik."""
     while True:
-        # Panggil fungsi CRUD dalam sesi database terpisah
-        db: Session = SessionLocal()
-        try:
-            crud.check_camera_heartbeats(db)
-        finally:
-            db.close()
+        # Query sync berjalan di thread agar event loop tidak terblokir
+        await asyncio.to_thread(check_heartbeats)
         
         # Tunggu 60 detik sebelum pengecekan berikutnya
         await asyncio.sleep(60)
 
+def refresh_worker_auth():
+    db: Session = SessionLocal()
+    try:
+        worker_authenticator.refresh(db)
+    finally:
+        db.close()
+
+async def worker_auth_refresh_task():
+    """Loop asynchronous: muat ulang daftar kunci worker yang dicabut (validasi per request tanpa DB)."""
+    while True:
+        await asyncio.sleep(settings.WORKER_REVOCATION_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(refresh_worker_auth)
+        except Exception as e:
+            # Daftar lama tetap dipakai sampai refresh berikutnya berhasil
+            print(f"❌ Gagal memuat daftar kunci worker yang dicabut: {e}")
+
+async def ingest_flush_task():
+    """Loop asynchronous yang mem-flush buffer log AI Worker ke database secara berkala."""
+    while True:
+        await asyncio.sleep(settings.INGEST_FLUSH_INTERVAL_SECONDS)
+        # Flush berjalan di thread agar event loop tidak terblokir oleh I/O database
+        await asyncio.to_thread(ingest_buffer.flush)
+
+async def log_maintenance_task():
+    """Loop asynchronous: siapkan partisi log hari berikutnya, hapus partisi, rollup & event meja kedaluwarsa."""
+    while True:
+        try:
+            await asyncio.to_thread(
+                partitioning.run_log_maintenance, engine,
+                settings.LOG_RETENTION_DAYS, settings.LOG_PARTITION_DAYS_AHEAD
+            )
+        except Exception as e:
+            print(f"❌ Maintenance partisi log gagal: {e}")
+        try:
+            await asyncio.to_thread(rollups.delete_expired_rollups, engine, {
+                60: settings.ROLLUP_MINUTE_RETENTION_DAYS,
+                900: settings.ROLLUP_QUARTER_HOUR_RETENTION_DAYS,
+                3600: settings.ROLLUP_HOUR_RETENTION_DAYS,
+            })
+        except Exception as e:
+            print(f"❌ Retensi rollup analitik gagal: {e}")
+        try:
+            await asyncio.to_thread(table_events.delete_expired_table_events, engine,
+                                    settings.TABLE_EVENT_RETENTION_DAYS)
+        except Exception as e:
+            print(f"❌ Retensi event meja gagal: {e}")
+        await asyncio.sleep(settings.LOG_MAINTENANCE_INTERVAL_SECONDS)
+
 # --- LIFESPAN MANAGER BARU ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. Buat tabel di database saat aplikasi start
     print("Membuat tabel-tabel di database...")
-    Base.metadata.create_all(bind=engine)
+    partitioning.create_all_tables(engine, days_ahead=settings.LOG_PARTITION_DAYS_AHEAD)
     print("✅ Tabel-tabel siap digunakan!")
     
+    # Threadpool untuk kerja blocking yang tersisa (bcrypt, RTSP, flush ingest)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
+    # Isi cache analitik terbaru dashboard dengan satu query
+    db: Session = SessionLocal()
+    try:
+        latest_cache.refresh(db)
+    finally:
+        db.close()
+    
+    # Daftar kunci worker yang dicabut & peta kamera -> cabang untuk validasi kunci worker
+    refresh_worker_auth()
+    
     # 2. Start Background Task
     task = asyncio.create_task(heartbeat_check_task())
+    flush_task = asyncio.create_task(ingest_flush_task())
+    maintenance_task = asyncio.create_task(log_maintenance_task())
+    auth_task = asyncio.create_task(worker_auth_refresh_task())
     
     # 3. Yield (Aplikasi berjalan)
     yield
     
     # 4. Shutdown (Hentikan Task saat aplikasi dimatikan)
     task.cancel()
+    flush_task.cancel()
+    maintenance_task.cancel()
+    auth_task.cancel()
+    # Pastikan log yang masih di buffer tidak hilang
+    await asyncio.to_thread(ingest_buffer.flush)
+    await async_engine.dispose()
 
 # Ubah inisialisasi FastAPI untuk menggunakan lifespan
 app = FastAPI(
@@ -58,6 +138,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Hitung statement SQL per request (header X-DB-Statements), hanya untuk load test
+if settings.DB_STATEMENT_STATS:
+    db_stats.install(engine)
+    db_stats.install(async_engine.sync_engine)
+    app.add_middleware(db_stats.StatementCountMiddleware)
+
 # Masukkan semua router API
 app.include_router(router)
 
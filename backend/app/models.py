@@ -1,5 +1,5 @@
 # /app/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, JSON, Boolean, Index, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .core.database import Base
 from datetime import datetime
@@ -50,10 +50,15 @@ class Camera(Base):
 
 class DetectionLog(Base):
     __tablename__ = "detection_logs"
+    # Di PostgreSQL tabel ini dibuat berpartisi harian oleh app/partitioning.py
+    __table_args__ = (
+        # Log terbaru per kamera & query rentang waktu per kamera
+        Index("ix_detection_logs_camera_id_timestamp", "camera_id", "timestamp"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, index=True)
     camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # DYNAMIC: DATA ANALITIK
     analytics_data = Column(JSON, default=dict)
@@ -78,4 +83,79 @@ class SystemAlert(Base):
     message = Column(String, nullable=False)
     severity = Column(String, default='INFO') # INFO, WARNING, CRITICAL
     is_resolved = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# ==========================================
+# 6. DATA: ROLLUP ANALITIK (TIME-SERIES)
+# ==========================================
+
+class AnalyticsRollup(Base):
+    """Agregat per bucket waktu (1 menit / 15 menit / 1 jam) per kamera atau per cabang, diisi oleh app/rollups.py."""
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        # Kunci upsert sekaligus index untuk query rentang waktu per scope & resolusi
+        UniqueConstraint("scope", "scope_id", "bucket_seconds", "bucket_start", "metric",
+                         name="uq_analytics_rollups_bucket"),
+        # Retensi per resolusi (DELETE berdasarkan bucket_seconds & bucket_start)
+        Index("ix_analytics_rollups_bucket_seconds_start", "bucket_seconds", "bucket_start"),
+    )
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    scope = Column(String, nullable=False)           # 'camera' / 'branch'
+    scope_id = Column(Integer, nullable=False)       # camera_id / branch_id
+    metric = Column(String, nullable=False)          # people_in, queue_length, tables_occupied, ...
+    bucket_seconds = Column(Integer, nullable=False) # 60, 900, 3600
+    bucket_start = Column(DateTime, nullable=False)  # UTC
+    
+    count = Column(Integer, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    sum = Column(Float, nullable=False)
+    last = Column(Float, nullable=False)
+    last_at = Column(DateTime, nullable=False)       # Timestamp log dari nilai `last`
+
+# ==========================================
+# 7. AUTH: KUNCI MESIN AI WORKER
+# ==========================================
+
+class WorkerKey(Base):
+    """
+    Kunci jangka panjang AI Worker (JWT bertanda tangan, jti = id). Token tidak disimpan;
+    tabel ini hanya untuk audit dan daftar pencabutan (revoked_at) yang dibaca berkala.
+    """
+    __tablename__ = "worker_keys"
+    
+    id = Column(String, primary_key=True)            # jti di dalam token
+    name = Column(String, nullable=False)            # Cth. "cabang-3-supervisor"
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)  # Semua kamera cabang ini
+    camera_ids = Column(JSON, default=list)          # Atau daftar kamera tertentu
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+
+# ==========================================
+# 8. DATA: EVENT TRANSISI STATUS MEJA
+# ==========================================
+
+class TableEvent(Base):
+    """
+    Satu transisi status meja DINING (AVAILABLE/OCCUPIED/DIRTY/CLEANING) yang dikirim AI Worker
+    setelah debounce. Turnover & SLA pembersihan dihitung dari tabel kecil ini, bukan dari log.
+    """
+    __tablename__ = "table_events"
+    __table_args__ = (
+        # Juga kunci idempotensi: batch yang dikirim ulang dari spool tidak menggandakan event
+        UniqueConstraint("camera_id", "table_id", "at", name="uq_table_events_camera_table_at"),
+        # Query turnover / SLA per cabang dalam rentang waktu
+        Index("ix_table_events_branch_id_at", "branch_id", "at"),
+    )
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    camera_id = Column(Integer, ForeignKey("cameras.id"), nullable=False)
+    branch_id = Column(Integer, nullable=True)         # Denormalisasi dari cameras.branch_id saat ditulis
+    table_id = Column(String, nullable=False)          # ID zona meja di roi_settings
+    from_status = Column(String, nullable=False)
+    to_status = Column(String, nullable=False)
+    at = Column(DateTime, nullable=False)              # UTC, saat perubahan mulai teramati
+    dwell_seconds = Column(Float, nullable=True)       # Lama meja berada di from_status
+    people_count = Column(Integer, nullable=True)
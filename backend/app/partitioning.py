@@ -0,0 +1,197 @@
+"""
+Partisi harian tabel detection_logs (PostgreSQL) dan retensi data.
+
+- detection_logs dibuat sebagai tabel induk PARTITION BY RANGE (timestamp),
+  satu partisi per hari (detection_logs_pYYYYMMDD) + partisi DEFAULT sebagai jaring pengaman.
+- Index komposit (camera_id, timestamp) dibuat di tabel induk sehingga otomatis ada
+  di setiap partisi: query log terbaru per kamera & rentang waktu tetap cepat.
+- Retensi: partisi yang lebih tua dari LOG_RETENTION_DAYS di-DROP (instan, tanpa
+  DELETE baris per baris / VACUUM besar).
+
+Database selain PostgreSQL (misal SQLite untuk development) memakai tabel biasa
+dan retensi dengan DELETE berdasarkan timestamp.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from . import models
+from .core.database import Base
+
+PARENT_TABLE = models.DetectionLog.__tablename__
+PARTITION_PREFIX = f"{PARENT_TABLE}_p"
+PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{8}})$")
+
+
+def is_postgres(engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :name)"
+    ), {"name": PARENT_TABLE}).scalar()
+
+
+def table_exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def create_partitioned_detection_logs(engine) -> bool:
+    """
+    Membuat detection_logs sebagai tabel partisi jika belum ada.
+    Mengembalikan False jika tabel lama (tidak berpartisi) sudah ada dan perlu migrasi manual.
+    """
+    with engine.begin() as conn:
+        if table_exists(conn, PARENT_TABLE):
+            if not is_partitioned(conn):
+                print(f"⚠️ Tabel {PARENT_TABLE} sudah ada tanpa partisi. "
+                      f"Migrasi manual diperlukan (rename tabel lama, jalankan init_db.py, lalu salin datanya).")
+                return False
+            return True
+
+        # PRIMARY KEY tabel partisi wajib memuat kolom kunci partisi (timestamp)
+        conn.execute(text(f"""
+            CREATE TABLE {PARENT_TABLE} (
+                id BIGSERIAL,
+                camera_id INTEGER NOT NULL REFERENCES cameras (id),
+                timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+                analytics_data JSON,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """))
+        conn.execute(text(
+            f"CREATE INDEX ix_{PARENT_TABLE}_camera_id_timestamp ON {PARENT_TABLE} (camera_id, timestamp)"
+        ))
+        conn.execute(text(f"CREATE TABLE {PARENT_TABLE}_default PARTITION OF {PARENT_TABLE} DEFAULT"))
+        print(f"✅ Tabel {PARENT_TABLE} dibuat dengan partisi harian.")
+    return True
+
+
+def ensure_partitions(engine, days_ahead: int = 3, days_back: int = 0) -> list:
+    """
+    Membuat partisi harian dari (hari ini - days_back) sampai (hari ini + days_ahead).
+    Tiap partisi dibuat dalam transaksinya sendiri: satu hari yang gagal tidak menggagalkan yang lain.
+    """
+    if not is_postgres(engine):
+        return []
+
+    with engine.connect() as conn:
+        if not table_exists(conn, PARENT_TABLE) or not is_partitioned(conn):
+            return []
+
+    created = []
+    today = datetime.utcnow().date()
+    for offset in range(-days_back, days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(day)
+        try:
+            with engine.begin() as conn:
+                if table_exists(conn, name):
+                    continue
+                _create_partition(conn, name, day)
+        except Exception as e:
+            print(f"❌ Gagal membuat partisi {name}: {e}")
+            continue
+        created.append(name)
+    return created
+
+
+def _create_partition(conn, name: str, day: date):
+    """
+    CREATE ... PARTITION OF gagal jika partisi DEFAULT sudah berisi baris untuk rentang hari itu
+    (misal dari jam worker yang terlalu cepat). Dalam kasus itu partisi dibuat sebagai tabel biasa,
+    baris dari DEFAULT dipindahkan, lalu di-ATTACH, semuanya dalam transaksi yang sama.
+    """
+    bounds = {"start": datetime.combine(day, datetime.min.time()),
+              "end": datetime.combine(day + timedelta(days=1), datetime.min.time())}
+    range_sql = f"FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+    default_table = f"{PARENT_TABLE}_default"
+    in_default = table_exists(conn, default_table) and conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {default_table} WHERE timestamp >= :start AND timestamp < :end)"
+    ), bounds).scalar()
+    if not in_default:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {range_sql}"))
+        return
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {default_table} WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds).rowcount
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {range_sql}"))
+    print(f"⚠️ {moved} baris dipindahkan dari {default_table} ke partisi baru {name}.")
+
+
+def list_partitions(engine) -> list:
+    """Daftar (nama_partisi, tanggal) partisi harian yang ada, urut dari yang tertua."""
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :parent"
+        ), {"parent": PARENT_TABLE}).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, datetime.strptime(match.group(1), "%Y%m%d").date()))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_expired_partitions(engine, retention_days: int) -> list:
+    """Retensi: DROP partisi harian yang seluruh isinya lebih tua dari retention_days."""
+    cutoff = datetime.utcnow().date() - timedelta(days=retention_days)
+
+    if not is_postgres(engine):
+        # Fallback non-PostgreSQL (database development yang kecil): DELETE biasa
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {PARENT_TABLE} WHERE timestamp < :cutoff"),
+                         {"cutoff": datetime.combine(cutoff, datetime.min.time())})
+        return []
+
+    dropped = []
+    for name, day in list_partitions(engine):
+        if day >= cutoff:
+            break
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+
+    # Baris lama yang sempat jatuh ke partisi DEFAULT dibersihkan dengan DELETE biasa (jumlahnya kecil)
+    with engine.begin() as conn:
+        if table_exists(conn, f"{PARENT_TABLE}_default"):
+            conn.execute(text(f"DELETE FROM {PARENT_TABLE}_default WHERE timestamp < :cutoff"),
+                         {"cutoff": datetime.combine(cutoff, datetime.min.time())})
+    return dropped
+
+
+def create_all_tables(engine, days_ahead: int = 3):
+    """Membuat semua tabel; di PostgreSQL detection_logs dibuat sebagai tabel berpartisi."""
+    if not is_postgres(engine):
+        Base.metadata.create_all(bind=engine)
+        return
+
+    # Tabel lain dulu (cameras harus ada untuk foreign key), lalu tabel partisi
+    other_tables = [t for t in Base.metadata.sorted_tables if t.name != PARENT_TABLE]
+    Base.metadata.create_all(bind=engine, tables=other_tables)
+    create_partitioned_detection_logs(engine)
+    ensure_partitions(engine, days_ahead=days_ahead)
+    # Tabel yang bergantung pada detection_logs (jika ada) dibuat setelahnya
+    Base.metadata.create_all(bind=engine)
+
+
+def run_log_maintenance(engine, retention_days: int, days_ahead: int):
+    """Dipanggil berkala: siapkan partisi hari-hari berikutnya dan buang data kedaluwarsa."""
+    created = ensure_partitions(engine, days_ahead=days_ahead)
+    dropped = drop_expired_partitions(engine, retention_days)
+    if created or dropped:
+        print(f"[{datetime.utcnow():%H:%M:%S}] Partisi log: dibuat {created}, dihapus {dropped}")
+    return created, dropped
@@ -0,0 +1,151 @@
+"""
+Rollup time-series analitik (1 menit, 15 menit, 1 jam) per kamera dan per cabang.
+
+- Saat log diterima pipeline ingest, metrik numerik dari analytics_data diekstrak dan
+  diakumulasi di memori per (kamera, metrik, resolusi, bucket): count, min, max, sum, last.
+- Saat flush, agregat parsial per kamera digabung menjadi agregat per cabang lalu
+  di-UPSERT ke analytics_rollups dalam transaksi yang sama dengan INSERT log.
+- Endpoint history hanya membaca analytics_rollups, tidak pernah mem-parse JSON detection_logs.
+
+Agregat cabang menggabungkan sampel semua kamera cabang itu (misal queue_length semua kasir).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete
+
+from . import models
+
+BUCKET_SECONDS = (60, 900, 3600)
+RESOLUTIONS = {"1m": 60, "15m": 900, "1h": 3600}
+TABLE_STATUSES = ("AVAILABLE", "OCCUPIED", "DIRTY", "CLEANING")
+
+# Resolusi otomatis: yang terhalus dengan jumlah titik per metrik tidak melebihi batas ini
+MAX_POINTS = 1500
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def extract_metrics(analytics_data: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Metrik numerik dari analytics_data: semua field angka di level atas
+    (people_in, queue_length, wait_time_avg, staff_active_count, ...) dan jumlah
+    meja per status untuk kamera DINING (tables_occupied, tables_dirty, ...).
+    """
+    metrics = {}
+    if not analytics_data:
+        return metrics
+    for key, value in analytics_data.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[key] = float(value)
+    tables = analytics_data.get("tables")
+    if isinstance(tables, list):
+        counts = dict.fromkeys(TABLE_STATUSES, 0)
+        for table in tables:
+            status = table.get("status") if isinstance(table, dict) else None
+            if status in counts:
+                counts[status] += 1
+        for status, count in counts.items():
+            metrics[f"tables_{status.lower()}"] = float(count)
+    return metrics
+
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    offset = int((timestamp - _EPOCH).total_seconds()) // seconds * seconds
+    return _EPOCH + timedelta(seconds=offset)
+
+
+def _merge(agg: list, other: list):
+    """Gabungkan agregat parsial [count, min, max, sum, last, last_at] `other` ke `agg`."""
+    agg[0] += other[0]
+    agg[1] = min(agg[1], other[1])
+    agg[2] = max(agg[2], other[2])
+    agg[3] += other[3]
+    if other[5] >= agg[5]:
+        agg[4], agg[5] = other[4], other[5]
+
+
+class RollupAccumulator:
+    """Agregat parsial di memori: {(camera_id, metric, bucket_seconds, bucket_start): [count, min, max, sum, last, last_at]}."""
+
+    def __init__(self):
+        self._aggs = {}
+
+    def __len__(self):
+        return len(self._aggs)
+
+    def add(self, camera_id: int, timestamp: datetime, analytics_data: Optional[Dict[str, Any]]):
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        for metric, value in extract_metrics(analytics_data).items():
+            sample = [1, value, value, value, value, timestamp]
+            for seconds in BUCKET_SECONDS:
+                key = (camera_id, metric, seconds, bucket_start(timestamp, seconds))
+                agg = self._aggs.get(key)
+                if agg is None:
+                    self._aggs[key] = list(sample)
+                else:
+                    _merge(agg, sample)
+
+    def merge(self, other: "RollupAccumulator"):
+        """Dipakai saat flush gagal: agregat yang belum tertulis dikembalikan ke accumulator aktif."""
+        for key, other_agg in other._aggs.items():
+            agg = self._aggs.get(key)
+            if agg is None:
+                self._aggs[key] = list(other_agg)
+            else:
+                _merge(agg, other_agg)
+
+    def rows(self, camera_branch: Dict[int, int]) -> list:
+        """Baris upsert analytics_rollups untuk scope kamera dan cabang (camera_branch: {camera_id: branch_id})."""
+        branch_aggs = {}
+        rows = []
+        for (camera_id, metric, seconds, start), agg in self._aggs.items():
+            branch_id = camera_branch.get(camera_id)
+            if branch_id is None:
+                # Kamera tidak terdaftar (lognya juga dibuang saat flush)
+                continue
+            rows.append(_row("camera", camera_id, metric, seconds, start, agg))
+            key = (branch_id, metric, seconds, start)
+            if key in branch_aggs:
+                _merge(branch_aggs[key], agg)
+            else:
+                branch_aggs[key] = list(agg)
+        for (branch_id, metric, seconds, start), agg in branch_aggs.items():
+            rows.append(_row("branch", branch_id, metric, seconds, start, agg))
+        return rows
+
+
+def _row(scope, scope_id, metric, seconds, start, agg) -> dict:
+    return {
+        "scope": scope, "scope_id": scope_id, "metric": metric,
+        "bucket_seconds": seconds, "bucket_start": start,
+        "count": agg[0], "min": agg[1], "max": agg[2], "sum": agg[3],
+        "last": agg[4], "last_at": agg[5],
+    }
+
+
+def pick_resolution(start: datetime, end: datetime) -> int:
+    """Resolusi terhalus yang jumlah titiknya masih <= MAX_POINTS."""
+    span = (end - start).total_seconds()
+    for seconds in BUCKET_SECONDS:
+        if span / seconds <= MAX_POINTS:
+            return seconds
+    return BUCKET_SECONDS[-1]
+
+
+def delete_expired_rollups(engine, retention_days: Dict[int, int]) -> int:
+    """Retensi per resolusi ({bucket_seconds: hari}); 0 = disimpan selamanya."""
+    deleted = 0
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for seconds, days in retention_days.items():
+            if not days:
+                continue
+            result = conn.execute(
+                delete(models.AnalyticsRollup)
+                .where(models.AnalyticsRollup.bucket_seconds == seconds)
+                .where(models.AnalyticsRollup.bucket_start < now - timedelta(days=days))
+            )
+            deleted += result.rowcount or 0
+    return deleted
@@ -1,6 +1,6 @@
 # /app/schemas.py
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 # --- CAMERA CONFIG (OUTPUT KE AI WORKER) ---
@@ -27,13 +27,30 @@ class BranchConfig(BaseModel):
         from_attributes = True
 
 # --- LOGGING DARI AI WORKER (INPUT) ---
+class TableEventCreate(BaseModel):
+    """Transisi status meja DINING dari AI Worker (sudah melewati debounce di worker)."""
+    table_id: str
+    from_status: str
+    to_status: str
+    at: datetime
+    dwell_seconds: Optional[float] = None
+    people_count: Optional[int] = None
+
 class DetectionLogCreate(BaseModel):
     """Schema yang diterima dari POST AI Worker."""
     camera_id: int = Field(alias='camera') 
     analytics_data: Dict[str, Any] = Field(default_factory=dict)
+    # Waktu deteksi di worker (UTC). Penting untuk data yang dikirim ulang dari spool.
+    timestamp: Optional[datetime] = None
+    # Transisi status meja sejak payload sebelumnya (ditulis ke table_events, bukan ke log)
+    table_events: List[TableEventCreate] = Field(default_factory=list)
 
     class Config:
         populate_by_name = True
+
+class DetectionLogBatch(BaseModel):
+    """Batch log dari AI Worker (POST /logs/batch)."""
+    logs: List[DetectionLogCreate]
         
 # --- DATA UNTUK DASHBOARD (OUTPUT KE FRONTEND) ---
 class CameraDashboard(CameraConfig):
@@ -44,6 +61,56 @@ class CameraDashboard(CameraConfig):
         from_attributes = True
         # /app/schemas.py (Tambahkan ini di bagian bawah)
 
+# --- HISTORY ANALITIK (DARI ROLLUP) ---
+class RollupPoint(BaseModel):
+    bucket_start: datetime
+    count: int
+    min: float
+    max: float
+    avg: float
+    last: float
+
+class AnalyticsHistory(BaseModel):
+    scope: str
+    scope_id: int
+    resolution_seconds: int
+    start: datetime
+    end: datetime
+    series: Dict[str, List[RollupPoint]] = Field(default_factory=dict)
+
+# --- ANALITIK MEJA (DARI table_events) ---
+class TableEvent(TableEventCreate):
+    camera_id: int
+
+    class Config:
+        from_attributes = True
+
+class TableTurnover(BaseModel):
+    camera_id: int
+    table_id: str
+    seatings: int                                  # Jumlah transisi menjadi OCCUPIED
+    avg_occupied_seconds: Optional[float] = None   # Rata-rata lama OCCUPIED (sampai DIRTY)
+
+class TurnoverReport(BaseModel):
+    branch_id: int
+    start: datetime
+    end: datetime
+    total_seatings: int
+    turnover_per_table: float
+    tables: List[TableTurnover] = Field(default_factory=list)
+
+class CleaningSlaReport(BaseModel):
+    branch_id: int
+    start: datetime
+    end: datetime
+    sla_seconds: float
+    cleaned: int                                        # Siklus DIRTY -> AVAILABLE yang selesai
+    breaches: int                                       # Siklus yang melebihi sla_seconds
+    open: int                                           # Siklus yang belum selesai di akhir rentang
+    compliance: Optional[float] = None                  # Proporsi siklus dalam SLA
+    time_to_clean_seconds: Dict[str, Optional[float]] = Field(default_factory=dict)    # p50/p90/max
+    response_seconds: Dict[str, Optional[float]] = Field(default_factory=dict)         # DIRTY -> CLEANING
+
 # --- AUTHENTICATION SCHEMAS ---
 class UserBase(BaseModel):
     username: str
@@ -0,0 +1,111 @@
+"""
+Cache snapshot JPEG per kamera untuk endpoint /cameras/{id}/snapshot.
+
+- AI Worker mem-publish JPEG terbaru secara berkala (PUT /cameras/{id}/snapshot), sehingga
+  selama worker hidup backend tidak pernah membuka stream RTSP sendiri.
+- Jika snapshot tidak ada / lebih tua dari SNAPSHOT_CACHE_TTL_SECONDS, backend mengambil
+  satu frame dari RTSP di threadpool. Lock per kamera (single-flight): request bersamaan
+  untuk kamera yang sama menunggu hasil pengambilan yang sama, bukan membuka stream lagi.
+- Setiap snapshot punya ETag (hash isi) untuk dukungan If-None-Match / 304.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .core.config import settings
+
+
+class Snapshot:
+    __slots__ = ("jpeg", "etag", "created_at", "source")
+
+    def __init__(self, jpeg: bytes, source: str):
+        self.jpeg = jpeg
+        self.etag = '"' + hashlib.sha1(jpeg).hexdigest()[:20] + '"'
+        self.created_at = time.monotonic()
+        self.source = source  # 'worker' / 'rtsp'
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class SnapshotCache:
+    """{camera_id: Snapshot} dengan TTL dan single-flight per kamera. Dipakai dari event loop."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: Dict[int, Snapshot] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+
+        # Metrik
+        self.hits = 0
+        self.rtsp_fetches = 0
+        self.worker_publishes = 0
+
+    def __contains__(self, camera_id: int) -> bool:
+        return camera_id in self._snapshots
+
+    def publish(self, camera_id: int, jpeg: bytes) -> Snapshot:
+        """Snapshot dari AI Worker (frame yang memang sudah didecode untuk inferensi)."""
+        snapshot = Snapshot(jpeg, "worker")
+        self._snapshots[camera_id] = snapshot
+        self.worker_publishes += 1
+        return snapshot
+
+    def _fresh(self, camera_id: int) -> Optional[Snapshot]:
+        snapshot = self._snapshots.get(camera_id)
+        if snapshot is not None and snapshot.age <= self.ttl_seconds:
+            return snapshot
+        return None
+
+    async def get(self, camera_id: int, fetch: Callable[[], Optional[bytes]]) -> Optional[Snapshot]:
+        """
+        Snapshot yang masih segar, atau hasil `fetch()` (blocking, dijalankan di threadpool).
+        Jika fetch gagal, snapshot lama (jika ada) tetap dikembalikan.
+        """
+        snapshot = self._fresh(camera_id)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        lock = self._locks.setdefault(camera_id, asyncio.Lock())
+        async with lock:
+            # Request lain mungkin sudah mengambilnya selama kita menunggu lock
+            snapshot = self._fresh(camera_id)
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+
+            self.rtsp_fetches += 1
+            jpeg = await run_in_threadpool(fetch)
+            if jpeg is None:
+                return self._snapshots.get(camera_id)
+            snapshot = Snapshot(jpeg, "rtsp")
+            self._snapshots[camera_id] = snapshot
+            return snapshot
+
+    def metrics(self) -> dict:
+        return {
+            "cached": len(self._snapshots),
+            "hits": self.hits,
+            "rtsp_fetches": self.rtsp_fetches,
+            "worker_publishes": self.worker_publishes,
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True jika header If-None-Match klien memuat ETag ini (atau '*')."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Instance global (satu per proses backend)
+snapshot_cache = SnapshotCache(settings.SNAPSHOT_CACHE_TTL_SECONDS)
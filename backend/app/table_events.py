@@ -0,0 +1,85 @@
+"""
+Event transisi status meja DINING (tabel table_events).
+
+- AI Worker mengirim transisi yang sudah di-debounce (ai-worker/table_states.py) di field
+  `table_events` payload log. Pipeline ingest menampungnya dan menulisnya saat flush dalam
+  transaksi yang sama dengan log (INSERT ... ON CONFLICT DO NOTHING: replay spool aman).
+- Turnover: jumlah transisi menjadi OCCUPIED per meja + rata-rata lama OCCUPIED, dihitung
+  dengan satu GROUP BY di database.
+- SLA pembersihan: siklus DIRTY -> (CLEANING) -> AVAILABLE per meja yang DIMULAI dalam
+  rentang waktu; siklus yang belum selesai di akhir rentang dihitung sebagai `open`, siklus
+  yang terputus karena pelanggan duduk di meja kotor tidak dihitung. Siklus dibentuk di
+  database (window function, satu baris per siklus); Python hanya menghitung persentil.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete
+
+from . import models, schemas
+
+
+def event_rows(events: Iterable[Tuple[int, schemas.TableEventCreate]], camera_branch: Dict[int, int]) -> List[Dict[str, Any]]:
+    """Baris INSERT table_events dari [(camera_id, event)]; branch_id diambil dari peta kamera -> cabang."""
+    return [{
+        "camera_id": camera_id,
+        "branch_id": camera_branch.get(camera_id),
+        "table_id": event.table_id,
+        "from_status": event.from_status,
+        "to_status": event.to_status,
+        # Disimpan sebagai UTC naif, sama seperti timestamp detection_logs
+        "at": event.at.astimezone(timezone.utc).replace(tzinfo=None) if event.at.tzinfo else event.at,
+        "dwell_seconds": event.dwell_seconds,
+        "people_count": event.people_count,
+    } for camera_id, event in events]
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(values)
+
+    def percentile(p):
+        return round(values[min(len(values) - 1, int(p * len(values)))], 1) if values else None
+
+    return {"p50": percentile(0.50), "p90": percentile(0.90), "max": round(values[-1], 1) if values else None}
+
+
+def summarize_cleaning(cycles, sla_seconds: float) -> Dict[str, Any]:
+    """
+    cycles: baris crud.cleaning_cycles_query (dirty_at, cleaning_at, available_at, occupied_at).
+    Mengembalikan jumlah siklus bersih, pelanggaran SLA, siklus terbuka, dan persentil waktu
+    bersih / respons staff.
+    """
+    durations, responses = [], []
+    open_cycles = 0
+    for cycle in cycles:
+        ends = [at for at in (cycle.available_at, cycle.occupied_at) if at is not None]
+        end_at = min(ends) if ends else None
+        if cycle.cleaning_at is not None and (end_at is None or cycle.cleaning_at < end_at):
+            responses.append((cycle.cleaning_at - cycle.dirty_at).total_seconds())
+        if end_at is None:
+            open_cycles += 1
+        elif cycle.available_at == end_at:
+            durations.append((cycle.available_at - cycle.dirty_at).total_seconds())
+        # Selain itu pelanggan duduk di meja yang belum dibersihkan: siklus dibatalkan
+
+    breaches = sum(1 for d in durations if d > sla_seconds)
+    return {
+        "cleaned": len(durations),
+        "breaches": breaches,
+        "open": open_cycles,
+        "compliance": round(1 - breaches / len(durations), 3) if durations else None,
+        "time_to_clean_seconds": _summary(durations),
+        "response_seconds": _summary(responses),
+    }
+
+
+def delete_expired_table_events(engine, retention_days: int) -> int:
+    """Retensi table_events (0 = disimpan selamanya)."""
+    if not retention_days:
+        return 0
+    with engine.begin() as conn:
+        result = conn.execute(
+            delete(models.TableEvent)
+            .where(models.TableEvent.at < datetime.utcnow() - timedelta(days=retention_days))
+        )
+    return result.rowcount or 0
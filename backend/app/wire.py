@@ -0,0 +1,218 @@
+"""
+Format kirim ringkas untuk log AI Worker (/logs/ dan /logs/batch).
+
+- Body dinegosiasi lewat header: Content-Type application/json (default) atau
+  application/msgpack, dan Content-Encoding opsional gzip atau zstd. msgpack dan
+  zstandard adalah dependency opsional; jika tidak terpasang, request dengan format
+  tersebut ditolak 415 sehingga worker bisa kembali ke JSON/gzip.
+- Meja DINING bisa dikirim sebagai delta (analytics_data.tables_delta): hanya meja yang
+  berubah, sebagai array posisi [id, status, people_count, capacity]. Backend menyimpan
+  state meja terakhir per kamera dan merekonstruksi daftar `tables` lengkap sebelum log
+  masuk ke pipeline ingest, sehingga cache dashboard, stream live, dan rollup tidak berubah.
+- Delta membawa nomor urut (seq) dan seq dasar (base). Jika base tidak cocok dengan state
+  backend (restart backend, response hilang, beberapa proses uvicorn), request ditolak 409
+  dengan daftar kamera yang perlu dikirim ulang sebagai keyframe (base = null).
+- Untuk penyimpanan, `tables` ditulis ke detection_logs sebagai `tables_packed` (array
+  posisi tanpa nama field per meja) dan dikembalikan ke bentuk dict saat dibaca.
+"""
+import json
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from . import schemas
+from .core.config import settings
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+TABLE_FIELDS = ("id", "status", "people_count", "capacity")
+
+
+# --- DECODE BODY REQUEST ---
+
+class WireStats:
+    """Jumlah byte body diterima (terkompresi) vs setelah dekompresi, per Content-Type/Content-Encoding."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}  # {"application/msgpack+zstd": [request, byte_diterima, byte_didekompresi]}
+
+    def record(self, key: str, wire_bytes: int, decoded_bytes: int):
+        with self._lock:
+            entry = self.requests.setdefault(key, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += wire_bytes
+            entry[2] += decoded_bytes
+
+    def metrics(self) -> dict:
+        return {key: {"requests": count, "wire_bytes": wire, "decoded_bytes": decoded}
+                for key, (count, wire, decoded) in list(self.requests.items())}
+
+
+def _decompress(body: bytes, encoding: str) -> bytes:
+    limit = settings.INGEST_MAX_BODY_BYTES
+    if encoding in ("", "identity"):
+        data = body
+    elif encoding == "gzip":
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = decompressor.decompress(body, limit + 1)
+        except zlib.error:
+            raise HTTPException(status_code=400, detail="Invalid gzip body")
+    elif encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise HTTPException(status_code=415, detail="zstd is not supported by this server")
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+                data = reader.read(limit + 1)
+        except zstandard.ZstdError:
+            raise HTTPException(status_code=400, detail="Invalid zstd body")
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    if len(data) > limit:
+        raise HTTPException(status_code=413, detail="Decoded body too large")
+    return data
+
+
+def _parse(data: bytes, content_type: str) -> Any:
+    if content_type == MSGPACK_CONTENT_TYPE:
+        try:
+            import msgpack
+        except ImportError:
+            raise HTTPException(status_code=415, detail="msgpack is not supported by this server")
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException):
+            raise HTTPException(status_code=400, detail="Invalid msgpack body")
+    if content_type in ("", "application/json") or content_type.endswith("+json"):
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+    raise HTTPException(status_code=415, detail=f"Unsupported Content-Type: {content_type}")
+
+
+async def read_body(request: Request, model: Type[BaseModel]) -> BaseModel:
+    """Membaca body JSON/msgpack (opsional gzip/zstd) dan memvalidasinya dengan schema Pydantic."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    encoding = request.headers.get("content-encoding", "").strip().lower()
+    body = await request.body()
+    data = _decompress(body, encoding)
+    payload = _parse(data, content_type)
+    wire_stats.record(f"{content_type or 'application/json'}+{encoding or 'identity'}", len(body), len(data))
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+# --- DELTA MEJA DINING ---
+
+def _table_dict(row) -> Dict[str, Any]:
+    return dict(zip(TABLE_FIELDS, row))
+
+
+class TableDeltaState:
+    """State meja terakhir per kamera ({camera_id: (seq, {table_id: [id, status, people_count, capacity]})})."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cameras: Dict[int, Tuple[int, Dict[Any, list]]] = {}
+
+        # Metrik
+        self.keyframes = 0
+        self.deltas = 0
+        self.resyncs = 0
+
+    def expand(self, logs: List[schemas.DetectionLogCreate]):
+        """
+        Merekonstruksi `tables` lengkap untuk log yang membawa tables_delta. Mengembalikan
+        (logs, pending): state baru baru disimpan lewat commit(pending) setelah log diterima
+        buffer ingest. Raise HTTPException 409 jika ada delta yang tidak bisa direkonstruksi.
+        """
+        pending: Dict[int, Tuple[int, Dict[Any, list]]] = {}
+        resync = set()
+        expanded = []
+        keyframes = deltas = 0
+        for log in logs:
+            delta = log.analytics_data.get("tables_delta")
+            if not isinstance(delta, dict):
+                expanded.append(log)
+                continue
+
+            base = delta.get("base")
+            if base is None:
+                tables = {}
+            else:
+                current = pending.get(log.camera_id) or self._cameras.get(log.camera_id)
+                if current is None or current[0] != base:
+                    resync.add(log.camera_id)
+                    continue
+                tables = dict(current[1])
+            try:
+                for row in delta.get("changed", ()):
+                    if len(row) != len(TABLE_FIELDS):
+                        raise ValueError(row)
+                    tables[row[0]] = list(row)
+                for table_id in delta.get("removed", ()):
+                    tables.pop(table_id, None)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=422, detail="Malformed tables_delta")
+            pending[log.camera_id] = (delta.get("seq"), tables)
+            if base is None:
+                keyframes += 1
+            else:
+                deltas += 1
+
+            analytics_data = {k: v for k, v in log.analytics_data.items() if k != "tables_delta"}
+            analytics_data["tables"] = [_table_dict(row) for row in tables.values()]
+            expanded.append(log.model_copy(update={"analytics_data": analytics_data}))
+
+        if resync:
+            with self._lock:
+                self.resyncs += len(resync)
+            raise HTTPException(status_code=409, detail={"message": "Table state out of sync, send keyframe",
+                                                         "resync": sorted(resync)})
+        with self._lock:
+            self.keyframes += keyframes
+            self.deltas += deltas
+        return expanded, pending
+
+    def commit(self, pending: Dict[int, Tuple[int, Dict[Any, list]]]):
+        with self._lock:
+            self._cameras.update(pending)
+
+    def metrics(self) -> dict:
+        return {"cameras": len(self._cameras), "keyframes": self.keyframes, "deltas": self.deltas,
+                "resyncs": self.resyncs}
+
+
+# --- PENYIMPANAN RINGKAS DI detection_logs ---
+
+def pack_tables(analytics_data: Dict[str, Any]) -> Dict[str, Any]:
+    """`tables` (list dict) -> `tables_packed` (list array posisi TABLE_FIELDS) untuk disimpan."""
+    tables = analytics_data.get("tables") if settings.LOG_PACK_TABLES else None
+    if not isinstance(tables, list) or not all(isinstance(t, dict) and t.keys() <= set(TABLE_FIELDS) for t in tables):
+        return analytics_data
+    packed = {k: v for k, v in analytics_data.items() if k != "tables"}
+    packed["tables_packed"] = [[t.get(field) for field in TABLE_FIELDS] for t in tables]
+    return packed
+
+
+def unpack_tables(analytics_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Kebalikan pack_tables() untuk log yang dibaca dari database (log lama tanpa tables_packed tidak berubah)."""
+    if not analytics_data or "tables_packed" not in analytics_data:
+        return analytics_data
+    unpacked = {k: v for k, v in analytics_data.items() if k != "tables_packed"}
+    unpacked["tables"] = [_table_dict(row) for row in analytics_data["tables_packed"]]
+    return unpacked
+
+
+# Instance global (satu per proses backend)
+wire_stats = WireStats()
+table_deltas = TableDeltaState()
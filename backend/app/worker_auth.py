@@ -0,0 +1,203 @@
+"""
+Autentikasi mesin untuk AI Worker tanpa query database per request.
+
+- Kunci worker = JWT jangka panjang (typ "worker") berisi jti dan cakupan: daftar kamera
+  (`cams`) dan/atau satu cabang (`branch`). Diterbitkan/dicabut dengan issue_worker_key.py.
+- Tanda tangan hanya diverifikasi sekali per token; klaimnya disimpan di LRU kecil, sehingga
+  request berikutnya cukup lookup dict + cek kedaluwarsa + cek daftar pencabutan.
+- Daftar kunci yang dicabut (worker_keys.revoked_at) dan peta kamera -> cabang dimuat ulang
+  oleh task latar setiap WORKER_REVOCATION_REFRESH_SECONDS, bukan per request.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, Optional
+
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .core.config import settings
+
+TOKEN_TYPE = "worker"
+
+
+class InvalidWorkerKey(Exception):
+    """Token dikirim tetapi gagal validasi (tanda tangan salah, rusak, kedaluwarsa, atau dicabut)."""
+
+
+class WorkerPrincipal:
+    """Klaim kunci worker yang sudah diverifikasi."""
+    __slots__ = ("key_id", "camera_ids", "branch_id", "expires_at")
+
+    def __init__(self, key_id: str, camera_ids: FrozenSet[int], branch_id: Optional[int], expires_at: Optional[float]):
+        self.key_id = key_id
+        self.camera_ids = camera_ids
+        self.branch_id = branch_id
+        self.expires_at = expires_at  # Unix timestamp (klaim exp), None = tidak kedaluwarsa
+
+
+# --- PENERBITAN & PENCABUTAN KUNCI (dipakai issue_worker_key.py) ---
+
+def create_worker_key(db: Session, name: str, branch_id: Optional[int] = None, camera_ids: Iterable[int] = (),
+                      expire_days: Optional[int] = settings.WORKER_KEY_EXPIRE_DAYS) -> str:
+    """Mencatat kunci baru di worker_keys dan mengembalikan token JWT-nya (hanya ditampilkan sekali)."""
+    camera_ids = sorted(set(camera_ids))
+    if branch_id is None and not camera_ids:
+        raise ValueError("Kunci worker harus dibatasi ke satu cabang atau daftar kamera")
+
+    key_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    expires_at = now + timedelta(days=expire_days) if expire_days else None
+    db.add(models.WorkerKey(id=key_id, name=name, branch_id=branch_id, camera_ids=camera_ids,
+                            created_at=now, expires_at=expires_at))
+    db.commit()
+
+    claims = {"typ": TOKEN_TYPE, "jti": key_id, "sub": f"worker:{name}", "iat": now}
+    if camera_ids:
+        claims["cams"] = camera_ids
+    if branch_id is not None:
+        claims["branch"] = branch_id
+    if expires_at is not None:
+        claims["exp"] = expires_at
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def revoke_worker_key(db: Session, key_id: str) -> bool:
+    """Menandai kunci sebagai dicabut; berlaku di backend paling lambat setelah satu interval refresh."""
+    key = db.get(models.WorkerKey, key_id)
+    if key is None:
+        return False
+    if key.revoked_at is None:
+        key.revoked_at = datetime.utcnow()
+        db.commit()
+    return True
+
+
+# --- VALIDASI DI MEMORI ---
+
+class WorkerAuthenticator:
+    """Validasi kunci worker: LRU klaim terverifikasi + daftar pencabutan yang di-refresh berkala."""
+
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, WorkerPrincipal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._revoked: FrozenSet[str] = frozenset()
+        self._camera_branch: Dict[int, int] = {}
+        self.loaded_at = None
+
+        # Metrik
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rejected = 0
+
+    def _decode(self, token: str) -> Optional[WorkerPrincipal]:
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError as e:
+            raise InvalidWorkerKey(str(e)) from e
+        if claims.get("typ") != TOKEN_TYPE:
+            # Token valid milik sistem ini tetapi bukan kunci worker (JWT user lama, masa migrasi)
+            return None
+        if not claims.get("jti"):
+            raise InvalidWorkerKey("Worker key without jti")
+        return WorkerPrincipal(claims["jti"], frozenset(claims.get("cams", ())), claims.get("branch"), claims.get("exp"))
+
+    def authenticate(self, token: str) -> Optional[WorkerPrincipal]:
+        """
+        Klaim kunci worker yang valid, atau None jika token valid tetapi bukan kunci worker.
+        InvalidWorkerKey jika tanda tangan salah / token rusak / kedaluwarsa / dicabut.
+        """
+        with self._lock:
+            principal = self._cache.get(token)
+            if principal is not None:
+                self._cache.move_to_end(token)
+        if principal is None:
+            self.cache_misses += 1
+            try:
+                principal = self._decode(token)
+            except InvalidWorkerKey:
+                self.rejected += 1
+                raise
+            if principal is None:
+                return None
+            with self._lock:
+                self._cache[token] = principal
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+
+        if principal.expires_at is not None and principal.expires_at < time.time():
+            self.rejected += 1
+            raise InvalidWorkerKey("Worker key expired")
+        if principal.key_id in self._revoked:
+            self.rejected += 1
+            raise InvalidWorkerKey("Worker key revoked")
+        return principal
+
+    def can_access(self, principal: WorkerPrincipal, camera_ids: Iterable[int]) -> bool:
+        """True jika semua kamera masuk cakupan kunci (daftar kamera, atau kamera milik cabangnya)."""
+        for camera_id in camera_ids:
+            if camera_id in principal.camera_ids:
+                continue
+            if principal.branch_id is None or self._camera_branch.get(camera_id) != principal.branch_id:
+                return False
+        return True
+
+    def refresh(self, db: Session):
+        """Memuat ulang daftar pencabutan & peta kamera -> cabang (dua query, dipanggil task latar)."""
+        revoked = frozenset(db.execute(
+            select(models.WorkerKey.id).where(models.WorkerKey.revoked_at.isnot(None))
+        ).scalars())
+        camera_branch = dict(db.execute(select(models.Camera.id, models.Camera.branch_id)).all())
+        # Diganti sekaligus (bukan di-mutate) agar request yang sedang berjalan melihat state konsisten
+        self._revoked, self._camera_branch = revoked, camera_branch
+        self.loaded_at = time.time()
+
+    def metrics(self) -> dict:
+        return {
+            "cached_tokens": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "rejected": self.rejected,
+            "revoked_keys": len(self._revoked),
+            "revocations_age_seconds": round(time.time() - self.loaded_at, 1) if self.loaded_at else None,
+        }
+
+
+def _bearer_token(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" and token.strip() else None
+
+
+def check_worker_access(request: Request, camera_ids: Iterable[int]) -> None:
+    """
+    Dipanggil endpoint yang ditulis AI Worker. WORKER_AUTH_REQUIRED=True: wajib kunci worker
+    yang valid (401) dan mencakup kamera-kamera ini (403). Selama migrasi (False), request
+    tanpa kunci worker (tanpa token, atau JWT user lama yang valid) tetap diterima. Token yang
+    gagal validasi (kunci kedaluwarsa/dicabut, tanda tangan salah) SELALU ditolak 401, dan
+    kunci worker yang valid tetap dibatasi cakupannya.
+    """
+    token = _bearer_token(request)
+    try:
+        principal = worker_authenticator.authenticate(token) if token else None
+    except InvalidWorkerKey as e:
+        raise HTTPException(status_code=401, detail=f"Invalid worker key: {e}",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if principal is None:
+        if settings.WORKER_AUTH_REQUIRED:
+            raise HTTPException(status_code=401, detail="Valid worker key required",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return
+    if not worker_authenticator.can_access(principal, camera_ids):
+        raise HTTPException(status_code=403, detail="Worker key is not allowed for this camera")
+
+
+# Instance global (satu per proses backend)
+worker_authenticator = WorkerAuthenticator(settings.WORKER_AUTH_CACHE_SIZE)
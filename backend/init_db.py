@@ -1,23 +1,39 @@
 """
 Script untuk membuat tabel-tabel di database
 Jalankan script ini untuk membuat semua tabel yang didefinisikan di models.py
+
+Di PostgreSQL, detection_logs dibuat sebagai tabel berpartisi harian beserta
+partisi untuk beberapa hari ke depan:
+
+    python init_db.py --days-ahead 7
 """
+import argparse
 from app.core.database import engine, Base
+from app.core.config import settings
 from app import models  # Import semua models agar terdaftar di Base.metadata
+from app import partitioning
 
-def init_db():
-    """Membuat semua tabel di database"""
+def init_db(days_ahead: int = settings.LOG_PARTITION_DAYS_AHEAD):
+    """Membuat semua tabel (dan partisi detection_logs di PostgreSQL) di database"""
     print("Membuat tabel-tabel di database...")
     print(f"Database URL: {engine.url}")
-    
+
     # Buat semua tabel
-    Base.metadata.create_all(bind=engine)
-    
+    partitioning.create_all_tables(engine, days_ahead=days_ahead)
+
     print("✅ Tabel-tabel berhasil dibuat!")
     print("\nTabel yang dibuat:")
     for table_name in Base.metadata.tables.keys():
         print(f"  - {table_name}")
 
-if __name__ == "__main__":
-    init_db()
+    if partitioning.is_postgres(engine):
+        print("\nPartisi detection_logs:")
+        for name, day in partitioning.list_partitions(engine):
+            print(f"  - {name} ({day})")
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inisialisasi tabel database")
+    parser.add_argument("--days-ahead", type=int, default=settings.LOG_PARTITION_DAYS_AHEAD,
+                        help="Jumlah hari ke depan yang partisi detection_logs-nya dibuat sekarang")
+    args = parser.parse_args()
+    init_db(args.days_ahead)
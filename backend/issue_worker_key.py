@@ -0,0 +1,62 @@
+"""
+Menerbitkan / mencabut kunci mesin AI Worker (JWT jangka panjang, lihat app/worker_auth.py).
+
+    python issue_worker_key.py issue --name cabang-3 --branch 3        # semua kamera cabang 3 (mode supervisor)
+    python issue_worker_key.py issue --name kamera-15 --cameras 15     # satu kamera (mode per-kamera)
+    python issue_worker_key.py list
+    python issue_worker_key.py revoke <KEY_ID>
+
+Token hanya ditampilkan sekali saat diterbitkan; set sebagai env AI_WORKER_KEY di mesin worker.
+Pencabutan berlaku di backend paling lambat setelah WORKER_REVOCATION_REFRESH_SECONDS.
+"""
+import argparse
+from app.core.database import SessionLocal, engine
+from app.core.config import settings
+from app import models, partitioning, worker_auth
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kelola kunci mesin AI Worker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    issue = commands.add_parser("issue", help="Terbitkan kunci baru")
+    issue.add_argument("--name", required=True, help="Nama kunci, cth. cabang-3-supervisor")
+    issue.add_argument("--branch", type=int, help="Izinkan semua kamera cabang ini (termasuk kamera baru)")
+    issue.add_argument("--cameras", type=int, nargs="+", default=[], help="Izinkan kamera-kamera ini")
+    issue.add_argument("--days", type=int, default=settings.WORKER_KEY_EXPIRE_DAYS,
+                       help="Masa berlaku (hari, 0 = tidak kedaluwarsa)")
+
+    commands.add_parser("list", help="Daftar kunci yang pernah diterbitkan")
+
+    revoke = commands.add_parser("revoke", help="Cabut kunci")
+    revoke.add_argument("key_id")
+
+    args = parser.parse_args()
+    partitioning.create_all_tables(engine, days_ahead=settings.LOG_PARTITION_DAYS_AHEAD)
+    db = SessionLocal()
+    try:
+        if args.command == "issue":
+            try:
+                token = worker_auth.create_worker_key(db, args.name, args.branch, args.cameras, args.days or None)
+            except ValueError as e:
+                parser.error(str(e))
+            print("✅ Kunci worker diterbitkan. Simpan token ini (tidak ditampilkan lagi):")
+            print(token)
+        elif args.command == "list":
+            for key in db.query(models.WorkerKey).order_by(models.WorkerKey.created_at):
+                scope = f"cabang {key.branch_id}" if key.branch_id is not None else ""
+                if key.camera_ids:
+                    scope = f"{scope} kamera {key.camera_ids}".strip()
+                status = f"DICABUT {key.revoked_at:%Y-%m-%d %H:%M}" if key.revoked_at else "aktif"
+                print(f"{key.id}  {key.name:<24} {scope:<28} {status}")
+        elif args.command == "revoke":
+            if worker_auth.revoke_worker_key(db, args.key_id):
+                print(f"✅ Kunci {args.key_id} dicabut.")
+            else:
+                print(f"❌ Kunci {args.key_id} tidak ditemukan.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Database SQLite sementara; harus di-set sebelum app.core.config diimpor
+os.environ.setdefault("DB_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
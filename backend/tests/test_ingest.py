@@ -0,0 +1,98 @@
+"""Pipeline ingest: log untuk kamera yang tidak ada / data yang ditolak database tidak boleh memblokir antrian."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app import crud, models, partitioning, schemas
+from app.core.database import Base, SessionLocal, engine
+from app.ingest import IngestBuffer
+
+
+@pytest.fixture()
+def camera_id():
+    Base.metadata.drop_all(bind=engine)
+    partitioning.create_all_tables(engine)
+    db = SessionLocal()
+    branch = models.Branch(name="B", uniform_schedule={}, total_seating_capacity=10)
+    db.add(branch)
+    db.flush()
+    camera = models.Camera(branch_id=branch.id, name="kasir", area_type="CASHIER", rtsp_url="x", roi_settings={})
+    db.add(camera)
+    db.commit()
+    yield camera.id
+    db.close()
+
+
+def _log(camera_id, queue_length=1):
+    return schemas.DetectionLogCreate(camera=camera_id, analytics_data={"queue_length": queue_length})
+
+
+def _log_count():
+    db = SessionLocal()
+    try:
+        return db.query(models.DetectionLog).count()
+    finally:
+        db.close()
+
+
+def test_unknown_camera_does_not_block_valid_logs(camera_id):
+    buffer = IngestBuffer(max_buffer=10)
+    buffer.enqueue([_log(camera_id + 1000), _log(camera_id)])
+    assert buffer.flush() == 1
+    assert len(buffer) == 0
+    assert buffer.unknown_camera_total == 1
+
+    buffer.enqueue([_log(camera_id, 2)])
+    assert buffer.flush() == 1
+    assert _log_count() == 2
+
+
+def test_rejected_batch_is_written_row_by_row(camera_id, monkeypatch):
+    original = crud.create_detection_logs_bulk
+
+    def reject_bad_row(db, rows, *args, **kwargs):
+        if any(row["analytics_data"].get("queue_length") == 99 for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("ditolak"))
+        return original(db, rows, *args, **kwargs)
+
+    monkeypatch.setattr(crud, "create_detection_logs_bulk", reject_bad_row)
+    buffer = IngestBuffer(max_buffer=10)
+    buffer.enqueue([_log(camera_id, 99), _log(camera_id, 3)])
+    assert buffer.flush() == 1
+    assert len(buffer) == 0
+    assert buffer.dropped_total == 1
+    assert _log_count() == 1
+
+
+def test_connection_error_keeps_batch_for_retry(camera_id, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    buffer = IngestBuffer(max_buffer=10)
+    buffer.enqueue([_log(camera_id)])
+    with monkeypatch.context() as patch:
+        patch.setattr(crud, "create_detection_logs_bulk", unavailable)
+        assert buffer.flush() == 0
+    assert len(buffer) == 1
+    assert buffer.flush() == 1
+    assert _log_count() == 1
+
+
+def test_future_timestamp_is_replaced_by_receive_time(camera_id):
+    buffer = IngestBuffer(max_buffer=10)
+    future = datetime.utcnow() + timedelta(days=30)
+    recent = datetime.utcnow() - timedelta(hours=1)
+    buffer.enqueue([
+        schemas.DetectionLogCreate(camera=camera_id, timestamp=future),
+        schemas.DetectionLogCreate(camera=camera_id, timestamp=recent),
+    ])
+    assert buffer.clock_skew_total == 1
+    buffer.flush()
+    db = SessionLocal()
+    try:
+        timestamps = sorted(log.timestamp for log in db.query(models.DetectionLog))
+    finally:
+        db.close()
+    assert timestamps[0] == recent
+    assert timestamps[1] < future - timedelta(days=29)